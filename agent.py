@@ -1,33 +1,120 @@
 import openai
-from openai import OpenAI, APIError, APITimeoutError
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, APIError, APITimeoutError
+import asyncio
+import httpx
 import json
-import re
 import logging
 import os
-from typing import Dict, List, Any
+import time
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
+from pydantic import BaseModel, Field, field_validator
+
+from extractor import extract_identifiers, looks_obfuscated
+from reply_cache import ReplyCache
+from campaigns import CAMPAIGNS, Campaign
+from metrics import LLM_CALLS, LLM_ERRORS, STAGE_SECONDS
+from tracing import traced
+from logging_config import turn_logger
 
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI client
-client = OpenAI()
+# Connection pool settings for the shared LLM client
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+LLM_PREWARM_CONNECTIONS = int(os.getenv("LLM_PREWARM_CONNECTIONS", "2"))
+LLM_PREWARM_TIMEOUT = float(os.getenv("LLM_PREWARM_TIMEOUT", "2"))
+
+# Initialize a single async OpenAI client shared by all sessions.
+# Its keep-alive pool lets concurrent requests reuse TLS connections.
+client = AsyncOpenAI(
+    http_client=DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+        )
+    )
+)
 
 # Mock mode for testing without API quota
 MOCK_MODE = os.getenv("MOCK_MODE", "false").lower() == "true"
 
-def generate_agent_reply(session: Dict[str, Any], channel: str = "SMS", locale: str = "IN") -> str:
+# Intelligence extraction mode: "llm" (always call the LLM) or "tiered"
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "llm").lower()
+
+# Counters to measure how many extraction LLM calls the tiered mode saves
+EXTRACTION_STATS = {
+    "llmCalls": 0, "llmSkipped": 0, "regexItems": 0, "llmItems": 0,
+    "combinedCalls": 0, "combinedFallbacks": 0
+}
+
+# Ask for reply + intelligence in one structured completion instead of two calls
+COMBINED_LLM_CALL = os.getenv("COMBINED_LLM_CALL", "false").lower() == "true"
+
+# Canned replies used when the LLM call fails (never cached or pooled)
+FALLBACK_REPLIES = (
+    "Connection is slow. Can you resend that?",
+    "I'm having technical difficulties. Can you try again in a moment?",
+    "Can you please explain that again? I'm a bit confused.",
+)
+
+# Reply cache for templated scam messages (keyed on persona, stage and last N messages)
+REPLY_CACHE_ENABLED = os.getenv("REPLY_CACHE_ENABLED", "false").lower() == "true"
+REPLY_CACHE_WINDOW = int(os.getenv("REPLY_CACHE_WINDOW", "4"))
+REPLY_CACHE = ReplyCache(
+    max_entries=int(os.getenv("REPLY_CACHE_SIZE", "2048")),
+    ttl_seconds=float(os.getenv("REPLY_CACHE_TTL", "3600")),
+    pool_size=int(os.getenv("REPLY_CACHE_POOL_SIZE", "3")),
+    policy=os.getenv("REPLY_CACHE_POLICY", "random").lower()
+)
+
+async def warm_up_client():
     """
-    Generate a natural, creative reply from the agent that keeps scammers engaged.
-    Adapts persona based on context and conversation progression.
+    Open keep-alive connections to the LLM API ahead of the first request.
+    Uses the (free) model listing endpoint so no tokens are spent. Best effort:
+    a short timeout and no retries, so an unreachable API can't delay startup.
+    """
+    if MOCK_MODE or LLM_PREWARM_CONNECTIONS <= 0:
+        return
+    warm_client = client.with_options(timeout=LLM_PREWARM_TIMEOUT, max_retries=0)
+    results = await asyncio.gather(
+        *(warm_client.models.list() for _ in range(LLM_PREWARM_CONNECTIONS)),
+        return_exceptions=True
+    )
+    failures = [r for r in results if isinstance(r, Exception)]
+    if failures:
+        logger.warning(f"⚠️ LLM connection pre-warm failed (continuing without it): {failures[0]}")
+    else:
+        logger.info(f"✅ Pre-warmed {LLM_PREWARM_CONNECTIONS} LLM connections")
+
+def _error_kind(e: Exception) -> str:
+    """Error label for LLM_ERRORS (APITimeoutError is also an APIError)."""
+    if isinstance(e, APITimeoutError):
+        return "timeout"
+    return "api" if isinstance(e, APIError) else "other"
+
+async def close_client():
+    """Close the shared LLM client and its connection pool."""
+    await client.close()
+
+def _last_scammer_message(history: List[Dict[str, Any]]) -> str:
+    """Return the latest scammer message, lowercased."""
+    for msg in reversed(history):
+        if msg.get("sender") == "scammer":
+            return msg.get("text", "").lower()
+    return ""
+
+def select_persona(session: Dict[str, Any], channel: str = "SMS", locale: str = "IN") -> Tuple[str, str, str]:
+    """
+    Choose the persona and system prompt for the current conversation stage.
+    Returns (persona, stage, system_prompt).
     """
     history = session["conversationHistory"]
     msg_count = len(history)
     
     # Get last message from scammer to determine context
-    last_scammer_msg = ""
-    for msg in reversed(history):
-        if msg.get("sender") == "scammer":
-            last_scammer_msg = msg.get("text", "").lower()
-            break
+    last_scammer_msg = _last_scammer_message(history)
     
     # Determine engagement strategy based on message count and content
     is_asking_for_money = any(word in last_scammer_msg for word in ["money", "payment", "send", "transfer", "upi", "account", "rupees"])
@@ -38,6 +125,7 @@ def generate_agent_reply(session: Dict[str, Any], channel: str = "SMS", locale:
     if locale == "IN" and channel == "SMS":
         if msg_count <= 1:
             # First message - show confusion and concern
+            persona, stage = "rahul", "first"
             system_prompt = (
                 "You are Rahul, a 28-year-old IT professional from Bangalore. "
                 "You just received a suspicious message and you're genuinely concerned but unsure. "
@@ -53,6 +141,7 @@ def generate_agent_reply(session: Dict[str, Any], channel: str = "SMS", locale:
             )
         elif is_asking_for_money:
             # Money request - show reluctance but curiosity
+            persona, stage = "rahul", "money"
             system_prompt = (
                 "You are Rahul, now getting suspicious about the money request. "
                 "You want to understand more before committing.\n"
@@ -67,6 +156,7 @@ def generate_agent_reply(session: Dict[str, Any], channel: str = "SMS", locale:
             )
         elif is_asking_for_data:
             # Data request - show concern about security
+            persona, stage = "rahul", "data"
             system_prompt = (
                 "You are Rahul, now alarmed about data security. "
                 "You know banks never ask for passwords but you want to play along.\n"
@@ -81,6 +171,7 @@ def generate_agent_reply(session: Dict[str, Any], channel: str = "SMS", locale:
             )
         else:
             # Ongoing conversation - build rapport
+            persona, stage = "rahul", "ongoing"
             system_prompt = (
                 "You are Rahul, now more engaged. You're playing along to understand. "
                 "Style: Less suspicious now, more collaborative.\n"
@@ -94,6 +185,7 @@ def generate_agent_reply(session: Dict[str, Any], channel: str = "SMS", locale:
             )
     elif locale == "IN" and channel == "WHATSAPP":
         if msg_count <= 1:
+            persona, stage = "priya", "first"
             system_prompt = (
                 "You are Priya, a 32-year-old housewife from Mumbai. "
                 "You're very cautious about scams.\n"
@@ -106,6 +198,7 @@ def generate_agent_reply(session: Dict[str, Any], channel: str = "SMS", locale:
                 "- Keep under 20 words"
             )
         else:
+            persona, stage = "priya", "ongoing"
             system_prompt = (
                 "You are Priya, continuing the conversation. "
                 "You're playing along but concerned.\n"
@@ -116,6 +209,7 @@ def generate_agent_reply(session: Dict[str, Any], channel: str = "SMS", locale:
                 "- Keep under 20 words"
             )
     else:
+        persona, stage = "generic", "generic"
         system_prompt = (
             "You are a cautious person who received a suspicious message. "
             "You're confused but willing to engage.\n"
@@ -127,6 +221,11 @@ def generate_agent_reply(session: Dict[str, Any], channel: str = "SMS", locale:
             "- Never mention being a bot or AI"
         )
     
+    return persona, stage, system_prompt
+
+def build_reply_messages(session: Dict[str, Any], system_prompt: str) -> List[Dict[str, str]]:
+    """Build the chat messages (system prompt + recent history) for the LLM."""
+    history = session["conversationHistory"]
     messages = [{"role": "system", "content": system_prompt}]
     
     # Add last 8 messages for context (cost/latency control)
@@ -134,249 +233,331 @@ def generate_agent_reply(session: Dict[str, Any], channel: str = "SMS", locale:
         role = "user" if msg["sender"] == "scammer" else "assistant"
         messages.append({"role": role, "content": msg["text"]})
     
+    return messages
+
+def _reply_cache_key(session: Dict[str, Any], persona: str, stage: str) -> Optional[str]:
+    """Reply cache key for this turn, or None when the cache is disabled."""
+    if not REPLY_CACHE_ENABLED:
+        return None
+    return REPLY_CACHE.make_key(persona, stage, session["conversationHistory"], REPLY_CACHE_WINDOW)
+
+# ========== MOCK MODE RESPONDER ==========
+# Topic keywords, compiled once; a topic's bit is its index in this table
+MOCK_TOPIC_KEYWORDS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ('kyc', ("kyc", "verification", "verify", "update profile", "complete profile", "information update", "aadhaar", "pan", "kyc incomplete", "kyc failed")),
+    ('link', ("click", "link", "link below", "here", "url", "website", "bit.ly", "http", "https", "tinyurl")),
+    ('suspension', ("suspended", "blocked", "freeze", "close", "disabled", "locked", "deactivate", "sim deactivate", "account blocked")),
+    ('security', ("otp", "password", "pin", "cvv", "secure code", "confirm identity", "2fa", "two-factor")),
+    ('payment', ("send", "transfer", "payment", "upi", "rupees", "amount", "pay", "receiving", "₹", "processing fee")),
+    ('personal_info', ("account number", "debit card", "credit card", "name", "mobile", "email", "details", "personal", "info", "aadhaar")),
+    ('urgency', ("immediately", "urgent", "now", "asap", "today", "quickly", "hurry", "expires", "deadline", "24 hours")),
+    ('refund', ("refund", "refund pending", "refund initiated", "package", "delivery", "courier", "customs")),
+    ('prize', ("congratulations", "won", "prize", "lottery", "contest", "kbc", "lucky draw")),
+    ('loan', ("loan", "loan approved", "credit", "instant credit", "processing fee")),
+    ('job', ("job offer", "job opportunity", "work from home", "part time", "part-time", "earn money")),
+    ('investment', ("double money", "crypto", "bitcoin", "returns", "investment", "roi", "profit", "fixed deposit")),
+    ('threat', ("cyber cell", "income tax", "tax raid", "complaint filed", "fir", "legal action", "court order")),
+)
+MOCK_TOPIC_BITS = {topic: 1 << index for index, (topic, _) in enumerate(MOCK_TOPIC_KEYWORDS)}
+
+# Topic-specific responses (varied by message count to show context understanding)
+MOCK_TOPIC_RESPONSES: Dict[str, Tuple[str, ...]] = {
+    'kyc': (
+        "What exactly needs to be updated? My KYC was done last year.",
+        "I never got an official notification from my bank. Are you sure this is real?",
+        "Why would my account be suspended for KYC? That doesn't make sense.",
+        "How do I know this link is from my bank? It doesn't look official.",
+        "Can you tell me what information you need without clicking a link?",
+        "My bank said they'd contact me directly. Why are you calling instead?",
+    ),
+    'link': (
+        "Is it safe to click that link? What's the actual website?",
+        "Why can't you just tell me what to do instead of sending a link?",
+        "I don't click links from unknown senders. Can you explain without it?",
+        "That URL doesn't look like my bank's website. Let me verify first.",
+        "Is this a phishing attempt? That link seems suspicious.",
+        "Can you give me your bank's main phone number so I can call to verify?",
+    ),
+    'suspension': (
+        "But I haven't done anything wrong! Why would they block my account?",
+        "How is this even possible? I just used my account yesterday.",
+        "Why didn't my bank contact me directly about this?",
+        "Can you give me a reference number from your bank for this?",
+        "Let me call my bank directly. What's your name and employee ID?",
+        "If my account was really blocked, I'd see a notification in my app.",
+    ),
+    'security': (
+        "My bank told me never to share my OTP with anyone. Why do you need it?",
+        "Absolutely not! You can't have my password. That's my security!",
+        "How do I know you won't use this to steal my money?",
+        "Real banks never ask for OTP. This is definitely a scam.",
+        "I will never share my PIN with anyone. Period.",
+        "Banks always tell us to keep passwords secret. This doesn't add up.",
+    ),
+    'payment': (
+        "You want me to send money? Why would my bank ask me to do that?",
+        "I'm not sending money to anyone without verification. Who are you?",
+        "What's the payment for exactly? This seems like a scam.",
+        "My bank processes refunds themselves. I never transfer money to them.",
+        "Can you provide a bank reference number? I need to verify this.",
+        "I've never heard of anyone paying their bank through UPI. This is suspicious.",
+    ),
+    'personal_info': (
+        "Why do you need my personal details? That's sensitive information.",
+        "How do I know this information won't be misused?",
+        "I'm not comfortable sharing account details with someone I don't know.",
+        "Can I verify your identity first before sharing anything?",
+        "What will you do with this information?",
+        "My bank portal shows everything. Why would I need to share it with you?",
+    ),
+    'urgency': (
+        "Why the rush? Real bank actions aren't this sudden.",
+        "You sound like you're trying to pressure me. That's suspicious.",
+        "I don't make decisions under pressure. Let me take time to verify.",
+        "If it's really urgent, I'll call my bank directly.",
+        "This urgency is making me even more suspicious.",
+        "Legitimate banks give you time to respond. This feels like a trap.",
+    ),
+    'refund': (
+        "How did you get my number to tell me about my package?",
+        "Why can't I see this in my app? Let me check myself.",
+        "Customs duty? I wasn't expecting any deliveries.",
+        "Why do I need to pay for my own refund? That doesn't make sense.",
+        "Let me contact the courier company directly instead.",
+    ),
+    'prize': (
+        "I never entered any contest. How did I win?",
+        "This is a scam. I never participated in KBC.",
+        "If I won a lottery, I'd have proof. You're lying.",
+        "How do you have my number if I didn't register anywhere?",
+        "I'm not falling for this prize scam.",
+    ),
+    'loan': (
+        "I never applied for a loan. How is it approved?",
+        "Why would I pay a fee upfront for a loan?",
+        "Processing fees are deducted from the loan amount, not paid separately.",
+        "This seems like a scam. Real banks don't work this way.",
+        "I don't need a loan. Stop calling.",
+    ),
+    'job': (
+        "I never applied for a job. How did you get my number?",
+        "Part-time job offering ₹50,000/week? That's not realistic.",
+        "Why would I get hired without an interview?",
+        "What company are you from? Let me verify online first.",
+        "This sounds too good to be true. I'm not interested.",
+    ),
+    'investment': (
+        "Double money in 48 hours? That's impossible.",
+        "No investment offers guaranteed 30% monthly returns.",
+        "I'm not investing with strangers. Get lost.",
+        "If this were real, everyone would be rich.",
+        "This is clearly a scam. I'm not falling for it.",
+    ),
+    'threat': (
+        "I haven't done anything illegal. This is harassment.",
+        "If there really was a complaint, I'd be contacted officially.",
+        "Stop threatening me. You sound like a scammer.",
+        "Why would Cyber Cell contact me on WhatsApp?",
+        "I'm calling the real police about this threat.",
+    ),
+}
+
+# Response priority by severity: (bit, topic, responses)
+MOCK_TOPIC_PRIORITY = tuple(
+    (MOCK_TOPIC_BITS[topic], topic, MOCK_TOPIC_RESPONSES[topic])
+    for topic in ['threat', 'security', 'payment', 'personal_info', 'link', 'suspension', 'urgency', 'kyc', 'refund', 'prize', 'loan', 'job', 'investment']
+)
+
+# Fallback responses if no specific topic matched: first message, turns 2-3, later
+MOCK_FALLBACKS = (
+    (
+        "I'm sorry, I don't understand. Can you explain this more clearly?",
+        "This message seems suspicious to me. Who are you exactly?",
+        "I need to verify this with my bank directly. What's going on?",
+        "This doesn't seem like an official message. How did you get my number?",
+        "Can you provide some proof that you're really from my bank?",
+    ),
+    (
+        "Tell me more about this. I still have doubts.",
+        "I'm not sure I should trust this. Can you prove it?",
+        "Let me verify this information first before I do anything.",
+        "I have more questions. Can you answer them?",
+        "This all seems very suspicious to me.",
+        "I don't believe you. Prove it.",
+    ),
+    (
+        "Okay, but I need more proof before I do anything.",
+        "Let me think about this and verify with my bank.",
+        "I'm still not comfortable with this whole situation.",
+        "What happens if I don't do this immediately?",
+        "Can I get an official letter from your bank about this?",
+        "I've been researching and this looks like a classic scam.",
+    ),
+)
+
+def _topic_mask(text_lower: str) -> int:
+    """Bitmask of the mock topics whose keywords occur in a lowercased message."""
+    mask = 0
+    for index, (_, keywords) in enumerate(MOCK_TOPIC_KEYWORDS):
+        if any(keyword in text_lower for keyword in keywords):
+            mask |= 1 << index
+    return mask
+
+def update_topic_mask(session: Dict[str, Any]) -> int:
+    """
+    Fold scammer messages that arrived since the last call into the session's
+    topic bitmask, so each message is scanned once instead of every turn.
+    """
+    history = session["conversationHistory"]
+    total = len(history)
+    mask = session.get("topicMask", 0)
+    unscanned = total - session.get("topicScanned", 0)
+    if unscanned > 0:
+        for msg in history[-unscanned:]:
+            if msg.get("sender") == "scammer":
+                mask |= _topic_mask(msg.get("text", "").lower())
+        session["topicMask"] = mask
+        session["topicScanned"] = total
+    return mask
+
+def _mock_reply(session: Dict[str, Any]) -> str:
+    """Intelligent context-matched canned reply used in MOCK_MODE."""
+    history = session["conversationHistory"]
+    msg_count = len(history)
+    
+    # Topics seen anywhere in the conversation that the latest message raises again
+    conversation_topics = update_topic_mask(session)
+    active_topics = conversation_topics & _topic_mask(_last_scammer_message(history))
+    if active_topics:
+        for bit, topic, responses in MOCK_TOPIC_PRIORITY:
+            if active_topics & bit:
+                # Use different responses as conversation progresses (avoid repetition)
+                reply = responses[(msg_count - 1) % len(responses)]
+                turn_logger.info("🔷 [MOCK MODE] Topic: %s | Msg#%d | Reply: %s", topic, msg_count, reply)
+                return reply
+    
+    if msg_count <= 1:
+        fallback = MOCK_FALLBACKS[0]
+    elif msg_count <= 3:
+        fallback = MOCK_FALLBACKS[1]
+    else:
+        fallback = MOCK_FALLBACKS[2]
+    reply = fallback[(msg_count - 1) % len(fallback)]
+    turn_logger.info("🔷 [MOCK MODE] Fallback (msg #%d): %s", msg_count, reply)
+    return reply
+
+@traced("generate_agent_reply")
+async def generate_agent_reply(session: Dict[str, Any], channel: str = "SMS", locale: str = "IN") -> str:
+    """
+    Generate a natural, creative reply from the agent that keeps scammers engaged.
+    Adapts persona based on context and conversation progression.
+    """
     # Mock mode - return intelligent context-matched responses
     if MOCK_MODE:
-        import random
-        
-        # ========== IMPROVED CONTEXT TRACKING ==========
-        # Track ALL topics mentioned across conversation history, not just latest message
-        detected_topics = set()
-        all_conversation_text = " ".join([msg.get("text", "").lower() for msg in history if msg.get("sender") == "scammer"])
-        
-        # Topic detection patterns with comprehensive keywords
-        topic_patterns = {
-            'kyc': ["kyc", "verification", "verify", "update profile", "complete profile", "information update", "aadhaar", "pan", "kyc incomplete", "kyc failed"],
-            'link': ["click", "link", "link below", "here", "url", "website", "bit.ly", "http", "https", "tinyurl"],
-            'suspension': ["suspended", "blocked", "freeze", "close", "disabled", "locked", "deactivate", "sim deactivate", "account blocked"],
-            'security': ["otp", "password", "pin", "cvv", "secure code", "confirm identity", "2fa", "two-factor"],
-            'payment': ["send", "transfer", "payment", "upi", "rupees", "amount", "pay", "receiving", "₹", "processing fee"],
-            'personal_info': ["account number", "debit card", "credit card", "name", "mobile", "email", "details", "personal", "info", "aadhaar"],
-            'urgency': ["immediately", "urgent", "now", "asap", "today", "quickly", "hurry", "expires", "deadline", "24 hours"],
-            'refund': ["refund", "refund pending", "refund initiated", "package", "delivery", "courier", "customs"],
-            'prize': ["congratulations", "won", "prize", "lottery", "contest", "kbc", "lucky draw"],
-            'loan': ["loan", "loan approved", "credit", "instant credit", "processing fee"],
-            'job': ["job offer", "job opportunity", "work from home", "part time", "part-time", "earn money"],
-            'investment': ["double money", "crypto", "bitcoin", "returns", "investment", "roi", "profit", "fixed deposit"],
-            'threat': ["cyber cell", "income tax", "tax raid", "complaint filed", "fir", "legal action", "court order"],
-        }
-        
-        # Detect all topics from entire conversation
-        for topic, keywords in topic_patterns.items():
-            if any(keyword in all_conversation_text for keyword in keywords):
-                detected_topics.add(topic)
-        
-        # Topic-specific responses with depth (varies by message count to show context understanding)
-        topic_responses = {}
-        msg_lower = last_scammer_msg.lower()
-        
-        # Define detailed responses per topic
-        if 'kyc' in detected_topics and any(word in msg_lower for word in topic_patterns['kyc']):
-            topic_responses['kyc'] = [
-                "What exactly needs to be updated? My KYC was done last year.",
-                "I never got an official notification from my bank. Are you sure this is real?",
-                "Why would my account be suspended for KYC? That doesn't make sense.",
-                "How do I know this link is from my bank? It doesn't look official.",
-                "Can you tell me what information you need without clicking a link?",
-                "My bank said they'd contact me directly. Why are you calling instead?",
-            ]
-        
-        if 'link' in detected_topics and any(word in msg_lower for word in topic_patterns['link']):
-            topic_responses['link'] = [
-                "Is it safe to click that link? What's the actual website?",
-                "Why can't you just tell me what to do instead of sending a link?",
-                "I don't click links from unknown senders. Can you explain without it?",
-                "That URL doesn't look like my bank's website. Let me verify first.",
-                "Is this a phishing attempt? That link seems suspicious.",
-                "Can you give me your bank's main phone number so I can call to verify?",
-            ]
-        
-        if 'suspension' in detected_topics and any(word in msg_lower for word in topic_patterns['suspension']):
-            topic_responses['suspension'] = [
-                "But I haven't done anything wrong! Why would they block my account?",
-                "How is this even possible? I just used my account yesterday.",
-                "Why didn't my bank contact me directly about this?",
-                "Can you give me a reference number from your bank for this?",
-                "Let me call my bank directly. What's your name and employee ID?",
-                "If my account was really blocked, I'd see a notification in my app.",
-            ]
-        
-        if 'security' in detected_topics and any(word in msg_lower for word in topic_patterns['security']):
-            topic_responses['security'] = [
-                "My bank told me never to share my OTP with anyone. Why do you need it?",
-                "Absolutely not! You can't have my password. That's my security!",
-                "How do I know you won't use this to steal my money?",
-                "Real banks never ask for OTP. This is definitely a scam.",
-                "I will never share my PIN with anyone. Period.",
-                "Banks always tell us to keep passwords secret. This doesn't add up.",
-            ]
-        
-        if 'payment' in detected_topics and any(word in msg_lower for word in topic_patterns['payment']):
-            topic_responses['payment'] = [
-                "You want me to send money? Why would my bank ask me to do that?",
-                "I'm not sending money to anyone without verification. Who are you?",
-                "What's the payment for exactly? This seems like a scam.",
-                "My bank processes refunds themselves. I never transfer money to them.",
-                "Can you provide a bank reference number? I need to verify this.",
-                "I've never heard of anyone paying their bank through UPI. This is suspicious.",
-            ]
-        
-        if 'personal_info' in detected_topics and any(word in msg_lower for word in topic_patterns['personal_info']):
-            topic_responses['personal_info'] = [
-                "Why do you need my personal details? That's sensitive information.",
-                "How do I know this information won't be misused?",
-                "I'm not comfortable sharing account details with someone I don't know.",
-                "Can I verify your identity first before sharing anything?",
-                "What will you do with this information?",
-                "My bank portal shows everything. Why would I need to share it with you?",
-            ]
-        
-        if 'urgency' in detected_topics and any(word in msg_lower for word in topic_patterns['urgency']):
-            topic_responses['urgency'] = [
-                "Why the rush? Real bank actions aren't this sudden.",
-                "You sound like you're trying to pressure me. That's suspicious.",
-                "I don't make decisions under pressure. Let me take time to verify.",
-                "If it's really urgent, I'll call my bank directly.",
-                "This urgency is making me even more suspicious.",
-                "Legitimate banks give you time to respond. This feels like a trap.",
-            ]
-        
-        if 'refund' in detected_topics and any(word in msg_lower for word in topic_patterns['refund']):
-            topic_responses['refund'] = [
-                "How did you get my number to tell me about my package?",
-                "Why can't I see this in my app? Let me check myself.",
-                "Customs duty? I wasn't expecting any deliveries.",
-                "Why do I need to pay for my own refund? That doesn't make sense.",
-                "Let me contact the courier company directly instead.",
-            ]
-        
-        if 'prize' in detected_topics and any(word in msg_lower for word in topic_patterns['prize']):
-            topic_responses['prize'] = [
-                "I never entered any contest. How did I win?",
-                "This is a scam. I never participated in KBC.",
-                "If I won a lottery, I'd have proof. You're lying.",
-                "How do you have my number if I didn't register anywhere?",
-                "I'm not falling for this prize scam.",
-            ]
-        
-        if 'loan' in detected_topics and any(word in msg_lower for word in topic_patterns['loan']):
-            topic_responses['loan'] = [
-                "I never applied for a loan. How is it approved?",
-                "Why would I pay a fee upfront for a loan?",
-                "Processing fees are deducted from the loan amount, not paid separately.",
-                "This seems like a scam. Real banks don't work this way.",
-                "I don't need a loan. Stop calling.",
-            ]
-        
-        if 'job' in detected_topics and any(word in msg_lower for word in topic_patterns['job']):
-            topic_responses['job'] = [
-                "I never applied for a job. How did you get my number?",
-                "Part-time job offering ₹50,000/week? That's not realistic.",
-                "Why would I get hired without an interview?",
-                "What company are you from? Let me verify online first.",
-                "This sounds too good to be true. I'm not interested.",
-            ]
-        
-        if 'investment' in detected_topics and any(word in msg_lower for word in topic_patterns['investment']):
-            topic_responses['investment'] = [
-                "Double money in 48 hours? That's impossible.",
-                "No investment offers guaranteed 30% monthly returns.",
-                "I'm not investing with strangers. Get lost.",
-                "If this were real, everyone would be rich.",
-                "This is clearly a scam. I'm not falling for it.",
-            ]
-        
-        if 'threat' in detected_topics and any(word in msg_lower for word in topic_patterns['threat']):
-            topic_responses['threat'] = [
-                "I haven't done anything illegal. This is harassment.",
-                "If there really was a complaint, I'd be contacted officially.",
-                "Stop threatening me. You sound like a scammer.",
-                "Why would Cyber Cell contact me on WhatsApp?",
-                "I'm calling the real police about this threat.",
-            ]
-        
-        # Select response based on detected topics (priority order)
-        if topic_responses:
-            # Prioritize certain topics based on severity
-            priority_topics = ['threat', 'security', 'payment', 'personal_info', 'link', 'suspension', 'urgency', 'kyc', 'refund', 'prize', 'loan', 'job', 'investment']
-            for topic in priority_topics:
-                if topic in topic_responses:
-                    # Vary response based on conversation length
-                    available_responses = topic_responses[topic]
-                    # Use different responses as conversation progresses (avoid repetition)
-                    response_index = (msg_count - 1) % len(available_responses)
-                    reply = available_responses[response_index]
-                    logger.info(f"🔷 [MOCK MODE] Topic: {topic} | Msg#{msg_count} | Reply: {reply}")
-                    return reply
-        
-        # Fallback responses if no specific topic matched
-        if msg_count <= 1:
-            fallback = [
-                "I'm sorry, I don't understand. Can you explain this more clearly?",
-                "This message seems suspicious to me. Who are you exactly?",
-                "I need to verify this with my bank directly. What's going on?",
-                "This doesn't seem like an official message. How did you get my number?",
-                "Can you provide some proof that you're really from my bank?",
-            ]
-        elif msg_count <= 3:
-            fallback = [
-                "Tell me more about this. I still have doubts.",
-                "I'm not sure I should trust this. Can you prove it?",
-                "Let me verify this information first before I do anything.",
-                "I have more questions. Can you answer them?",
-                "This all seems very suspicious to me.",
-                "I don't believe you. Prove it.",
-            ]
-        else:
-            fallback = [
-                "Okay, but I need more proof before I do anything.",
-                "Let me think about this and verify with my bank.",
-                "I'm still not comfortable with this whole situation.",
-                "What happens if I don't do this immediately?",
-                "Can I get an official letter from your bank about this?",
-                "I've been researching and this looks like a classic scam.",
-            ]
-        
-        response_index = (msg_count - 1) % len(fallback)
-        reply = fallback[response_index]
-        logger.info(f"🔷 [MOCK MODE] Fallback (msg #{msg_count}): {reply}")
-        return reply
+        return _mock_reply(session)
+    
+    persona, stage, system_prompt = select_persona(session, channel=channel, locale=locale)
+    cache_key = _reply_cache_key(session, persona, stage)
+    if cache_key:
+        cached_reply = REPLY_CACHE.get(cache_key)
+        if cached_reply:
+            return cached_reply
+    
+    messages = build_reply_messages(session, system_prompt)
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
-            temperature=0.6,
-            max_tokens=100,
-            timeout=10  # 10 second timeout
-        )
+        LLM_CALLS.inc("reply")
+        with STAGE_SECONDS.time("llm_reply"):
+            response = await client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=messages,
+                temperature=0.6,
+                max_tokens=100,
+                timeout=10  # 10 second timeout
+            )
         reply = response.choices[0].message.content.strip()
+        if cache_key:
+            REPLY_CACHE.put(cache_key, reply)
         return reply
     except APITimeoutError:
+        LLM_ERRORS.inc("reply", "timeout")
         logger.error("❌ OpenAI API timeout")
-        print("❌ OpenAI API timeout")
-        return "Connection is slow. Can you resend that?"
+        return FALLBACK_REPLIES[0]
     except APIError as e:
-        logger.error(f"❌ OpenAI API error: {e}")
-        print(f"❌ OpenAI API error: {e}")
-        return "I'm having technical difficulties. Can you try again in a moment?"
+        LLM_ERRORS.inc("reply", "api")
+        logger.error("❌ OpenAI API error: %s", e)
+        return FALLBACK_REPLIES[1]
     except Exception as e:
-        logger.error(f"❌ Agent reply generation error: {type(e).__name__}: {e}")
-        print(f"❌ CRITICAL ERROR in agent reply: {type(e).__name__}: {e}")
-        import traceback
-        traceback.print_exc()
-        return "Can you please explain that again? I'm a bit confused."
+        LLM_ERRORS.inc("reply", "other")
+        logger.exception("❌ Agent reply generation error: %s: %s", type(e).__name__, e)
+        return FALLBACK_REPLIES[2]
 
-def extract_intelligence(session: Dict[str, Any], latest_message: str) -> Dict[str, Any]:
+async def stream_agent_reply(session: Dict[str, Any], channel: str = "SMS", locale: str = "IN",
+                             campaign: Optional[Campaign] = None) -> AsyncIterator[str]:
     """
-    Extract intelligence using combined LLM + regex approach.
-    Returns extracted data with validated fields + keywords.
+    Stream the agent reply token by token as the LLM produces it.
+    Mock, cached and campaign-pooled replies arrive as a single chunk.
     """
-    # Import detector keywords
-    from detector import SCAM_KEYWORDS
+    opening_turn = campaign is not None and len(session["conversationHistory"]) <= 1
+    if opening_turn:
+        pooled_reply = CAMPAIGNS.pick_reply(campaign)
+        if pooled_reply:
+            yield pooled_reply
+            return
     
-    history = session["conversationHistory"]
+    if MOCK_MODE:
+        yield _mock_reply(session)
+        return
+    
+    persona, stage, system_prompt = select_persona(session, channel=channel, locale=locale)
+    cache_key = _reply_cache_key(session, persona, stage)
+    if cache_key:
+        cached_reply = REPLY_CACHE.get(cache_key)
+        if cached_reply:
+            yield cached_reply
+            return
+    
+    messages = build_reply_messages(session, system_prompt)
+    chunks: List[str] = []
+    LLM_CALLS.inc("stream")
+    started = time.perf_counter()
+    try:
+        stream = await client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=messages,
+            temperature=0.6,
+            max_tokens=100,
+            timeout=10,  # 10 second timeout
+            stream=True
+        )
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                chunks.append(token)
+                yield token
+    except Exception as e:
+        LLM_ERRORS.inc("stream", _error_kind(e))
+        logger.error(f"❌ Agent reply streaming error: {type(e).__name__}: {e}")
+        # A partial reply is not a reply: let the caller replace it
+        if chunks:
+            raise
+        # Nothing sent yet - fall back to a canned reply like generate_agent_reply
+        yield FALLBACK_REPLIES[0] if isinstance(e, APITimeoutError) else FALLBACK_REPLIES[1]
+        return
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, "llm_reply")
     
-    # First: use LLM to identify candidate extractions
+    reply = "".join(chunks).strip()
+    if reply:
+        if cache_key:
+            REPLY_CACHE.put(cache_key, reply)
+        if opening_turn:
+            CAMPAIGNS.add_reply(campaign, reply)
+
+async def _llm_extract(latest_message: str) -> Dict[str, List[str]]:
+    """Ask the LLM for candidate identifiers in the latest message."""
     extraction_prompt = (
         f"From this conversation, extract any UPI IDs (format: name@bank), "
         f"phone numbers (Indian format), bank account numbers (9-18 digits), "
@@ -391,83 +572,191 @@ def extract_intelligence(session: Dict[str, Any], latest_message: str) -> Dict[s
         {"role": "user", "content": extraction_prompt}
     ]
     
-    extracted = {
-        "upi": [],
-        "accounts": [],
-        "urls": [],
-        "phones": [],
-        "suspiciousKeywords": []
-    }
-    
-    # Skip LLM extraction in mock mode - regex is enough
-    if not MOCK_MODE:
-        try:
-            response = client.chat.completions.create(
+    try:
+        EXTRACTION_STATS["llmCalls"] += 1
+        LLM_CALLS.inc("extraction")
+        with STAGE_SECONDS.time("llm_extraction"):
+            response = await client.chat.completions.create(
                 model="gpt-3.5-turbo",
                 messages=messages,
                 temperature=0.1,  # Low temperature for consistency
                 max_tokens=200
             )
-            content = response.choices[0].message.content.strip()
-            
-            # Extract JSON from response
-            start = content.find('{')
-            end = content.rfind('}') + 1
-            if start != -1 and end > start:
-                json_str = content[start:end]
-                llm_extracted = json.loads(json_str)
-                extracted = {k: v if isinstance(v, list) else [] for k, v in llm_extracted.items()}
-                extracted["suspiciousKeywords"] = []
-        except Exception as e:
-            print(f"⚠️ LLM extraction error: {e}")
-    
-    # Extract suspicious keywords
-    message_lower = latest_message.lower()
-    found_keywords = []
-    for keyword in SCAM_KEYWORDS:
-        if keyword.lower() in message_lower:
-            found_keywords.append(keyword)
-    extracted["suspiciousKeywords"] = list(set(found_keywords))  # Remove duplicates
-    
-    # Second: Validate and enhance with regex patterns
-    full_text = latest_message
-    
-    # UPI ID pattern: name@bank
-    upi_pattern = r'\b[a-zA-Z0-9.\-_]{2,}@[a-zA-Z]{2,}\b'
-    upi_matches = re.findall(upi_pattern, full_text)
-    extracted["upi"] = list(set(extracted["upi"] + upi_matches))
-    
-    # Indian phone pattern: +91XXXXXXXXXX or 0XXXXXXXXXX or 6-9 digit start
-    phone_pattern = r'(?:\+91|0)?[\s]?[6-9]\d{9}(?!\d)'
-    phone_matches = re.findall(phone_pattern, full_text)
-    extracted["phones"] = list(set(extracted["phones"] + phone_matches))
-    
-    # URL pattern - matches http(s), www, or domain.tld patterns
-    url_patterns = [
-        r'https?://[^\s]+',          # http:// or https://
-        r'www\.[^\s]+',              # www.example.com
-        r'(?<![.\w])[a-z0-9-]+\.[a-z]{2,}(?:\.[a-z]{2})?(?:/[^\s]*)?'  # example.com
-    ]
-    url_matches = []
-    for pattern in url_patterns:
-        url_matches.extend(re.findall(pattern, full_text))
-    extracted["urls"] = list(set(extracted["urls"] + url_matches))
-    
-    # Bank account pattern: 9-18 consecutive digits (validate not part of phone)
-    account_pattern = r'\b\d{9,18}\b'
-    account_matches = re.findall(account_pattern, full_text)
-    # Filter out numbers that look like phones
-    extracted["accounts"] = list(set([
-        acc for acc in extracted["accounts"] + account_matches 
-        if not re.match(r'[6-9]\d{9}', acc)  # Exclude phone-like patterns
-    ]))
-    
-    logger.info(f"Extracted intelligence: UPI={len(extracted['upi'])}, Phones={len(extracted['phones'])}, "
-                f"URLs={len(extracted['urls'])}, Accounts={len(extracted['accounts'])}, "
-                f"Keywords={len(extracted['suspiciousKeywords'])}")
+        content = response.choices[0].message.content.strip()
+        
+        # Extract JSON from response
+        start = content.find('{')
+        end = content.rfind('}') + 1
+        if start != -1 and end > start:
+            json_str = content[start:end]
+            llm_extracted = json.loads(json_str)
+            return {k: [str(x) for x in v] for k, v in llm_extracted.items() if isinstance(v, list)}
+    except Exception as e:
+        LLM_ERRORS.inc("extraction", _error_kind(e))
+        logger.warning("⚠️ LLM extraction error: %s", e)
+    return {}
+
+def _merge_extraction(latest_message: str, regex_extracted: Dict[str, List[str]],
+                      llm_extracted: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Merge regex and LLM candidates, tag each item's tier and add keywords."""
+    # Import detector keyword matcher
+    from detector import match_keywords
+    
+    extracted: Dict[str, Any] = {"suspiciousKeywords": match_keywords(latest_message)}
+    tiers: Dict[str, Dict[str, str]] = {}
+    for key, regex_values in regex_extracted.items():
+        item_tiers = {value: "llm" for value in llm_extracted.get(key, [])}
+        item_tiers.update((value, "regex") for value in regex_values)
+        extracted[key] = list(item_tiers)
+        tiers[key] = item_tiers
+    extracted["tiers"] = tiers
+    
+    for item_tiers in tiers.values():
+        for tier in item_tiers.values():
+            EXTRACTION_STATS["regexItems" if tier == "regex" else "llmItems"] += 1
+    
+    turn_logger.info("Extracted intelligence: UPI=%d, Phones=%d, URLs=%d, Accounts=%d, Keywords=%d",
+                     len(extracted["upi"]), len(extracted["phones"]), len(extracted["urls"]),
+                     len(extracted["accounts"]), len(extracted["suspiciousKeywords"]))
     
     return extracted
 
+@traced("extract_intelligence")
+async def extract_intelligence(session: Dict[str, Any], latest_message: str) -> Dict[str, Any]:
+    """
+    Extract intelligence using combined LLM + regex approach.
+    Returns extracted data with validated fields + keywords, plus a "tiers"
+    map recording whether each item came from the "regex" or "llm" tier.
+    
+    EXTRACTION_MODE=llm always asks the LLM. EXTRACTION_MODE=tiered runs the
+    deterministic extractor first and only asks the LLM when the message
+    looks like it hides identifiers (spelled-out digits, "at the rate", ...).
+    """
+    # First: deterministic single-pass regex extraction
+    regex_extracted = extract_identifiers(latest_message)
+    
+    # Second: LLM extraction, skipped in mock mode and for plain messages in tiered mode
+    llm_extracted: Dict[str, List[str]] = {}
+    if not MOCK_MODE:
+        if EXTRACTION_MODE != "tiered" or looks_obfuscated(latest_message):
+            llm_extracted = await _llm_extract(latest_message)
+        else:
+            EXTRACTION_STATS["llmSkipped"] += 1
+    
+    return _merge_extraction(latest_message, regex_extracted, llm_extracted)
+
+def get_extraction_stats() -> Dict[str, int]:
+    """Counters for LLM extraction calls made/skipped, combined calls and items found per tier."""
+    return dict(EXTRACTION_STATS)
+
+# ---- Combined reply + extraction (one structured LLM call) ----
+
+class CombinedTurn(BaseModel):
+    """Schema for the structured completion used when COMBINED_LLM_CALL is on."""
+    reply: str = Field(min_length=1)
+    upi: List[str] = []
+    accounts: List[str] = []
+    urls: List[str] = []
+    phones: List[str] = []
+    
+    @field_validator("upi", "accounts", "urls", "phones", mode="before")
+    @classmethod
+    def coerce_items(cls, v):
+        """LLMs sometimes return null or bare numbers for identifier lists."""
+        if v is None:
+            return []
+        if isinstance(v, list):
+            return [str(item) for item in v if item is not None]
+        return v
+
+COMBINED_INSTRUCTIONS = (
+    "\n\nAlso extract any UPI IDs (format: name@bank), bank account numbers (9-18 digits), "
+    "URLs and Indian phone numbers that the other person mentioned in their LAST message.\n"
+    "Respond ONLY with a JSON object of this exact shape:\n"
+    '{"reply": "<your reply>", "upi": [], "accounts": [], "urls": [], "phones": []}'
+)
+
+async def _two_call_turn(session: Dict[str, Any], latest_message: str,
+                         channel: str, locale: str) -> Tuple[str, Dict[str, Any]]:
+    """Generate reply and extract intelligence with two concurrent LLM calls."""
+    agent_reply, extracted = await asyncio.gather(
+        generate_agent_reply(session, channel=channel, locale=locale),
+        extract_intelligence(session, latest_message)
+    )
+    return agent_reply, extracted
+
+async def generate_reply_and_intelligence(session: Dict[str, Any], latest_message: str,
+                                          channel: str = "SMS", locale: str = "IN",
+                                          campaign: Optional[Campaign] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Produce the agent reply and extracted intelligence for one engaged turn.
+    If the scammer's opening message belongs to a known campaign whose reply
+    pool is full, a pooled opening reply is reused and only extraction runs.
+    """
+    opening_turn = campaign is not None and len(session["conversationHistory"]) <= 1
+    if opening_turn:
+        pooled_reply = CAMPAIGNS.pick_reply(campaign)
+        if pooled_reply:
+            return pooled_reply, await extract_intelligence(session, latest_message)
+    
+    reply, extracted = await _generate_turn(session, latest_message, channel, locale)
+    if opening_turn and reply not in FALLBACK_REPLIES:
+        CAMPAIGNS.add_reply(campaign, reply)
+    return reply, extracted
+
+@traced("llm_turn")
+async def _generate_turn(session: Dict[str, Any], latest_message: str,
+                         channel: str, locale: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Generate reply and intelligence for a turn.
+    With COMBINED_LLM_CALL=true a single JSON-mode completion returns both,
+    validated against CombinedTurn. If the call or validation fails, falls
+    back to the separate reply + extraction calls.
+    """
+    if MOCK_MODE or not COMBINED_LLM_CALL:
+        return await _two_call_turn(session, latest_message, channel, locale)
+    
+    persona, stage, system_prompt = select_persona(session, channel=channel, locale=locale)
+    cache_key = _reply_cache_key(session, persona, stage)
+    if cache_key:
+        cached_reply = REPLY_CACHE.get(cache_key)
+        if cached_reply:
+            # Reply is pooled - only the extraction call is needed
+            return cached_reply, await extract_intelligence(session, latest_message)
+    
+    messages = build_reply_messages(session, system_prompt + COMBINED_INSTRUCTIONS)
+    
+    try:
+        EXTRACTION_STATS["combinedCalls"] += 1
+        LLM_CALLS.inc("combined")
+        with STAGE_SECONDS.time("llm_combined"):
+            response = await client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=messages,
+                temperature=0.6,
+                max_tokens=300,
+                timeout=10,  # 10 second timeout
+                response_format={"type": "json_object"}
+            )
+        turn = CombinedTurn.model_validate_json(response.choices[0].message.content or "")
+    except Exception as e:
+        EXTRACTION_STATS["combinedFallbacks"] += 1
+        LLM_ERRORS.inc("combined", _error_kind(e))
+        logger.warning(f"⚠️ Combined LLM call failed, falling back to two calls: {type(e).__name__}: {e}")
+        return await _two_call_turn(session, latest_message, channel, locale)
+    
+    llm_extracted = {
+        "upi": turn.upi,
+        "accounts": turn.accounts,
+        "urls": turn.urls,
+        "phones": turn.phones
+    }
+    extracted = _merge_extraction(latest_message, extract_identifiers(latest_message), llm_extracted)
+    reply = turn.reply.strip()
+    if cache_key:
+        REPLY_CACHE.put(cache_key, reply)
+    return reply, extracted
+
 def should_continue_engagement(session: Dict[str, Any], max_turns: int = 20) -> bool:
     """
     Determine if engagement should continue or terminate.
@@ -0,0 +1,63 @@
+from typing import Any, Dict, List, Tuple
+
+# Agent notes are kept as de-duplicated (kind, value) events in insertion order
+# (a dict used as an ordered set) and rendered to text only when a response or
+# callback is built, so notes grow with distinct observations, not turns.
+NoteEvents = Dict[Tuple[str, str], None]
+
+MAX_NOTE_EVENTS = 100
+TRUNCATED = ("truncated", "")
+
+# Render order and labels; "note" events are free text rendered as-is
+NOTE_SECTIONS = [
+    ("campaign", "Campaign"),
+    ("upi", "UPI IDs"),
+    ("account", "Bank accounts"),
+    ("link", "Suspicious links"),
+    ("phone", "Phone numbers"),
+    ("keyword", "Keywords"),
+]
+IDENTIFIER_KINDS = ("upi", "account", "link", "phone", "keyword")
+
+
+def record_note(session: Any, kind: str, value: str) -> bool:
+    """Record a note event once. Returns True if it was new."""
+    events: NoteEvents = session["noteEvents"]
+    key = (kind, value)
+    if key in events:
+        return False
+    if len(events) >= MAX_NOTE_EVENTS:
+        events[TRUNCATED] = None
+        return False
+    events[key] = None
+    return True
+
+
+def record_stage(session: Any, stage: str):
+    """Record a conversation stage change (first, money, data, ...)."""
+    events: NoteEvents = session["noteEvents"]
+    last_stage = next((value for kind, value in reversed(events) if kind == "stage"), None)
+    if stage != last_stage:
+        record_note(session, "stage", stage)
+
+
+def render_agent_notes(events: NoteEvents, engaged: bool = True) -> str:
+    """Render note events as the agentNotes text."""
+    grouped: Dict[str, List[str]] = {}
+    for kind, value in events:
+        grouped.setdefault(kind, []).append(value)
+
+    sections = []
+    if grouped.get("campaign"):
+        sections.append(f"Campaign: {', '.join(grouped['campaign'])}")
+    if engaged and not any(grouped.get(kind) for kind in IDENTIFIER_KINDS):
+        sections.append("Gathering intelligence...")
+    for kind, label in NOTE_SECTIONS[1:]:
+        if grouped.get(kind):
+            sections.append(f"{label}: {', '.join(grouped[kind])}")
+    if grouped.get("stage"):
+        sections.append(f"Stages: {' → '.join(grouped['stage'])}")
+    sections.extend(grouped.get("note", ()))
+    if TRUNCATED in events:
+        sections.append("(further observations not recorded)")
+    return " | ".join(sections)
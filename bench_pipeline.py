@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark and accuracy check for detector, extractor and intel_store.
+
+Measures messages/second and memory per call for detect_scam, the regex path
+of extract_intelligence and update_extracted_intelligence over the labeled
+scam/ham corpus in scam_corpus.py. It also reports detection precision/recall
+and how often each scam keyword fires on legitimate (ham) messages.
+
+Usage:
+    python bench_pipeline.py                    # compare against bench_baseline.json
+    python bench_pipeline.py --update-baseline  # record a new baseline
+    python bench_pipeline.py --threshold 0.2    # allowed slowdown / memory growth
+    python bench_pipeline.py --strict-throughput  # fail on slowdowns too
+
+Exits with status 1 on an accuracy or noise regression: lower precision or
+recall, or more false positives / ham keyword hits. Throughput is divided by
+the speed of a fixed pure-Python calibration loop, so baselines recorded on
+another machine stay roughly comparable; being approximate, slowdowns below
+baseline*(1-threshold) are only reported unless --strict-throughput is given.
+Memory above baseline*(1+threshold) is reported too, and fails the check
+when the Python version matches the baseline's.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Callable, Dict, List
+
+# The regex path of extract_intelligence is what runs in mock mode
+os.environ.setdefault("MOCK_MODE", "true")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+import logging
+logging.disable(logging.INFO)
+
+import agent
+from detector import detect_scam, match_keywords
+from intel_store import update_extracted_intelligence
+from scam_corpus import labeled_corpus
+from session_types import Session
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+SESSION_LENGTH = 10  # messages folded into one session by update_extracted_intelligence
+
+
+def bench_functions(messages: List[str]) -> Dict[str, Callable[[], None]]:
+    """One callable per benchmarked function; each processes the whole corpus once."""
+    loop = asyncio.new_event_loop()
+    extracted = [loop.run_until_complete(agent.extract_intelligence({}, text)) for text in messages]
+
+    def run_detect():
+        for text in messages:
+            detect_scam(text)
+
+    async def extract_all():
+        for text in messages:
+            await agent.extract_intelligence({}, text)
+
+    def run_extract():
+        loop.run_until_complete(extract_all())
+
+    def run_update():
+        session = None
+        for i, (text, extract) in enumerate(zip(messages, extracted)):
+            if i % SESSION_LENGTH == 0:
+                session = Session(f"bench-{i}", 8)
+            update_extracted_intelligence(session, extract, text)
+
+    return {
+        "detect_scam": run_detect,
+        "extract_intelligence": run_extract,
+        "update_extracted_intelligence": run_update,
+    }
+
+
+def calibrate(repeat: int, ops: int = 200000) -> float:
+    """Operations/second of a fixed string and dict workload, best of `repeat`."""
+    words = ["account", "verify", "urgent", "kyc", "upi", "transfer", "block", "link"]
+    best = float("inf")
+    for _ in range(repeat):
+        counts: Dict[str, int] = {}
+        start = time.perf_counter()
+        for i in range(ops):
+            word = words[i % len(words)].upper().lower()
+            counts[word] = counts.get(word, 0) + 1
+        best = min(best, time.perf_counter() - start)
+    return round(ops / best, 1)
+
+
+def measure(fn: Callable[[], None], calls: int, repeat: int, rounds: int) -> Dict[str, float]:
+    """Best-of-`repeat` throughput, plus traced memory for one pass."""
+    fn()  # warm-up (lazy caches, first-call imports)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            fn()
+        best = min(best, time.perf_counter() - start)
+
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.collect()
+    return {
+        "messagesPerSecond": round(calls * rounds / best, 1),
+        "peakBytesPerPass": peak,
+        # live blocks left behind per message (objects kept alive, e.g. in sessions)
+        "retainedBlocksPerMessage": round((sys.getallocatedblocks() - blocks_before) / calls, 2),
+    }
+
+
+def accuracy(corpus) -> Dict[str, Any]:
+    """Detection precision/recall and per-keyword hits on ham messages."""
+    tp = fp = fn = 0
+    false_positives, false_negatives = [], []
+    ham_hits: Counter = Counter()
+    for text, is_scam in corpus:
+        detected = detect_scam(text)
+        if detected and is_scam:
+            tp += 1
+        elif detected:
+            fp += 1
+            false_positives.append(text)
+        elif is_scam:
+            fn += 1
+            false_negatives.append(text)
+        if not is_scam:
+            ham_hits.update(match_keywords(text.lower()))
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    return {
+        "messages": len(corpus),
+        "precision": round(precision, 4),
+        "recall": round(recall, 4),
+        "f1": round(2 * precision * recall / (precision + recall), 4) if precision + recall else 0.0,
+        "falsePositives": false_positives,
+        "falseNegatives": false_negatives,
+        "hamKeywordHits": dict(ham_hits.most_common()),
+    }
+
+
+def relative_throughput(report: Dict[str, Any], name: str) -> float:
+    """msg/s per calibration op/s (absolute msg/s for baselines without calibration)."""
+    stats = report["functions"][name]
+    if "calibrationOpsPerSecond" not in report:
+        return stats["messagesPerSecond"]
+    return stats["messagesPerSecond"] / report["calibrationOpsPerSecond"]
+
+
+def find_regressions(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float,
+                     strict_throughput: bool = False):
+    """(problems that fail the check, advisory warnings)."""
+    problems, warnings = [], []
+    normalized = "calibrationOpsPerSecond" in baseline
+    same_python = current["python"] == baseline.get("python")
+    for name, stats in current["functions"].items():
+        base = baseline.get("functions", {}).get(name)
+        if not base:
+            continue
+        ratio = (relative_throughput(current, name) if normalized else stats["messagesPerSecond"]) \
+            / relative_throughput(baseline, name)
+        if ratio < 1 - threshold:
+            kind = "calibrated throughput" if normalized else "throughput"
+            (problems if strict_throughput else warnings).append(
+                f"{name}: {kind} {ratio:.0%} of baseline ({stats['messagesPerSecond']:.0f} msg/s)")
+        if stats["peakBytesPerPass"] > base["peakBytesPerPass"] * (1 + threshold):
+            (problems if same_python else warnings).append(
+                f"{name}: peak {stats['peakBytesPerPass']} B > baseline {base['peakBytesPerPass']} B")
+
+    acc, base_acc = current["accuracy"], baseline.get("accuracy", {})
+    for metric in ("precision", "recall"):
+        if metric in base_acc and acc[metric] < base_acc[metric]:
+            problems.append(f"{metric}: {acc[metric]} < baseline {base_acc[metric]}")
+    if "falsePositives" in base_acc and len(acc["falsePositives"]) > len(base_acc["falsePositives"]):
+        problems.append(f"false positives: {len(acc['falsePositives'])} "
+                        f"> baseline {len(base_acc['falsePositives'])}")
+    ham_hits = sum(acc["hamKeywordHits"].values())
+    base_ham_hits = sum(base_acc.get("hamKeywordHits", {}).values())
+    if "hamKeywordHits" in base_acc and ham_hits > base_ham_hits:
+        problems.append(f"keyword hits on ham: {ham_hits} > baseline {base_ham_hits}")
+    return problems, warnings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=50, help="corpus passes per timing run")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs (best one counts)")
+    parser.add_argument("--threshold", type=float, default=0.15)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--strict-throughput", action="store_true",
+                        help="fail (not just warn) when calibrated throughput regresses")
+    args = parser.parse_args()
+
+    corpus = labeled_corpus()
+    messages = [text for text, _ in corpus]
+    report = {
+        "python": sys.version.split()[0],
+        "calibrationOpsPerSecond": calibrate(args.repeat),
+        "functions": {name: measure(fn, len(messages), args.repeat, args.rounds)
+                      for name, fn in bench_functions(messages).items()},
+        "accuracy": accuracy(corpus),
+    }
+
+    print("=" * 78)
+    print(f"PIPELINE BENCHMARK ({len(messages)} messages x {args.rounds} rounds, best of {args.repeat})")
+    print("=" * 78)
+    print(f"Calibration loop: {report['calibrationOpsPerSecond']:.0f} ops/s")
+    print(f"{'function':<32}{'msg/s':>12}{'peak KB/pass':>16}{'retained blk/msg':>18}")
+    for name, stats in report["functions"].items():
+        print(f"{name:<32}{stats['messagesPerSecond']:>12.0f}{stats['peakBytesPerPass'] / 1024:>16.1f}"
+              f"{stats['retainedBlocksPerMessage']:>18.2f}")
+    acc = report["accuracy"]
+    print(f"\n🎯 Detection: precision {acc['precision']:.3f}  recall {acc['recall']:.3f}  f1 {acc['f1']:.3f}")
+    for text in acc["falsePositives"]:
+        print(f"   ⚠️ false positive: {text}")
+    for text in acc["falseNegatives"]:
+        print(f"   ⚠️ missed scam: {text}")
+    noisy = ", ".join(f"{keyword} ({count})" for keyword, count in list(acc["hamKeywordHits"].items())[:8])
+    print(f"🔊 Keywords firing on ham: {noisy}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"\n✅ Baseline written to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\n⚠️ No baseline at {args.baseline}; run with --update-baseline to record one")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    problems, warnings = find_regressions(report, baseline, args.threshold, args.strict_throughput)
+    for warning in warnings:
+        print(f"\n⚠️ {warning}", end="")
+    if warnings:
+        print()
+    if problems:
+        print(f"\n❌ Regressions against {os.path.basename(args.baseline)} (threshold {args.threshold:.0%}):")
+        for problem in problems:
+            print(f"   - {problem}")
+        sys.exit(1)
+    print(f"\n✅ No regressions against {os.path.basename(args.baseline)} (threshold {args.threshold:.0%})")
+
+
+if __name__ == "__main__":
+    main()
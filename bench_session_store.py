@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-operation latency of the session-store backends:
+in-memory dict, SQLite write-through and SQLite with the write-behind buffer.
+
+Usage: python bench_session_store.py [--sessions 2000] [--turns 5]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import session_store
+from session_backends import MemorySessionBackend, SQLiteSessionBackend
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run_workload(sessions: int, turns: int):
+    """One simulated conversation per session: create, turns, engage, claim callback."""
+    timings = {"get_session": [], "update_session": [], "save_session": [], "claim_callback": []}
+
+    def timed(name, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings[name].append((time.perf_counter() - start) * 1e6)
+        return result
+
+    for turn in range(turns):
+        for i in range(sessions):
+            session_id = f"bench-{i}"
+            timed("get_session", session_store.get_session, session_id)
+            session = timed("update_session", session_store.update_session, session_id, {
+                "sender": "scammer",
+                "text": f"Your account will be blocked, send Rs {turn * 100} to verify@upi now",
+                "timestamp": "2026-01-21T10:15:30Z"
+            })
+            session["campaignId"] = f"cmp-{turn}"
+            timed("save_session", session_store.save_session, session)
+            if turn == turns - 1:
+                timed("claim_callback", session_store.claim_callback, session_id)
+    session_store.flush_sessions()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=5)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    restore = session_store._restore
+    backends = {
+        "memory": lambda: MemorySessionBackend(restore),
+        "sqlite (write-through)": lambda: SQLiteSessionBackend(
+            os.path.join(tmpdir.name, "through.db"), restore, flush_interval=0),
+        "sqlite (write-behind)": lambda: SQLiteSessionBackend(
+            os.path.join(tmpdir.name, "behind.db"), restore, flush_interval=0.05),
+    }
+
+    print("=" * 78)
+    print(f"SESSION STORE BENCHMARK ({args.sessions} sessions x {args.turns} turns)")
+    print("=" * 78)
+    print(f"{'backend':<24}{'operation':<18}{'mean µs':>10}{'p50 µs':>10}{'p99 µs':>10}{'ops/s':>10}")
+    try:
+        for name, factory in backends.items():
+            session_store.BACKEND = factory()
+            start = time.perf_counter()
+            timings = run_workload(args.sessions, args.turns)
+            elapsed = time.perf_counter() - start
+            for op, samples in timings.items():
+                mean = statistics.fmean(samples)
+                print(f"{name:<24}{op:<18}{mean:>10.1f}{percentile(samples, 50):>10.1f}"
+                      f"{percentile(samples, 99):>10.1f}{1e6 / mean:>10.0f}")
+            total_ops = sum(len(samples) for samples in timings.values())
+            print(f"{name:<24}{'total':<18}{'':>30}{total_ops / elapsed:>10.0f}")
+            session_store.BACKEND.close()
+    finally:
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
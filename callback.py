@@ -1,30 +1,45 @@
 import requests
+import asyncio
+import httpx
 import json
-from typing import Dict, Any
+import os
+import random
+from typing import Dict, Any, Callable, Optional
 import logging
 
+from metrics import CALLBACK_DELIVERIES, STAGE_SECONDS
+from outbox import CallbackOutbox
+
 logger = logging.getLogger(__name__)
 
-GUVI_CALLBACK_ENDPOINT = "https://hackathon.guvi.in/api/updateHoneyPotFinalResult"
+GUVI_CALLBACK_ENDPOINT = os.getenv(
+    "GUVI_CALLBACK_ENDPOINT", "https://hackathon.guvi.in/api/updateHoneyPotFinalResult"
+)
+
+def build_callback_payload(session_summary: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the GUVI final-result payload from a session summary."""
+    return {
+        "sessionId": session_summary["sessionId"],
+        "scamDetected": session_summary["scamDetected"],
+        "totalMessagesExchanged": session_summary["totalMessagesExchanged"],
+        "extractedIntelligence": session_summary["extractedIntelligence"],
+        "agentNotes": session_summary["agentNotes"]
+    }
 
 def send_final_result_to_guvi(session_summary: Dict[str, Any]) -> bool:
     """
     Send final engagement result to GUVI evaluation endpoint.
+    Blocking; the server uses CallbackDispatcher instead.
     
     Returns:
         True if successful, False otherwise
     """
-    payload = {
-        "sessionId": session_summary["sessionId"],
-        "scamDetected": session_summary["scamDetected"],
-        "totalMessagesExchanged": session_summary["totalMessagesExchanged"],
-        "extractedIntelligence": session_summary["extractedIntelligence"],
-        "agentNotes": session_summary["agentNotes"]
-    }
+    payload = build_callback_payload(session_summary)
     
     try:
-        logger.info(f"Sending GUVI callback for session {session_summary['sessionId']}")
-        logger.debug(f"Payload: {json.dumps(payload, indent=2)}")
+        logger.info("Sending GUVI callback for session %s", session_summary["sessionId"])
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Payload: %s", json.dumps(payload, indent=2))
         
         response = requests.post(
             GUVI_CALLBACK_ENDPOINT,
@@ -34,8 +49,8 @@ def send_final_result_to_guvi(session_summary: Dict[str, Any]) -> bool:
         )
         
         if response.status_code == 200:
-            logger.info(f"✅ GUVI callback sent successfully for session {session_summary['sessionId']}")
-            logger.debug(f"Response: {response.text}")
+            logger.info("✅ GUVI callback sent successfully for session %s", session_summary["sessionId"])
+            logger.debug("Response: %s", response.text)
             return True
         else:
             logger.error(f"❌ GUVI callback failed with status {response.status_code}")
@@ -48,3 +63,228 @@ def send_final_result_to_guvi(session_summary: Dict[str, Any]) -> bool:
     except Exception as e:
         logger.error(f"❌ Unexpected error during GUVI callback: {e}")
         return False
+
+
+class CallbackDispatcher:
+    """
+    Background GUVI callback delivery.
+
+    /inbound enqueues a payload and returns immediately. A pool of worker
+    tasks posts payloads over one shared keep-alive httpx client, with at
+    most `max_concurrency` requests in flight. Failed deliveries are
+    re-queued after exponential backoff with full jitter, so a sleeping
+    retry never holds a worker. 4xx responses other than 408/429 are not
+    retried.
+
+    With an `outbox`, every callback is recorded durably before it is
+    queued, delivered with an Idempotency-Key header, and any callback still
+    pending from a previous run is replayed on start. Delivery results are
+    written back to the outbox in batches every `flush_interval` seconds.
+    """
+
+    def __init__(
+        self,
+        endpoint: str = GUVI_CALLBACK_ENDPOINT,
+        workers: int = 8,
+        max_concurrency: int = 4,
+        max_attempts: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        timeout: float = 10.0,
+        queue_size: int = 10000,
+        on_success: Optional[Callable[[str], None]] = None,
+        on_failure: Optional[Callable[[str], None]] = None,
+        outbox: Optional[CallbackOutbox] = None,
+        flush_interval: float = 0.5
+    ):
+        self.endpoint = endpoint
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.queue_size = queue_size
+        self.on_success = on_success
+        self.on_failure = on_failure
+        self.outbox = outbox
+        self.flush_interval = flush_interval
+        self.stats = {"queued": 0, "sent": 0, "failed": 0, "retries": 0, "dropped": 0,
+                      "replayed": 0, "duplicates": 0}
+        self._queue: Optional[asyncio.Queue] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._tasks = []
+        self._retry_handles = set()
+
+    async def start(self):
+        """Create the shared HTTP client and start the worker tasks."""
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency
+            ),
+            headers={"Content-Type": "application/json"}
+        )
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        if self.outbox is not None:
+            self._tasks.append(asyncio.create_task(self._flush_outbox()))
+            self._tasks.append(asyncio.create_task(self._replay_outbox()))
+        logger.info(f"✅ Callback dispatcher started ({self.workers} workers) -> {self.endpoint}")
+
+    async def stop(self, drain_timeout: float = 5.0):
+        """Give queued callbacks a chance to finish, then stop workers and close the client."""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Callback dispatcher stopped with {self._queue.qsize()} callbacks pending")
+        for handle in self._retry_handles:
+            handle.cancel()
+        self._retry_handles.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.outbox is not None:
+            self.outbox.flush()
+        await self._client.aclose()
+        self._queue = None
+
+    async def enqueue(self, session_summary: Dict[str, Any], revision: Optional[int] = None) -> bool:
+        """
+        Queue a final-result callback (`revision`: an update of one already
+        sent, see outbox.idempotency_key). Returns False if the dispatcher is
+        not running or full. With an outbox, a callback already pending or sent
+        for the session is not queued again; a pending one still counts as
+        queued (True) and an already-sent one reports success via on_success.
+        Outbox writes run in a worker thread, off the event loop.
+        """
+        if self._queue is None:
+            logger.error("❌ Callback dispatcher is not running")
+            return False
+        session_id = session_summary["sessionId"]
+        payload = build_callback_payload(session_summary)
+        key = None
+        if self.outbox is not None:
+            key = await asyncio.to_thread(self.outbox.record, session_id, payload, revision)
+            if key is None:
+                self.stats["duplicates"] += 1
+                status = await asyncio.to_thread(self.outbox.status, session_id, revision)
+                if status == "sent" and self.on_success:
+                    self.on_success(session_id)
+                return status == "pending"
+            if self._queue is None:
+                return False  # stopped meanwhile; the pending row is replayed on restart
+        try:
+            self._queue.put_nowait((key, payload, 1))
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            if key:
+                # Release the outbox row so a later enqueue can re-arm it
+                self.outbox.mark_failed(key, 0)
+                await asyncio.to_thread(self.outbox.flush)
+            logger.error(f"❌ Callback queue full, dropping callback for {session_id}")
+            return False
+        self.stats["queued"] += 1
+        return True
+
+    def queue_depth(self) -> int:
+        """Callbacks waiting for a worker (retries waiting out their backoff not included)."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _worker(self):
+        while True:
+            key, payload, attempt = await self._queue.get()
+            try:
+                await self._deliver(key, payload, attempt)
+            except Exception as e:
+                logger.error(f"❌ Unexpected error during GUVI callback: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, key: Optional[str], payload: Dict[str, Any], attempt: int):
+        session_id = payload["sessionId"]
+        retryable = True
+        headers = {"Idempotency-Key": key} if key else None
+        async with self._semaphore:
+            try:
+                with STAGE_SECONDS.time("callback_delivery"):
+                    response = await self._client.post(self.endpoint, json=payload, headers=headers)
+                if response.status_code == 200:
+                    CALLBACK_DELIVERIES.inc("sent")
+                    self.stats["sent"] += 1
+                    if key:
+                        self.outbox.mark_sent(key, attempt)
+                    logger.info("✅ GUVI callback sent successfully for session %s", session_id)
+                    if self.on_success:
+                        self.on_success(session_id)
+                    return
+                CALLBACK_DELIVERIES.inc("rejected")
+                retryable = response.status_code >= 500 or response.status_code in (408, 429)
+                logger.error(f"❌ GUVI callback failed with status {response.status_code} "
+                             f"(session {session_id}, attempt {attempt})")
+            except httpx.HTTPError as e:
+                CALLBACK_DELIVERIES.inc("error")
+                logger.error(f"❌ GUVI callback request error (session {session_id}, attempt {attempt}): {e}")
+
+        if retryable and attempt < self.max_attempts:
+            self._schedule_retry(key, payload, attempt)
+            return
+
+        self.stats["failed"] += 1
+        if key:
+            self.outbox.mark_failed(key, attempt)
+        logger.error(f"❌ GUVI callback gave up for session {session_id} after {attempt} attempts")
+        if self.on_failure:
+            self.on_failure(session_id)
+
+    def _schedule_retry(self, key: Optional[str], payload: Dict[str, Any], attempt: int):
+        # Exponential backoff with full jitter
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+        self.stats["retries"] += 1
+        loop = asyncio.get_running_loop()
+
+        def requeue():
+            self._retry_handles.discard(handle)
+            if self._queue is None:
+                return
+            try:
+                self._queue.put_nowait((key, payload, attempt + 1))
+            except asyncio.QueueFull:
+                self.stats["dropped"] += 1
+                logger.error(f"❌ Callback queue full, dropping retry for {payload['sessionId']}")
+                if key:
+                    self.outbox.mark_failed(key, attempt)
+                if self.on_failure:
+                    self.on_failure(payload["sessionId"])
+
+        handle = loop.call_later(delay, requeue)
+        self._retry_handles.add(handle)
+
+    async def _flush_outbox(self):
+        """Write buffered delivery results to the outbox in one transaction per interval."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.outbox.flush)
+            except Exception as e:
+                logger.error(f"❌ Callback outbox flush failed: {e}")
+
+    async def _replay_outbox(self, batch_size: int = 500):
+        """Re-queue callbacks left pending by a previous run, in batches."""
+        after = ""
+        while True:
+            batch = await asyncio.to_thread(self.outbox.pending, batch_size, after)
+            if not batch:
+                break
+            for key, payload in batch:
+                await self._queue.put((key, payload, 1))
+                self.stats["replayed"] += 1
+            after = batch[-1][0]
+        if self.stats["replayed"]:
+            logger.info(f"🔁 Replayed {self.stats['replayed']} pending callbacks from outbox")
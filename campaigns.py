@@ -0,0 +1,192 @@
+import hashlib
+import os
+import random
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from extractor import TOKEN_RE
+
+FINGERPRINT_BITS = 64
+_WORD_RE = re.compile(r"<\w+>|\w+")
+_DIGITS_RE = re.compile(r"\d+")
+
+
+def _normalize(text: str) -> List[str]:
+    """Lowercase, mask identifiers and numbers, and split into word tokens."""
+    masked = TOKEN_RE.sub(lambda m: f" <{m.lastgroup}> ", text)
+    masked = _DIGITS_RE.sub("#", masked.lower())
+    return _WORD_RE.findall(masked)
+
+
+# Bit-sliced counting: each fingerprint bit gets its own 16-bit counter lane in
+# one big integer, so summing a feature's bits is a single integer addition.
+_LANE_BITS = 16
+_LANE_MASK = (1 << _LANE_BITS) - 1
+_SPREAD_BYTE = [
+    sum(1 << (bit * _LANE_BITS) for bit in range(8) if (value >> bit) & 1)
+    for value in range(256)
+]
+
+
+def _spread_hash(feature: str) -> int:
+    """Hash a feature to 64 bits and spread each bit into its own counter lane."""
+    digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+    spread = 0
+    for index, value in enumerate(reversed(digest)):
+        spread |= _SPREAD_BYTE[value] << (index * 8 * _LANE_BITS)
+    return spread
+
+
+def token_count(text: str) -> int:
+    """Number of normalized word tokens in the text."""
+    return len(_normalize(text))
+
+
+def simhash(text: str) -> int:
+    """
+    64-bit SimHash over word unigrams and bigrams of the normalized text.
+    Templates that differ only in names, amounts or links land a few bits apart.
+    """
+    tokens = _normalize(text)
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    features = features[:_LANE_MASK]  # keep every counter lane from overflowing
+    counts = sum(_spread_hash(feature) for feature in features)
+    half = len(features) / 2
+    fingerprint = 0
+    for bit in range(FINGERPRINT_BITS):
+        # Bit is set when more than half the features have it set
+        if (counts >> (bit * _LANE_BITS)) & _LANE_MASK > half:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+class Campaign:
+    """A known scam template with its cached verdict and reply pool."""
+
+    __slots__ = ("campaign_id", "fingerprint", "scam_detected", "score", "categories",
+                 "reply_pool", "hits", "first_seen")
+
+    def __init__(self, fingerprint: int, verdict: Dict[str, Any]):
+        self.campaign_id = f"cmp-{fingerprint:016x}"
+        self.fingerprint = fingerprint
+        self.scam_detected: bool = verdict["scamDetected"]
+        self.score: int = verdict["score"]
+        self.categories: List[str] = list(verdict["categories"])
+        self.reply_pool: List[str] = []
+        self.hits = 0
+        self.first_seen = time.time()
+
+    def verdict(self) -> Dict[str, Any]:
+        """Detection verdict in the same shape as detector.score_message."""
+        return {"scamDetected": self.scam_detected, "score": self.score, "categories": list(self.categories)}
+
+
+class CampaignIndex:
+    """
+    SimHash fingerprints indexed with banded LSH.
+
+    The 64-bit fingerprint is split into `bands` bands; two fingerprints within
+    `max_distance` bits (max_distance < bands) must agree exactly on at least
+    one band, so looking up each band's bucket finds every near-duplicate.
+    Campaigns are kept in LRU order and evicted beyond `max_campaigns`.
+    Only scam messages of at least `min_tokens` tokens become campaigns:
+    short messages ("ok", "send it") are too generic to fingerprint.
+    """
+
+    def __init__(self, bands: int = 8, max_distance: int = 6,
+                 max_campaigns: int = 10000, reply_pool_size: int = 3, min_tokens: int = 8):
+        if FINGERPRINT_BITS % bands:
+            raise ValueError("bands must divide 64")
+        if max_distance >= bands:
+            raise ValueError("max_distance must be < bands")
+        self.bands = bands
+        self.band_bits = FINGERPRINT_BITS // bands
+        self.max_distance = max_distance
+        self.max_campaigns = max_campaigns
+        self.reply_pool_size = reply_pool_size
+        self.min_tokens = min_tokens
+        self._campaigns: "OrderedDict[int, Campaign]" = OrderedDict()
+        self._buckets: Dict[tuple, List[int]] = {}
+        self.matches = 0
+        self.misses = 0
+
+    def _band_keys(self, fingerprint: int):
+        mask = (1 << self.band_bits) - 1
+        for band in range(self.bands):
+            yield band, (fingerprint >> (band * self.band_bits)) & mask
+
+    def match(self, text: str) -> Optional[Campaign]:
+        """Return the closest known campaign within max_distance bits, if any."""
+        return self.match_fingerprint(simhash(text))
+
+    def match_fingerprint(self, fingerprint: int) -> Optional[Campaign]:
+        """Return the closest known campaign for a precomputed fingerprint."""
+        best: Optional[Campaign] = None
+        best_distance = self.max_distance + 1
+        for key in self._band_keys(fingerprint):
+            for candidate_fp in self._buckets.get(key, ()):
+                distance = bin(candidate_fp ^ fingerprint).count("1")
+                if distance < best_distance:
+                    best, best_distance = self._campaigns[candidate_fp], distance
+        if best is None:
+            self.misses += 1
+            return None
+        self.matches += 1
+        best.hits += 1
+        self._campaigns.move_to_end(best.fingerprint)
+        return best
+
+    def register(self, fingerprint: int, verdict: Dict[str, Any], tokens: int) -> Optional[Campaign]:
+        """
+        Register a new campaign for a message that went through full detection.
+        Returns None for non-scam verdicts and messages under min_tokens tokens.
+        """
+        if not verdict["scamDetected"] or tokens < self.min_tokens:
+            return None
+        campaign = self._campaigns.get(fingerprint)
+        if campaign is not None:
+            return campaign
+        campaign = Campaign(fingerprint, verdict)
+        self._campaigns[fingerprint] = campaign
+        for key in self._band_keys(fingerprint):
+            self._buckets.setdefault(key, []).append(fingerprint)
+        while len(self._campaigns) > self.max_campaigns:
+            self._evict(next(iter(self._campaigns)))
+        return campaign
+
+    def _evict(self, fingerprint: int):
+        del self._campaigns[fingerprint]
+        for key in self._band_keys(fingerprint):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.remove(fingerprint)
+                if not bucket:
+                    del self._buckets[key]
+
+    def pick_reply(self, campaign: Campaign) -> Optional[str]:
+        """Pooled opening reply once the campaign's pool is full, else None."""
+        if len(campaign.reply_pool) < self.reply_pool_size:
+            return None
+        return random.choice(campaign.reply_pool)
+
+    def add_reply(self, campaign: Campaign, reply: str):
+        """Add a freshly generated opening reply to the campaign's pool."""
+        if len(campaign.reply_pool) < self.reply_pool_size:
+            campaign.reply_pool.append(reply)
+
+    def stats(self) -> Dict[str, int]:
+        """Known campaign count and match/miss counters."""
+        return {"campaigns": len(self._campaigns), "matches": self.matches, "misses": self.misses}
+
+
+# Campaign fingerprinting short-circuits detection and opening replies for known templates
+CAMPAIGN_FINGERPRINTING = os.getenv("CAMPAIGN_FINGERPRINTING", "false").lower() == "true"
+CAMPAIGNS = CampaignIndex(
+    bands=int(os.getenv("CAMPAIGN_LSH_BANDS", "8")),
+    max_distance=int(os.getenv("CAMPAIGN_MAX_DISTANCE", "6")),
+    max_campaigns=int(os.getenv("CAMPAIGN_MAX_CAMPAIGNS", "10000")),
+    reply_pool_size=int(os.getenv("CAMPAIGN_REPLY_POOL_SIZE", "3")),
+    min_tokens=int(os.getenv("CAMPAIGN_MIN_TOKENS", "8"))
+)
@@ -1,109 +1,163 @@
-import re
+from collections import Counter
+from typing import Any, Dict, List
 
-SCAM_KEYWORDS = [
+from extractor import iter_candidates
+from keyword_matcher import KeywordMatcher
+
+SCAM_KEYWORD_CATEGORIES = {
     # ========== BANKING/KYC FRAUD ==========
-    "verify", "verify now", "verify identity", "verify account", "verify immediately",
-    "account", "account suspension", "account blocked", "account disabled",
-    "suspend", "suspended", "blocking", "blocked", "disable",
-    "urgent", "urgently", "immediately", "asap", "now",
-    "otp", "share otp", "send otp", "otp needed",
-    "kyc", "kyc verification", "kyc incomplete", "kyc update", "kyc failed",
-    "pan", "aadhaar", "pan number", "aadhaar number",
-    "rbi", "rbi notice", "rbi alert", "rbi warning",
-    "sbi alert", "sbi notice", "bank alert", "bank notice",
-    "reserve bank", "bank account", "debit card", "credit card",
-    "card disabled", "card blocked", "card cancelled",
-    "unusual activity", "suspicious activity", "unauthorized transaction",
-    "click here", "click link", "download form", "download app",
-    "linked", "attachment", "attached form", "attached document",
-    "update now", "update immediately", "confirm details",
-    
+    "banking_kyc": [
+        "verify", "verify now", "verify identity", "verify account", "verify immediately",
+        "account", "account suspension", "account blocked", "account disabled",
+        "suspend", "suspended", "blocking", "blocked", "disable",
+        "urgent", "urgently", "immediately", "asap", "now",
+        "otp", "share otp", "send otp", "otp needed",
+        "kyc", "kyc verification", "kyc incomplete", "kyc update", "kyc failed",
+        "pan", "aadhaar", "pan number", "aadhaar number",
+        "rbi", "rbi notice", "rbi alert", "rbi warning",
+        "sbi alert", "sbi notice", "bank alert", "bank notice",
+        "reserve bank", "bank account", "debit card", "credit card",
+        "card disabled", "card blocked", "card cancelled",
+        "unusual activity", "suspicious activity", "unauthorized transaction",
+        "click here", "click link", "download form", "download app",
+        "linked", "attachment", "attached form", "attached document",
+        "update now", "update immediately", "confirm details",
+    ],
     # ========== DELIVERY/REFUND SCAMS ==========
-    "package", "parcel", "shipment", "delivery",
-    "customs", "customs duty", "import tax",
-    "courier", "tracking", "reschedule",
-    "refund", "refund pending", "refund initiated",
-    "payment required", "pay now", "payment needed",
-    "incorrect address", "delivery failed", "delivery failed",
-    "confirm address", "update address",
-    "amazon", "flipkart", "swiggy", "zomato",
-    
+    "delivery_refund": [
+        "package", "parcel", "shipment", "delivery",
+        "customs", "customs duty", "import tax",
+        "courier", "tracking", "reschedule",
+        "refund", "refund pending", "refund initiated",
+        "payment required", "pay now", "payment needed",
+        "incorrect address", "delivery failed", "delivery failed",
+        "confirm address", "update address",
+        "amazon", "flipkart", "swiggy", "zomato",
+    ],
     # ========== JOB/PRIZE/LOAN SCAMS ==========
-    "congratulations", "won", "prize", "prize money",
-    "contest", "kaun banega crorepati", "kbc",
-    "lottery", "lottery winner", "lucky draw",
-    "job offer", "job opening", "job opportunity",
-    "work from home", "part time", "part-time",
-    "earn money", "earning", "income", "salary",
-    "₹", "rupees", "lakh", "crore", "rs", "inr",
-    "loan", "loan approved", "credit", "instant credit",
-    "processing fee", "application fee", "fee required",
-    "no skills needed", "no experience needed", "no qualification",
-    
+    "job_prize_loan": [
+        "congratulations", "won", "prize", "prize money",
+        "contest", "kaun banega crorepati", "kbc",
+        "lottery", "lottery winner", "lucky draw",
+        "job offer", "job opening", "job opportunity",
+        "work from home", "part time", "part-time",
+        "earn money", "earning", "income", "salary",
+        "₹", "rupees", "lakh", "crore", "rs", "inr",
+        "loan", "loan approved", "credit", "instant credit",
+        "processing fee", "application fee", "fee required",
+        "no skills needed", "no experience needed", "no qualification",
+    ],
     # ========== INVESTMENT/CRYPTO SCAMS ==========
-    "double money", "double your money", "multiply money",
-    "crypto", "bitcoin", "ethereum", "nft",
-    "blockchain", "trading", "trader",
-    "investment", "invest now", "investment opportunity",
-    "returns", "monthly return", "daily return", "guaranteed return",
-    "fixed deposit", "fd", "fd scheme",
-    "interest rate", "interest", "high interest",
-    "roi", "profit", "guaranteed profit",
-    "govt scheme", "government scheme", "scheme",
-    "limited slots", "limited time", "limited offers",
-    
+    "investment_crypto": [
+        "double money", "double your money", "multiply money",
+        "crypto", "bitcoin", "ethereum", "nft",
+        "blockchain", "trading", "trader",
+        "investment", "invest now", "investment opportunity",
+        "returns", "monthly return", "daily return", "guaranteed return",
+        "fixed deposit", "fd", "fd scheme",
+        "interest rate", "interest", "high interest",
+        "roi", "profit", "guaranteed profit",
+        "govt scheme", "government scheme", "scheme",
+        "limited slots", "limited time", "limited offers",
+    ],
     # ========== ROMANCE/SOCIAL ENGINEERING ==========
-    "friend", "friends", "friendship",
-    "whatsapp", "telegram", "signal",
-    "stuck abroad", "stuck", "emergency",
-    "send money", "send funds", "need money",
-    "paytm", "google pay", "phonepe", "bank transfer",
-    "emi", "payment method", "payment option",
-    "resend money", "transfer back", "send back",
-    "personal help", "urgent help", "immediate help",
-    
+    "romance_social": [
+        "friend", "friends", "friendship",
+        "whatsapp", "telegram", "signal",
+        "stuck abroad", "stuck", "emergency",
+        "send money", "send funds", "need money",
+        "paytm", "google pay", "phonepe", "bank transfer",
+        "emi", "payment method", "payment option",
+        "resend money", "transfer back", "send back",
+        "personal help", "urgent help", "immediate help",
+    ],
     # ========== THREATENING/URGENT SCAMS ==========
-    "sim deactivate", "deactivated", "deactivation",
-    "income tax", "tax raid", "raid", "tax dues",
-    "cyber cell", "cyber crime", "police complaint",
-    "complaint filed", "case registered", "fir",
-    "resolve", "resolve immediately", "resolve now",
-    "clear dues", "pay fine", "pay penalty",
-    "action will be taken", "legal action", "court order",
-    
+    "threat_urgent": [
+        "sim deactivate", "deactivated", "deactivation",
+        "income tax", "tax raid", "raid", "tax dues",
+        "cyber cell", "cyber crime", "police complaint",
+        "complaint filed", "case registered", "fir",
+        "resolve", "resolve immediately", "resolve now",
+        "clear dues", "pay fine", "pay penalty",
+        "action will be taken", "legal action", "court order",
+    ],
     # ========== GENERAL SCAM INDICATORS ==========
-    "send upi", "upi details", "upi id", "upi handle",
-    "click link", "malicious link", "phishing",
-    "link", "url", "bit.ly",
-    "transfer", "transfer money", "transfer funds",
-    "share details", "provide details", "give details",
-    "confirm", "confirm account", "confirm details",
-    "update", "update now", "update details",
-    "validate", "validate account", "validate identity",
-    "authenticate", "authentication", "two-factor",
-    "dmme", "dm me", "call me", "contact me",
-    "password", "pin", "cvv", "cvv2",
-    "mobile number", "phone number", "contact number"
-]
+    "general": [
+        "send upi", "upi details", "upi id", "upi handle",
+        "click link", "malicious link", "phishing",
+        "link", "url", "bit.ly",
+        "transfer", "transfer money", "transfer funds",
+        "share details", "provide details", "give details",
+        "confirm", "confirm account", "confirm details",
+        "update", "update now", "update details",
+        "validate", "validate account", "validate identity",
+        "authenticate", "authentication", "two-factor",
+        "dmme", "dm me", "call me", "contact me",
+        "password", "pin", "cvv", "cvv2",
+        "mobile number", "phone number", "contact number",
+    ],
+}
 
-def detect_scam(message_text: str) -> bool:
+SCAM_THRESHOLD = 2
+
+# Flat keyword list in section order (duplicates across sections are kept)
+SCAM_KEYWORDS = [keyword for keywords in SCAM_KEYWORD_CATEGORIES.values() for keyword in keywords]
+
+# Compiled once at import: one linear pass per message instead of one
+# substring scan per keyword. Some keywords appear in more than one section
+# above, so each keyword carries its list multiplicity as its score weight.
+KEYWORD_WEIGHTS = Counter(keyword.lower() for keyword in SCAM_KEYWORDS)
+SCAM_MATCHER = KeywordMatcher(SCAM_KEYWORDS)
+
+def match_keywords(message_text: str) -> List[str]:
+    """Return the distinct scam keywords found in the message, in first-seen order."""
+    return list(dict.fromkeys(hit.keyword for hit in SCAM_MATCHER.iter_hits(message_text)))
+
+# keyword -> scam categories it belongs to
+KEYWORD_CATEGORIES: Dict[str, List[str]] = {}
+for _category, _keywords in SCAM_KEYWORD_CATEGORIES.items():
+    for _keyword in _keywords:
+        _categories = KEYWORD_CATEGORIES.setdefault(_keyword.lower(), [])
+        if _category not in _categories:
+            _categories.append(_category)
+
+# Identifier kinds from the extractor that add to the score, with their category
+PATTERN_CATEGORIES = {"upi": "upi_id", "url": "phishing_link", "account": "account_number",
+                      "phone": "phone_number"}
+
+def score_message(message_text: str) -> Dict[str, Any]:
+    """
+    Score a message for scam intent.
+    Returns {"scamDetected": bool, "score": int, "categories": [...]}.
+    """
     text = message_text.lower()
     score = 0
+    categories: Dict[str, None] = {}
 
     # Keyword scoring
-    for keyword in SCAM_KEYWORDS:
-        if keyword in text:
-            score += 1
+    for keyword in match_keywords(text):
+        score += KEYWORD_WEIGHTS[keyword]
+        categories.update(dict.fromkeys(KEYWORD_CATEGORIES[keyword]))
 
-    # Pattern scoring (e.g., UPI IDs, links)
-    if re.search(r"[a-zA-Z0-9.\-_]{2,}@[a-zA-Z]{2,}", text):
-        score += 2  # UPI ID pattern
+    # Pattern scoring (e.g., UPI IDs, links) from the single-pass extractor
+    kinds = {candidate.kind for candidate in iter_candidates(text)}
+    for kind, category in PATTERN_CATEGORIES.items():
+        if kind in kinds:
+            categories[category] = None
+    # Phone numbers also match the 9-18 digit account pattern: they score once together
+    digits = "account" in kinds or "phone" in kinds
+    score += 2 * (("upi" in kinds) + ("url" in kinds) + digits)
 
-    if re.search(r"https?://[^\s]+", text):
-        score += 2  # Phishing link
+    # Set threshold
+    return {
+        "scamDetected": score >= SCAM_THRESHOLD,
+        "score": score,
+        "categories": list(categories)
+    }
 
-    if re.search(r"\b\d{9,18}\b", text):
-        score += 2  # Possible account number
+def score_batch(messages: List[str]) -> List[Dict[str, Any]]:
+    """Score a list of messages. Module-level so it can run in a process pool."""
+    return [score_message(text) for text in messages]
 
-    # Set threshold
-    return score >= 2
+def detect_scam(message_text: str) -> bool:
+    return score_message(message_text)["scamDetected"]
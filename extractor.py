@@ -0,0 +1,92 @@
+import re
+from typing import Dict, Iterator, List, NamedTuple
+
+# ---- Precompiled identifier patterns ----
+# Full-match validators (used for LLM-provided candidates in intel_store)
+UPI_RE = re.compile(r'[a-zA-Z0-9.\-_]{2,}@[a-zA-Z]{2,}')
+PHONE_RE = re.compile(r'(?:\+91|0)?[6-9]\d{9}')
+URL_RE = re.compile(r'https?://[^\s]+')
+ACCOUNT_RE = re.compile(r'\d{9,18}')
+
+# Single tokenizer: one left-to-right pass, first alternative wins at each position.
+# Order matters: URLs swallow any '@' or digits inside them, phones are tried
+# before the generic 9-18 digit account pattern.
+TOKEN_RE = re.compile(r"""
+      (?P<url>https?://[^\s]+)
+    | (?P<upi>\b[a-zA-Z0-9.\-_]{2,}@[a-zA-Z]{2,}\b)
+    | (?P<phone>(?<![\d+])(?:(?:\+91|0)[\s-]?)?[6-9]\d{9}(?!\d))
+    | (?P<account>\b\d{9,18}\b)
+""", re.VERBOSE)
+
+# Maps candidate kind to the key used in agent extraction dicts
+EXTRACT_KEYS = {"upi": "upi", "phone": "phones", "url": "urls", "account": "accounts"}
+
+
+# Cheap signals that identifiers were written to dodge regex extraction:
+# digits spelled out, digits split by spaces/dots/dashes, "at the rate"/"[at]"
+# style UPI handles and "dot com"/"[.]" style links.
+_DIGIT_WORD = r'(?:zero|oh|one|two|three|four|five|six|seven|eight|nine|double|triple)'
+OBFUSCATION_RE = re.compile(rf"""
+      \b{_DIGIT_WORD}(?:[\s,-]+{_DIGIT_WORD}){{3,}}\b
+    | (?<![\d])\d{{1,5}}(?:[\s.\-]+\d{{1,5}}){{1,}}(?![\d])
+    | \bat\s+the\s+rate\b
+    | [\[(]\s*(?:at|@|dot|\.)\s*[\])]
+    | \bdot\s+(?:com|in|net|org|ly|co)\b
+    | \bhxxps?\b
+""", re.VERBOSE | re.IGNORECASE)
+
+
+def looks_obfuscated(text: str) -> bool:
+    """
+    Heuristic check for identifiers the regex extractor cannot see.
+    Only digit groups totalling 9+ digits count, so prices and dates don't trigger it.
+    """
+    for match in OBFUSCATION_RE.finditer(text):
+        token = match.group(0)
+        if token[0].isdigit():
+            if sum(ch.isdigit() for ch in token) < 9:
+                continue
+        return True
+    return False
+
+
+class Candidate(NamedTuple):
+    kind: str  # "upi" | "phone" | "url" | "account"
+    value: str
+    start: int
+
+
+def validate_candidate(kind: str, value: str) -> bool:
+    """Check a candidate value against the validator for its kind."""
+    if kind == "upi":
+        return UPI_RE.fullmatch(value) is not None
+    if kind == "phone":
+        return PHONE_RE.fullmatch(value.replace(" ", "").replace("-", "")) is not None
+    if kind == "url":
+        return URL_RE.fullmatch(value) is not None
+    if kind == "account":
+        # 9-18 digits, excluding bare 10-digit mobile numbers
+        return ACCOUNT_RE.fullmatch(value) is not None and PHONE_RE.fullmatch(value) is None
+    return False
+
+
+def iter_candidates(text: str) -> Iterator[Candidate]:
+    """Tokenize the message in one pass and yield validated, typed candidates."""
+    for match in TOKEN_RE.finditer(text):
+        kind = match.lastgroup
+        value = match.group(kind)
+        if validate_candidate(kind, value):
+            yield Candidate(kind, value, match.start())
+
+
+def extract_identifiers(text: str) -> Dict[str, List[str]]:
+    """
+    Extract validated identifiers from text.
+    Returns {"upi": [], "phones": [], "urls": [], "accounts": []} with duplicates removed.
+    """
+    extracted: Dict[str, List[str]] = {key: [] for key in EXTRACT_KEYS.values()}
+    for candidate in iter_candidates(text):
+        values = extracted[EXTRACT_KEYS[candidate.kind]]
+        if candidate.value not in values:
+            values.append(candidate.value)
+    return extracted
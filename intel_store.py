@@ -1,83 +1,123 @@
-import re
-from typing import Dict, List, Any
+from typing import Dict, Iterable, List, Any
 
-def merge_unique(existing: List[str], new: List[str]) -> List[str]:
-    """Merge two lists and remove duplicates."""
-    return list(set(existing + new))
+from agent_notes import record_note
+from extractor import validate_candidate
+from keyword_matcher import KeywordMatcher
+
+# Keywords tracked in session intelligence, compiled once at import
+INTEL_KEYWORDS = ["urgent", "verify", "account", "send now", "kyc", "block", "suspended",
+                  "immediately", "otp", "upi", "transfer", "confirm", "click here", "link"]
+INTEL_MATCHER = KeywordMatcher(INTEL_KEYWORDS)
+
+# extractedIntelligence fields, in JSON order
+INTEL_FIELDS = ("bankAccounts", "upiIds", "phishingLinks", "phoneNumbers", "suspiciousKeywords")
+
+def canonical_value(field: str, value: str) -> str:
+    """Key used to de-duplicate a value (case, spacing and +91 prefixes don't matter)."""
+    if field == "phoneNumbers":
+        return "".join(ch for ch in value if ch.isdigit())[-10:]
+    if field == "phishingLinks":
+        return value.lower().rstrip("/")
+    if field == "bankAccounts":
+        return value
+    return value.lower()
+
+class Intelligence:
+    """
+    Accumulated intelligence for a session.
+
+    Each field is a dict keyed by canonical value (insertion-ordered, first
+    spelling kept), so adding items costs O(new items) and order is stable.
+    The list-based JSON form is cached and only rebuilt after something
+    actually changed.
+    """
+
+    __slots__ = ("_fields", "_dirty", "_json")
+
+    def __init__(self):
+        self._fields: Dict[str, Dict[str, str]] = {field: {} for field in INTEL_FIELDS}
+        self._dirty = True
+        self._json: Dict[str, List[str]] = {}
+
+    def add(self, field: str, values: Iterable[str]) -> List[str]:
+        """Add values to a field; returns the ones not seen before."""
+        known = self._fields[field]
+        added = []
+        for value in values:
+            key = canonical_value(field, value)
+            if key not in known:
+                known[key] = value
+                added.append(value)
+        if added:
+            self._dirty = True
+        return added
+
+    def __getitem__(self, field: str) -> List[str]:
+        return self.to_dict()[field]
+
+    def _refresh(self):
+        if self._dirty:
+            # New objects (not mutated in place): earlier snapshots, e.g. queued callbacks, stay as they were
+            self._json = {field: list(values.values()) for field, values in self._fields.items()}
+            self._dirty = False
+
+    def to_dict(self) -> Dict[str, List[str]]:
+        """The existing list-based JSON shape (shared; treat as read-only)."""
+        self._refresh()
+        return self._json
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, List[str]]) -> "Intelligence":
+        intelligence = cls()
+        for field in INTEL_FIELDS:
+            intelligence.add(field, data.get(field, ()))
+        return intelligence
 
 def validate_upi(upi: str) -> bool:
     """Validate UPI ID format: name@bank"""
-    return bool(re.match(r'^[a-zA-Z0-9.\-_]{2,}@[a-zA-Z]{2,}$', upi))
+    return validate_candidate("upi", upi)
 
 def validate_phone(phone: str) -> bool:
-    """Validate Indian phone format."""
-    # Remove spaces and common formatting
-    cleaned = phone.replace(" ", "").replace("-", "")
-    return bool(re.match(r'^(\+91|0)?[6-9]\d{9}$', cleaned))
+    """Validate Indian phone format (spaces and dashes are ignored)."""
+    return validate_candidate("phone", phone)
 
 def validate_url(url: str) -> bool:
     """Validate URL format."""
-    return bool(re.match(r'^https?://[^\s]+$', url))
+    return validate_candidate("url", url)
 
 def validate_account(account: str) -> bool:
     """Validate account number (9-18 digits, not a phone number)."""
-    if not re.match(r'^\d{9,18}$', account):
-        return False
-    # Exclude if it looks like a phone
-    if re.match(r'^[6-9]\d{9}$', account):
-        return False
-    return True
+    return validate_candidate("account", account)
 
 def update_extracted_intelligence(session: Dict[str, Any], agent_extract: Dict[str, List[str]], message_text: str):
     """
     Update session with extracted intelligence.
-    Validates extracted data before adding.
+    Validates extracted data before adding, and records a note event for
+    each identifier seen for the first time.
     """
-    ei = session["extractedIntelligence"]
+    ei: Intelligence = session["extractedIntelligence"]
     
     # Validate and add UPI IDs
     valid_upis = [u for u in agent_extract.get("upi", []) if validate_upi(u)]
-    ei["upiIds"] = merge_unique(ei["upiIds"], valid_upis)
+    _note_new(session, "upi", ei.add("upiIds", valid_upis))
     
     # Validate and add bank accounts
     valid_accounts = [a for a in agent_extract.get("accounts", []) if validate_account(a)]
-    ei["bankAccounts"] = merge_unique(ei["bankAccounts"], valid_accounts)
+    _note_new(session, "account", ei.add("bankAccounts", valid_accounts))
     
     # Validate and add URLs
     valid_urls = [u for u in agent_extract.get("urls", []) if validate_url(u)]
-    ei["phishingLinks"] = merge_unique(ei["phishingLinks"], valid_urls)
+    _note_new(session, "link", ei.add("phishingLinks", valid_urls))
     
     # Validate and add phone numbers
     valid_phones = [p for p in agent_extract.get("phones", []) if validate_phone(p)]
-    ei["phoneNumbers"] = merge_unique(ei["phoneNumbers"], valid_phones)
-    
-    # Extract suspicious keywords from message
-    keywords = ["urgent", "verify", "account", "send now", "kyc", "block", "suspended", 
-                "immediately", "otp", "upi", "transfer", "confirm", "click here", "link"]
-    found = [kw for kw in keywords if kw in message_text.lower()]
-    ei["suspiciousKeywords"] = merge_unique(ei["suspiciousKeywords"], found)
-
-def update_agent_notes(session: Dict[str, Any], note: str):
-    """Update agent notes with latest observation."""
-    if note:
-        if session["agentNotes"]:
-            session["agentNotes"] += " | " + note
-        else:
-            session["agentNotes"] = note
-
-def get_intelligence_summary(intelligence: Dict[str, Any]) -> str:
-    """Generate a summary of extracted intelligence for agent notes."""
-    summaries = []
+    _note_new(session, "phone", ei.add("phoneNumbers", valid_phones))
     
-    if intelligence["upiIds"]:
-        summaries.append(f"UPI IDs: {', '.join(intelligence['upiIds'])}")
-    if intelligence["bankAccounts"]:
-        summaries.append(f"Bank accounts: {', '.join(intelligence['bankAccounts'])}")
-    if intelligence["phishingLinks"]:
-        summaries.append(f"Suspicious links: {', '.join(intelligence['phishingLinks'])}")
-    if intelligence["phoneNumbers"]:
-        summaries.append(f"Phone numbers: {', '.join(intelligence['phoneNumbers'])}")
-    if intelligence["suspiciousKeywords"]:
-        summaries.append(f"Keywords: {', '.join(set(intelligence['suspiciousKeywords']))}")
-    
-    return " | ".join(summaries) if summaries else "Gathering intelligence..."
\ No newline at end of file
+    # Extract suspicious keywords from message (in order of appearance)
+    found = [hit.keyword for hit in INTEL_MATCHER.iter_hits(message_text)]
+    _note_new(session, "keyword", ei.add("suspiciousKeywords", found))
+
+def _note_new(session: Dict[str, Any], kind: str, added: List[str]):
+    """Record a note event for each value seen for the first time."""
+    for value in added:
+        record_note(session, kind, value)
@@ -0,0 +1,72 @@
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Set
+
+
+class KeywordHit(NamedTuple):
+    keyword: str
+    start: int
+    end: int
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a fixed keyword list.
+    Built once, then finds every (possibly overlapping) keyword occurrence
+    in a single left-to-right pass over the text.
+    Matching is plain substring matching on lowercased text, same as `kw in text`.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        # Deduplicate while keeping first-seen order
+        self.keywords: List[str] = list(dict.fromkeys(kw.lower() for kw in keywords if kw))
+
+        # Trie: goto[state] maps char -> next state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[str]] = [[]]
+
+        for keyword in self.keywords:
+            state = 0
+            for ch in keyword:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(keyword)
+
+        # Breadth-first pass to compute failure links and merge outputs
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_hits(self, text: str) -> Iterable[KeywordHit]:
+        """Yield every keyword occurrence with its offsets in the lowercased text."""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, ch in enumerate(text.lower()):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                for keyword in out[state]:
+                    yield KeywordHit(keyword, i - len(keyword) + 1, i + 1)
+
+    def find_all(self, text: str) -> List[KeywordHit]:
+        """Return all keyword hits with offsets."""
+        return list(self.iter_hits(text))
+
+    def matched_keywords(self, text: str) -> Set[str]:
+        """Return the set of distinct keywords found in the text."""
+        return {hit.keyword for hit in self.iter_hits(text)}
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Concurrent multi-turn load generator for /inbound.
+
+Each simulated session opens with a message from scam_corpus.SINGLE_TURN_SCAMS
+or MULTI_TURN_SCRIPT and continues with FOLLOW_UPS, sending the conversation so
+far like a real caller, until --turns or the server ends the engagement.
+
+Modes:
+    closed  --concurrency sessions run at once; a new one starts when one ends
+    open    sessions start at a constant --rate per second (--poisson for
+            exponential gaps), however slowly the server answers
+
+Usage:
+    python load_test.py --mode closed --sessions 200 --concurrency 20 --turns 5
+    python load_test.py --mode open --rate 10 --sessions 300 --output report.json
+    python load_test.py --in-process ...   # drive main:app directly, no server
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import httpx
+
+from scam_corpus import FOLLOW_UPS, MULTI_TURN_SCRIPT, SINGLE_TURN_SCAMS
+
+OPENERS = [message for _, message, _ in SINGLE_TURN_SCAMS] + [message for _, message in MULTI_TURN_SCRIPT]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class LoadStats:
+    """Raw samples collected while the test runs."""
+
+    def __init__(self):
+        self.latencies_ms: List[float] = []
+        self.errors: Counter = Counter()
+        self.session_turns: List[int] = []
+        self.completed_sessions = 0
+        self.scam_detected = 0
+        self.requests = 0
+
+    def report(self, config: Dict[str, Any], elapsed: float) -> Dict[str, Any]:
+        latencies = self.latencies_ms or [0.0]
+        failed = sum(self.errors.values())
+        return {
+            "config": config,
+            "finishedAt": datetime.now(timezone.utc).isoformat(),
+            "durationSeconds": round(elapsed, 3),
+            "requests": {
+                "total": self.requests,
+                "ok": self.requests - failed,
+                "failed": failed,
+                "errorRate": round(failed / self.requests, 4) if self.requests else 0.0,
+                "errors": dict(self.errors),
+            },
+            "latencyMs": {
+                "mean": round(statistics.fmean(latencies), 2),
+                "p50": round(percentile(latencies, 50), 2),
+                "p95": round(percentile(latencies, 95), 2),
+                "p99": round(percentile(latencies, 99), 2),
+                "max": round(max(latencies), 2),
+                "timeoutsIncluded": self.errors["timeout"],
+            },
+            "throughput": {
+                "requestsPerSecond": round(self.requests / elapsed, 2) if elapsed else 0.0,
+                "sessionsPerSecond": round(len(self.session_turns) / elapsed, 2) if elapsed else 0.0,
+            },
+            "sessions": {
+                "total": len(self.session_turns),
+                "engagementComplete": self.completed_sessions,
+                "scamDetected": self.scam_detected,
+                "meanTurns": round(statistics.fmean(self.session_turns), 2) if self.session_turns else 0.0,
+                "turnCounts": {str(turns): count for turns, count in sorted(Counter(self.session_turns).items())},
+            },
+        }
+
+
+def session_messages(index: int, turns: int, rng: random.Random) -> List[str]:
+    """Scammer messages for one generated session."""
+    messages = [rng.choice(OPENERS)]
+    follow_ups = rng.sample(FOLLOW_UPS, len(FOLLOW_UPS))
+    for turn in range(1, turns):
+        template = follow_ups[(turn - 1) % len(follow_ups)]
+        messages.append(template.format(n=index, amount=rng.randint(1, 99) * 100))
+    return messages
+
+
+async def run_session(client: httpx.AsyncClient, args, index: int, rng: random.Random, stats: LoadStats):
+    """Play one conversation; stops early on errors or when the engagement completes."""
+    session_id = f"{args.session_prefix}-{index}"
+    history: List[Dict[str, str]] = []
+    turns = 0
+    detected = False
+    for text in session_messages(index, args.turns, rng):
+        payload = {
+            "sessionId": session_id,
+            "message": {"sender": "scammer", "text": text},
+            "conversationHistory": history,
+        }
+        start = time.perf_counter()
+        stats.requests += 1
+        try:
+            response = await client.post("/inbound", json=payload)
+        except httpx.TimeoutException:
+            # Counted at the time waited (the timeout) so overload shows in the percentiles
+            stats.latencies_ms.append((time.perf_counter() - start) * 1000)
+            stats.errors["timeout"] += 1
+            break
+        except httpx.HTTPError as e:
+            stats.errors[type(e).__name__] += 1
+            break
+        stats.latencies_ms.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            stats.errors[str(response.status_code)] += 1
+            break
+        turns += 1
+        body = response.json()
+        detected = detected or body.get("scamDetected", False)
+        history = history + [
+            {"sender": "scammer", "text": text},
+            {"sender": "user", "text": body.get("agentReply") or ""},
+        ]
+        if body.get("engagementComplete"):
+            stats.completed_sessions += 1
+            break
+    stats.session_turns.append(turns)
+    stats.scam_detected += detected
+
+
+async def closed_loop(client: httpx.AsyncClient, args, rng: random.Random, stats: LoadStats):
+    next_index = iter(range(args.sessions))
+
+    async def worker():
+        for index in next_index:
+            await run_session(client, args, index, rng, stats)
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+async def open_loop(client: httpx.AsyncClient, args, rng: random.Random, stats: LoadStats):
+    tasks = []
+    start = time.perf_counter()
+    due = 0.0
+    for index in range(args.sessions):
+        delay = start + due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(run_session(client, args, index, rng, stats)))
+        due += rng.expovariate(args.rate) if args.poisson else 1 / args.rate
+    await asyncio.gather(*tasks)
+
+
+async def run(args) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    stats = LoadStats()
+    headers = {"x-api-key": args.api_key}
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=args.concurrency)
+
+    app = None
+    if args.in_process:
+        import main
+        app = main.app
+        await app.router.startup()
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://load-test",
+                                   headers=headers, timeout=args.timeout)
+    else:
+        client = httpx.AsyncClient(base_url=args.url, headers=headers, timeout=args.timeout, limits=limits)
+
+    start = time.perf_counter()
+    try:
+        if args.mode == "open":
+            await open_loop(client, args, rng, stats)
+        else:
+            await closed_loop(client, args, rng, stats)
+    finally:
+        elapsed = time.perf_counter() - start
+        await client.aclose()
+        if app is not None:
+            await app.router.shutdown()
+
+    config = {key: value for key, value in vars(args).items() if key not in ("api_key", "output")}
+    return stats.report(config, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--api-key", default=os.getenv("API_KEY", "test-key-123"))
+    parser.add_argument("--mode", choices=("closed", "open"), default="closed")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=5, help="maximum scammer messages per session")
+    parser.add_argument("--concurrency", type=int, default=10, help="closed loop: sessions in flight")
+    parser.add_argument("--rate", type=float, default=5.0, help="open loop: new sessions per second")
+    parser.add_argument("--poisson", action="store_true", help="open loop: exponential arrival gaps")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--session-prefix", default=f"load-{int(time.time())}")
+    parser.add_argument("--in-process", action="store_true", help="call main:app directly instead of --url")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    requests, latency = report["requests"], report["latencyMs"]
+
+    print("=" * 70)
+    print(f"LOAD TEST ({args.mode} loop, {report['sessions']['total']} sessions)")
+    print("=" * 70)
+    print(f"📨 Requests: {requests['total']} ({requests['failed']} failed, error rate {requests['errorRate']:.2%})")
+    print(f"⏱️  Latency ms: p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  max {latency['max']}"
+          f"  (incl. {latency['timeoutsIncluded']} timeouts)")
+    print(f"🚀 Throughput: {report['throughput']['requestsPerSecond']} req/s, "
+          f"{report['throughput']['sessionsPerSecond']} sessions/s")
+    print(f"💬 Turns per session: {report['sessions']['turnCounts']}")
+    if requests["errors"]:
+        print(f"❌ Errors: {requests['errors']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Report written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import zlib
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict
+
+# LOG_FORMAT=text keeps the classic per-step lines. LOG_FORMAT=json writes JSON
+# lines and replaces the per-step "honeypot.turn" detail with one structured
+# record per request on "honeypot.requests", kept for LOG_SAMPLE_RATE of sessions.
+# LOG_ASYNC hands records to a background thread so the event loop never blocks
+# on I/O. The settings are (re-)read by configure_logging, after .env is loaded.
+def _read_settings():
+    return (os.getenv("LOG_FORMAT", "text").lower(),
+            os.getenv("LOG_LEVEL", "INFO").upper(),
+            float(os.getenv("LOG_SAMPLE_RATE", "1")),
+            os.getenv("LOG_ASYNC", "true").lower() == "true")
+
+
+LOG_FORMAT, LOG_LEVEL, LOG_SAMPLE_RATE, LOG_ASYNC = _read_settings()
+
+turn_logger = logging.getLogger("honeypot.turn")
+request_logger = logging.getLogger("honeypot.requests")
+
+_listeners: Dict[logging.Handler, QueueListener] = {}  # queue handler -> its listener
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; `extra={"fields": {...}}` adds top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread. The stock
+    prepare() merges msg % args on the caller's thread; here the record is
+    queued as-is, so callers must pass args that are not mutated afterwards.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def session_sampled(session_id: str) -> bool:
+    """Stable per-session decision: every turn of a sampled session is logged."""
+    if LOG_SAMPLE_RATE >= 1:
+        return True
+    return zlib.crc32(session_id.encode("utf-8")) % 10000 < LOG_SAMPLE_RATE * 10000
+
+
+def log_request(fields: Dict[str, Any]):
+    """Emit the structured per-request record (json mode, sampled sessions only)."""
+    if request_logger.isEnabledFor(logging.INFO) and session_sampled(fields["sessionId"]):
+        request_logger.info("request", extra={"fields": fields})
+
+
+def queued(handler: logging.Handler) -> logging.Handler:
+    """With LOG_ASYNC, a handler that passes records to `handler` on a listener thread."""
+    if not LOG_ASYNC:
+        return handler
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    if not _listeners:
+        atexit.register(stop_logging)
+    queue_handler = DeferredQueueHandler(log_queue)
+    _listeners[queue_handler] = listener
+    return queue_handler
+
+
+def configure_logging():
+    """
+    Install the root handler for LOG_FORMAT / LOG_ASYNC (call once at startup,
+    after load_dotenv so LOG_* values from .env apply).
+    """
+    global LOG_FORMAT, LOG_LEVEL, LOG_SAMPLE_RATE, LOG_ASYNC
+    LOG_FORMAT, LOG_LEVEL, LOG_SAMPLE_RATE, LOG_ASYNC = _read_settings()
+    if LOG_FORMAT == "json":
+        formatter: logging.Formatter = JsonFormatter()
+        turn_logger.setLevel(logging.WARNING)
+        request_logger.setLevel(logging.INFO)
+    else:
+        formatter = logging.Formatter(logging.BASIC_FORMAT)
+        turn_logger.setLevel(logging.NOTSET)
+        request_logger.setLevel(logging.WARNING)
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(formatter)
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+        listener = _listeners.pop(existing, None)
+        if listener is not None:
+            listener.stop()
+    root.addHandler(queued(handler))
+
+
+def stop_logging():
+    """Flush queued records and stop the listener threads."""
+    while _listeners:
+        _listeners.popitem()[1].stop()
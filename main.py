@@ -1,34 +1,88 @@
-from fastapi import FastAPI, Header, HTTPException
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi import FastAPI, Header, HTTPException, Response
+from fastapi.responses import FileResponse, HTMLResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, field_validator
-from typing import List, Optional, Dict, Any, Union
+from typing import List, Optional, Dict, Any, Set, Union
 from dotenv import load_dotenv
 import os
 import openai
 import logging
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 import json
+import time
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Load .env secrets and settings (before anything reads them)
+load_dotenv()
+
+# Configure logging (LOG_FORMAT, LOG_LEVEL, LOG_SAMPLE_RATE, LOG_ASYNC)
+from logging_config import configure_logging, log_request, stop_logging, turn_logger
+configure_logging()
 logger = logging.getLogger(__name__)
 
-# Load .env secrets
-load_dotenv()
 API_KEY = os.getenv("API_KEY")
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+# Batch detection tuning
+BATCH_MAX_MESSAGES = int(os.getenv("BATCH_MAX_MESSAGES", "10000"))
+BATCH_PARALLEL_THRESHOLD = int(os.getenv("BATCH_PARALLEL_THRESHOLD", "500"))
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", str(os.cpu_count() or 1)))
+
+# Rebuild sessions this worker hasn't seen (or missed turns of) from the
+# request's conversationHistory, so any worker can serve any turn
+HYDRATE_FROM_HISTORY = os.getenv("HYDRATE_FROM_HISTORY", "false").lower() == "true"
+
 # Local modules
-from detector import detect_scam
+from detector import score_message, score_batch
+from campaigns import CAMPAIGN_FINGERPRINTING, CAMPAIGNS, simhash, token_count
 from session_store import (
     get_session, update_session, mark_session_engaged, mark_session_complete,
     get_engagement_duration, mark_callback_sent, has_callback_been_sent,
+    claim_callback, clear_callback_queued, save_session, close_session_store,
+    find_session, get_store_stats, count_engaged_sessions, prefetch_session, run_store_io,
     get_session_summary
 )
-from intel_store import update_extracted_intelligence, update_agent_notes, get_intelligence_summary
-from agent import generate_agent_reply, extract_intelligence, should_continue_engagement
-from callback import send_final_result_to_guvi
+from intel_store import update_extracted_intelligence
+from extractor import extract_identifiers
+from session_types import HistoryMessage, chain_digest
+from agent_notes import record_note, record_stage, render_agent_notes
+from agent import (
+    generate_reply_and_intelligence, extract_intelligence, stream_agent_reply,
+    should_continue_engagement, select_persona, update_topic_mask,
+    warm_up_client, close_client, get_extraction_stats, REPLY_CACHE
+)
+from callback import CallbackDispatcher
+from outbox import CallbackOutbox
+from timer_wheel import IdleTimerWheel
+import metrics
+from metrics import HYDRATED_MESSAGES, REQUEST_SECONDS, REQUESTS, STAGE_SECONDS
+from tracing import span, trace_request
+
+# Optional durable outbox: pending callbacks survive restarts and are replayed on startup
+CALLBACK_OUTBOX_PATH = os.getenv("CALLBACK_OUTBOX_PATH")
+callback_outbox = CallbackOutbox(CALLBACK_OUTBOX_PATH) if CALLBACK_OUTBOX_PATH else None
+
+# Background GUVI callback delivery (started/stopped with the app)
+callback_dispatcher = CallbackDispatcher(
+    workers=int(os.getenv("CALLBACK_WORKERS", "8")),
+    max_concurrency=int(os.getenv("CALLBACK_MAX_CONCURRENCY", "4")),
+    max_attempts=int(os.getenv("CALLBACK_MAX_ATTEMPTS", "5")),
+    backoff_base=float(os.getenv("CALLBACK_BACKOFF_BASE", "0.5")),
+    backoff_max=float(os.getenv("CALLBACK_BACKOFF_MAX", "30")),
+    on_success=mark_callback_sent,
+    on_failure=clear_callback_queued,
+    outbox=callback_outbox,
+    flush_interval=float(os.getenv("CALLBACK_OUTBOX_FLUSH_INTERVAL", "0.5"))
+)
+
+# Finalize sessions with no inbound activity for SESSION_IDLE_TIMEOUT seconds (0 disables)
+SESSION_IDLE_TIMEOUT = float(os.getenv("SESSION_IDLE_TIMEOUT", "0"))
+idle_timers = IdleTimerWheel(
+    timeout=SESSION_IDLE_TIMEOUT,
+    on_expire=lambda session_id: run_detached(expire_idle_session(session_id)),
+    tick=float(os.getenv("SESSION_IDLE_TICK", "1"))
+) if SESSION_IDLE_TIMEOUT > 0 else None
 
 # Init FastAPI
 app = FastAPI(title="Agentic Honeypot", version="1.0")
@@ -77,93 +131,211 @@ class InboundRequest(BaseModel):
     conversationHistory: List[Message] = []
     metadata: Optional[Metadata] = None
 
+class BatchDetectRequest(BaseModel):
+    messages: List[str]
+
 # ---- Main Endpoint ----
-@app.post("/inbound")
-async def receive_message(
-    payload: InboundRequest,
-    x_api_key: str = Header(..., alias="x-api-key")
-):
-    """
-    Main honeypot endpoint that processes incoming scam messages.
-    
-    Flow:
-    1. Authenticate with x-api-key
-    2. Detect scam intent
-    3. If scam detected, engage agent
-    4. Extract intelligence
-    5. When engagement ends, send GUVI callback (only once)
-    """
-    
-    # ✅ Authentication
+
+def authenticate(x_api_key: str):
+    """Reject requests without the honeypot API key."""
     if x_api_key != API_KEY:
         logger.warning(f"Unauthorized access attempt with key: {x_api_key}")
         raise HTTPException(status_code=401, detail="Unauthorized")
-    
+
+def begin_turn(payload: InboundRequest) -> Dict[str, Any]:
+    """
+    Steps 2-3 of a turn: detect scam intent, load the session, record the
+    incoming message and engage the agent on first detection.
+    Returns the turn context used by the reply step and finish_turn.
+    """
     session_id = payload.sessionId
     message_text = payload.message.text
     
-    # Log the complete incoming request
-    logger.info(f"[{session_id}] ===== INCOMING REQUEST =====")
-    logger.info(f"[{session_id}] Message from {payload.message.sender}: {message_text}")
-    logger.info(f"[{session_id}] Metadata: channel={payload.metadata.channel if payload.metadata else 'N/A'}, "
-                f"locale={payload.metadata.locale if payload.metadata else 'N/A'}")
-    logger.info(f"[{session_id}] Conversation history length: {len(payload.conversationHistory)}")
-    logger.info(f"[{session_id}] =============================")
     channel = payload.metadata.channel if payload.metadata else "SMS"
     locale = payload.metadata.locale if payload.metadata else "IN"
-    language = payload.metadata.language if payload.metadata else "English"
     
-    logger.info(f"[{session_id}] Received message from {payload.message.sender}: {message_text[:50]}...")
+    # Per-step detail (text mode); arguments are formatted lazily, off the event loop
+    if turn_logger.isEnabledFor(logging.INFO):
+        turn_logger.info("[%s] ===== INCOMING REQUEST =====", session_id)
+        turn_logger.info("[%s] Message from %s: %s", session_id, payload.message.sender, message_text)
+        turn_logger.info("[%s] Metadata: channel=%s, locale=%s", session_id,
+                         payload.metadata.channel if payload.metadata else "N/A",
+                         payload.metadata.locale if payload.metadata else "N/A")
+        turn_logger.info("[%s] Conversation history length: %d", session_id, len(payload.conversationHistory))
+        turn_logger.info("[%s] =============================", session_id)
     
-    # 1️⃣ Detect Scam
-    scam_detected = detect_scam(message_text)
-    logger.info(f"[{session_id}] Scam detected: {scam_detected}")
+    # 1️⃣ Detect Scam (messages from a known campaign reuse its verdict)
+    campaign = None
+    with STAGE_SECONDS.time("detection"), span("detect_scam"):
+        if CAMPAIGN_FINGERPRINTING:
+            fingerprint = simhash(message_text)
+            campaign = CAMPAIGNS.match_fingerprint(fingerprint)
+        if campaign is not None:
+            verdict = campaign.verdict()
+            turn_logger.info("[%s] Matched campaign %s", session_id, campaign.campaign_id)
+        else:
+            verdict = score_message(message_text)
+    scam_detected = verdict["scamDetected"]
+    turn_logger.info("[%s] Scam detected: %s", session_id, scam_detected)
     
-    # 2️⃣ Load or create session
-    session = get_session(session_id)
+    with span("session_load"):
+        # 2️⃣ Load or create session
+        session = get_session(session_id)
+        if HYDRATE_FROM_HISTORY and payload.conversationHistory:
+            hydrate_session(session, payload.conversationHistory)
+        
+        # 3️⃣ Update session with incoming message
+        incoming_message = {
+            "sender": payload.message.sender,
+            "text": message_text,
+            "timestamp": payload.message.timestamp or datetime.utcnow().isoformat()
+        }
+        session = update_session(session_id, incoming_message)
+        turn_logger.info("[%s] Total messages in session: %d", session_id, session["totalMessages"])
+        
+        # Campaigns are learned from conversation openers only
+        opener = session["totalMessages"] == 1
+        if CAMPAIGN_FINGERPRINTING and campaign is None and opener:
+            campaign = CAMPAIGNS.register(fingerprint, verdict, token_count(message_text))
+        
+        if scam_detected and not session["agentEngaged"]:
+            # First detection - activate agent
+            turn_logger.info("[%s] Activating agent for scam engagement", session_id)
+            mark_session_engaged(session_id)
     
-    # 3️⃣ Update session with incoming message
-    incoming_message = {
-        "sender": payload.message.sender,
-        "text": message_text,
-        "timestamp": payload.message.timestamp or datetime.utcnow().isoformat()
+    return {
+        "sessionId": session_id,
+        "session": session,
+        "messageText": message_text,
+        "channel": channel,
+        "locale": locale,
+        "scamDetected": scam_detected,
+        "campaign": campaign,
+        "opener": opener
     }
-    session = update_session(session_id, incoming_message)
-    logger.info(f"[{session_id}] Total messages in session: {session['totalMessages']}")
+
+def hydrate_session(session, history: List[Message]) -> int:
+    """
+    Replay the part of the client's conversationHistory the session doesn't
+    hold yet (all of it for a session new to this worker) into the reply
+    window, topic state and intelligence. The session's history hash marks
+    which prefix it already has, so no message is appended twice.
+    Returns the number of messages replayed.
+    """
+    ring = session["conversationHistory"]
+    if session["endTime"] is not None:
+        return 0
     
-    # 4️⃣ Agent engagement logic
-    agent_reply = None
-    extracted_intel = {
-        "upi": [],
-        "accounts": [],
-        "urls": [],
-        "phones": []
-    }
+    start = 0
+    if len(ring):
+        start, digest = None, 0
+        for index, message in enumerate(history, 1):
+            digest = chain_digest(digest, message.sender, message.text)
+            if digest == ring.digest:
+                start = index
+                break
+    if start is None:
+        turn_logger.info("[%s] History does not extend this session - not replayed", session["sessionId"])
+        return 0
+    replay = history[start:]
+    if not replay:
+        return 0
     
-    if scam_detected and not session["agentEngaged"]:
-        # First detection - activate agent
-        logger.info(f"[{session_id}] Activating agent for scam engagement")
-        mark_session_engaged(session_id)
+    fresh = len(ring) == 0
+    engaged = session["agentEngaged"]
+    for index, message in enumerate(replay):
+        entry = HistoryMessage.from_dict(message.model_dump())
+        ring.append(entry)
+        if fresh and index == 0:
+            session["startTime"] = min(session["startTime"], datetime.utcfromtimestamp(entry.ts / 1000))
+        if message.sender == "user":
+            engaged = True  # the agent only replies once engaged
+            continue
+        session["totalMessages"] += 1
+        update_topic_mask(session)
+        update_extracted_intelligence(session, extract_identifiers(message.text), message.text)
+        if not engaged and score_message(message.text)["scamDetected"]:
+            engaged = True
     
-    if session["agentEngaged"]:
-        # Agent is engaged - process with LLM
-        logger.info(f"[{session_id}] Agent processing message")
-        
+    if engaged and not session["agentEngaged"]:
+        session["agentEngaged"] = True
+    save_session(session)
+    HYDRATED_MESSAGES.inc(amount=len(replay))
+    turn_logger.info("[%s] Replayed %d messages from conversationHistory", session["sessionId"], len(replay))
+    return len(replay)
+
+async def queue_final_callback(session_id: str, final: bool = False) -> bool:
+    """
+    Queue the session's GUVI callback once the agent is engaged; True if newly queued.
+    final=True (the session just finished): if an earlier turn already claimed
+    the callback, the final summary is sent as an update of it.
+    """
+    session = get_session(session_id)
+    if not session["agentEngaged"]:
+        return False
+    revision = None
+    # claim_callback is atomic across workers sharing the session store
+    if not await run_store_io(claim_callback, session_id):
+        if not final:
+            return False
+        revision = session["totalMessages"]
+    turn_logger.info("[%s] Queueing GUVI callback (%s)", session_id,
+                     "final update" if revision is not None else "scam detected + agent engaged")
+    session_summary = get_session_summary(session_id)
+    if await callback_dispatcher.enqueue(session_summary, revision):
+        return True
+    if revision is None and not has_callback_been_sent(session_id):
+        clear_callback_queued(session_id)
+        logger.error(f"[{session_id}] ❌ GUVI callback could not be queued")
+    return False
+
+async def expire_idle_session(session_id: str):
+    """
+    Idle timeout: finalize an engagement the scammer walked away from.
+    Other workers may have served the session since this worker's timer was
+    set, so its last activity is re-read from the store first.
+    """
+    try:
+        await prefetch_session(session_id)
+        session = find_session(session_id)
+        if session is None or session["endTime"] is not None:
+            return  # evicted/expired meanwhile, or already finished
+        idle = time.time() - session["lastActivity"]
+        if idle < SESSION_IDLE_TIMEOUT:
+            idle_timers.touch(session_id, SESSION_IDLE_TIMEOUT - idle)
+            return
+        logger.info(f"[{session_id}] Idle for {SESSION_IDLE_TIMEOUT}s - finalizing engagement")
+        mark_session_complete(session_id)
+        await queue_final_callback(session_id, final=True)
+    except Exception as e:
+        logger.error(f"❌ Idle expiry failed for session {session_id}: {e}")
+
+async def finish_turn(turn: Dict[str, Any], agent_reply: Optional[str], extracted_intel: Dict[str, Any],
+                agent_ok: bool = True) -> Dict[str, Any]:
+    """
+    Steps 4-7 of a turn: merge intelligence and the agent reply into the
+    session, check termination, send the GUVI callback and build the response.
+    agent_ok=False (reply generation failed) skips the merge step.
+    """
+    session_id = turn["sessionId"]
+    session = turn["session"]
+    scam_detected = turn["scamDetected"]
+    campaign = turn["campaign"]
+    
+    if session["agentEngaged"] and agent_reply is not None and agent_ok:
         try:
-            # Generate natural reply
-            agent_reply = generate_agent_reply(session, channel=channel, locale=locale)
-            logger.info(f"[{session_id}] Agent reply: {agent_reply[:60]}...")
-            
-            # Extract intelligence from latest message
-            extracted_intel = extract_intelligence(session, message_text)
-            logger.info(f"[{session_id}] Extracted intelligence: {extracted_intel}")
-            
             # Update session with extracted data
-            update_extracted_intelligence(session, extracted_intel, message_text)
+            with STAGE_SECONDS.time("intel_merge"), span("intel_update"):
+                update_extracted_intelligence(session, extracted_intel, turn["messageText"])
             
-            # Update agent notes with summary
-            intelligence_note = get_intelligence_summary(session["extractedIntelligence"])
-            update_agent_notes(session, intelligence_note)
+            # Record the scam campaign the session opened with
+            if campaign is not None and turn["opener"] and session["campaignId"] is None:
+                session["campaignId"] = campaign.campaign_id
+                record_note(session, "campaign", campaign.campaign_id)
+            
+            # Note conversation stage changes (new identifiers are noted by intel_store)
+            _, stage, _ = select_persona(session, turn["channel"], turn["locale"])
+            record_stage(session, stage)
             
             # Add agent reply to conversation history
             session["conversationHistory"].append({
@@ -175,28 +347,34 @@ async def receive_message(
         except Exception as e:
             logger.error(f"[{session_id}] Agent processing error: {e}")
             agent_reply = "Can you please explain that again? I'm a bit confused."
+        
+        save_session(session)
     
     # 5️⃣ Determine if engagement should continue or end
     should_continue = should_continue_engagement(session)
     
     engagement_complete = not should_continue
+    finished_now = engagement_complete and session["endTime"] is None
     if engagement_complete:
-        logger.info(f"[{session_id}] Engagement complete - terminating conversation")
+        turn_logger.info("[%s] Engagement complete - terminating conversation", session_id)
         mark_session_complete(session_id)
     
     # 6️⃣ Send GUVI callback if scam detected (mandatory for evaluation)
     # IMPORTANT: Send callback whenever scam is detected, not just when engagement ends
     # But wait for at least 1 agent reply to show engagement
-    callback_sent = False
-    if scam_detected and session["agentEngaged"] and not has_callback_been_sent(session_id):
-        logger.info(f"[{session_id}] Preparing to send GUVI callback (scam detected + agent engaged)")
-        session_summary = get_session_summary(session_id)
-        if send_final_result_to_guvi(session_summary):
-            mark_callback_sent(session_id)
-            callback_sent = True
-            logger.info(f"[{session_id}] ✅ GUVI callback sent successfully")
+    # Delivery happens in the background dispatcher; this only enqueues it.
+    # When the engagement ends, the final state goes out too.
+    callback_queued = False
+    if scam_detected or finished_now:
+        with STAGE_SECONDS.time("callback_enqueue"), span("callback"):
+            callback_queued = await queue_final_callback(session_id, final=finished_now)
+    
+    # Idle timer: restart on activity, stop once the engagement is over
+    if idle_timers is not None:
+        if engagement_complete:
+            idle_timers.cancel(session_id)
         else:
-            logger.error(f"[{session_id}] ❌ GUVI callback failed")
+            idle_timers.touch(session_id)
     
     # 7️⃣ Build response according to spec
     engagement_duration = get_engagement_duration(session_id)
@@ -208,24 +386,286 @@ async def receive_message(
             "engagementDurationSeconds": engagement_duration,
             "totalMessagesExchanged": session["totalMessages"]
         },
-        "extractedIntelligence": session["extractedIntelligence"],
-        "agentNotes": session["agentNotes"],
+        "extractedIntelligence": session["extractedIntelligence"].to_dict(),
+        "agentNotes": render_agent_notes(session["noteEvents"], session["agentEngaged"]),
         "agentReply": agent_reply,  # Include agent reply for Mock Scammer API
         "engagementComplete": engagement_complete,
-        "callbackSent": callback_sent
+        "callbackSent": has_callback_been_sent(session_id),
+        "callbackQueued": callback_queued
     }
     
-    logger.info(f"[{session_id}] Sending response: scamDetected={scam_detected}, "
-                f"totalMessages={session['totalMessages']}, "
-                f"agentEngaged={session['agentEngaged']}")
+    turn_logger.info("[%s] Sending response: scamDetected=%s, totalMessages=%d, agentEngaged=%s",
+                     session_id, scam_detected, session["totalMessages"], session["agentEngaged"])
     
     return response
 
+EMPTY_INTEL = {
+    "upi": [],
+    "accounts": [],
+    "urls": [],
+    "phones": []
+}
+
+@app.post("/inbound")
+async def receive_message(
+    payload: InboundRequest,
+    response: Response,
+    x_api_key: str = Header(..., alias="x-api-key"),
+    traceparent: Optional[str] = Header(None)
+):
+    """
+    Main honeypot endpoint that processes incoming scam messages.
+    
+    Flow:
+    1. Authenticate with x-api-key
+    2. Detect scam intent
+    3. If scam detected, engage agent
+    4. Extract intelligence
+    5. When engagement ends, send GUVI callback (only once)
+    """
+    
+    with trace_request("POST /inbound", traceparent, payload.sessionId) as root:
+        if root.traceparent:
+            response.headers["traceparent"] = root.traceparent
+            
+        # ✅ Authentication
+        with span("authenticate"):
+            authenticate(x_api_key)
+        
+        started = time.perf_counter()
+        await prefetch_session(payload.sessionId)
+        turn = begin_turn(payload)
+        session_id = turn["sessionId"]
+        
+        # 4️⃣ Agent engagement logic
+        agent_reply = None
+        extracted_intel = EMPTY_INTEL
+        agent_ok = True
+        
+        if turn["session"]["agentEngaged"]:
+            # Agent is engaged - process with LLM
+            turn_logger.info("[%s] Agent processing message", session_id)
+            
+            try:
+                # Generate natural reply and extract intelligence from latest message
+                # (concurrent calls, or one structured call when COMBINED_LLM_CALL is on)
+                agent_reply, extracted_intel = await generate_reply_and_intelligence(
+                    turn["session"], turn["messageText"], channel=turn["channel"],
+                    locale=turn["locale"], campaign=turn["campaign"]
+                )
+                turn_logger.info("[%s] Agent reply: %.60s...", session_id, agent_reply)
+                turn_logger.info("[%s] Extracted intelligence: %s", session_id, extracted_intel)
+            except Exception as e:
+                logger.error(f"[{session_id}] Agent processing error: {e}")
+                agent_reply = "Can you please explain that again? I'm a bit confused."
+                agent_ok = False
+        
+        result = await finish_turn(turn, agent_reply, extracted_intel, agent_ok)
+        record_request("inbound", started, turn, result, root.traceparent)
+        return result
+
+def record_request(endpoint: str, started: float, turn: Dict[str, Any], result: Dict[str, Any],
+                   traceparent: Optional[str] = None):
+    """Count a processed message and its latency; emit the structured request log."""
+    elapsed = time.perf_counter() - started
+    scam_detected = turn["scamDetected"]
+    REQUEST_SECONDS.observe(elapsed, endpoint)
+    REQUESTS.inc(endpoint, "true" if scam_detected else "false")
+    log_request({
+        "sessionId": turn["sessionId"],
+        "endpoint": endpoint,
+        "latencyMs": round(elapsed * 1000, 2),
+        "scamDetected": scam_detected,
+        "agentEngaged": turn["session"]["agentEngaged"],
+        "totalMessages": result["engagementMetrics"]["totalMessagesExchanged"],
+        "replyChars": len(result["agentReply"] or ""),
+        "intel": {field: len(values) for field, values in result["extractedIntelligence"].items()},
+        "campaignId": turn["session"]["campaignId"],
+        "engagementComplete": result["engagementComplete"],
+        "callbackQueued": result["callbackQueued"],
+        "traceparent": traceparent,
+    })
+
+_detached_tasks: Set[asyncio.Task] = set()
+
+def run_detached(coro):
+    """Run a coroutine to completion independently of the current request."""
+    task = asyncio.create_task(coro)
+    _detached_tasks.add(task)  # keep a reference until it is done
+    task.add_done_callback(_detached_done)
+
+def _detached_done(task: asyncio.Task):
+    _detached_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"❌ Background task failed: {task.exception()}")
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/inbound/stream")
+async def receive_message_stream(
+    payload: InboundRequest,
+    x_api_key: str = Header(..., alias="x-api-key")
+):
+    """
+    Streaming variant of /inbound (server-sent events).
+    
+    Emits `token` events with agent reply text as the LLM produces it, while
+    intelligence extraction runs concurrently. Once the turn is finished a
+    final `result` event carries the same JSON envelope /inbound returns; its
+    agentReply is authoritative (a stream that failed part-way is replaced by
+    the fallback reply). A client that disconnects early still gets its turn
+    finished, without the reply it never received.
+    """
+    authenticate(x_api_key)
+    started = time.perf_counter()
+    await prefetch_session(payload.sessionId)
+    turn = begin_turn(payload)
+    session_id = turn["sessionId"]
+    
+    async def events():
+        agent_reply = None
+        extracted_intel = EMPTY_INTEL
+        agent_ok = True
+        extract_task = None
+        finished = False
+        
+        try:
+            if turn["session"]["agentEngaged"]:
+                turn_logger.info("[%s] Agent streaming reply", session_id)
+                extract_task = asyncio.create_task(
+                    extract_intelligence(turn["session"], turn["messageText"])
+                )
+                try:
+                    chunks = []
+                    async for token in stream_agent_reply(
+                        turn["session"], channel=turn["channel"],
+                        locale=turn["locale"], campaign=turn["campaign"]
+                    ):
+                        chunks.append(token)
+                        yield sse_event("token", {"token": token})
+                    agent_reply = "".join(chunks).strip()
+                    extracted_intel = await extract_task
+                except Exception as e:
+                    logger.error(f"[{session_id}] Agent processing error: {e}")
+                    agent_reply = "Can you please explain that again? I'm a bit confused."
+                    agent_ok = False
+            
+            result = await finish_turn(turn, agent_reply, extracted_intel, agent_ok)
+            finished = True
+            record_request("inbound_stream", started, turn, result)
+            yield sse_event("result", result)
+        finally:
+            if extract_task is not None:
+                extract_task.cancel()
+            if not finished:
+                # Client disconnected mid-turn (GeneratorExit/CancelledError): the
+                # incoming message is already stored, so finish the turn in the
+                # background without the reply the client never received
+                logger.warning(f"[{session_id}] Stream client disconnected - finishing turn without reply")
+                run_detached(finish_turn(turn, None, EMPTY_INTEL, agent_ok=False))
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# ---- Batch detection endpoint ----
+_batch_pool: Optional[ProcessPoolExecutor] = None
+
+def get_batch_pool() -> ProcessPoolExecutor:
+    """Create the batch scoring process pool on first use."""
+    global _batch_pool
+    if _batch_pool is None:
+        _batch_pool = ProcessPoolExecutor(max_workers=BATCH_WORKERS)
+    return _batch_pool
+
+@app.post("/detect/batch")
+async def detect_batch(
+    payload: BatchDetectRequest,
+    x_api_key: str = Header(..., alias="x-api-key")
+):
+    """
+    Score many messages for scam intent in one call.
+    Small batches are scored inline; large batches are split into one chunk
+    per worker and scored in a process pool so they scale with cores.
+    """
+    if x_api_key != API_KEY:
+        logger.warning(f"Unauthorized access attempt with key: {x_api_key}")
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    
+    messages = payload.messages
+    if len(messages) > BATCH_MAX_MESSAGES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(messages)} messages (max {BATCH_MAX_MESSAGES})"
+        )
+    
+    if len(messages) < BATCH_PARALLEL_THRESHOLD or BATCH_WORKERS <= 1:
+        results = score_batch(messages)
+    else:
+        chunk_size = -(-len(messages) // BATCH_WORKERS)  # ceil division
+        chunks = [messages[i:i + chunk_size] for i in range(0, len(messages), chunk_size)]
+        loop = asyncio.get_running_loop()
+        pool = get_batch_pool()
+        chunk_results = await asyncio.gather(
+            *(loop.run_in_executor(pool, score_batch, chunk) for chunk in chunks)
+        )
+        results = [result for chunk in chunk_results for result in chunk]
+    
+    scam_count = sum(1 for result in results if result["scamDetected"])
+    logger.info(f"Batch detection: {len(messages)} messages, {scam_count} scams")
+    
+    return {
+        "status": "success",
+        "totalMessages": len(messages),
+        "scamCount": scam_count,
+        "results": [{"index": i, **result} for i, result in enumerate(results)]
+    }
+
 # ---- Health check endpoint ----
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
+    return {
+        "status": "healthy",
+        "timestamp": datetime.utcnow().isoformat(),
+        "sessionStore": get_store_stats()
+    }
+
+
+# ---- Metrics endpoint ----
+# Values that already live in other components are read at scrape time
+metrics.CollectedMetric("honeypot_sessions_active", "Sessions held by the session store",
+                        lambda: get_store_stats()["sessions"])
+metrics.CollectedMetric("honeypot_sessions_engaged", "Sessions with the agent engaged and not yet finished",
+                        count_engaged_sessions)
+metrics.CollectedMetric("honeypot_session_store_events_total", "Session store evictions, expirations and compactions",
+                        lambda: {(event,): count for event, count in get_store_stats().items() if event != "sessions"},
+                        ["event"], kind="counter")
+metrics.CollectedMetric("honeypot_callbacks_total", "Callback dispatcher events (queued, sent, failed, retries, ...)",
+                        lambda: {(event,): count for event, count in callback_dispatcher.stats.items()},
+                        ["event"], kind="counter")
+metrics.CollectedMetric("honeypot_callback_queue_depth", "Callbacks waiting for a dispatcher worker",
+                        lambda: callback_dispatcher.queue_depth())
+metrics.CollectedMetric("honeypot_reply_cache_total", "Reply cache hits, misses, evictions and expirations",
+                        lambda: {(event,): count for event, count in REPLY_CACHE.stats().items() if event != "size"},
+                        ["event"], kind="counter")
+metrics.CollectedMetric("honeypot_campaign_lookups_total", "Campaign fingerprint matches and misses",
+                        lambda: {(event,): CAMPAIGNS.stats()[event] for event in ("matches", "misses")},
+                        ["result"], kind="counter")
+metrics.CollectedMetric("honeypot_extraction_total", "LLM extraction calls made/skipped and items found per tier",
+                        lambda: {(event,): count for event, count in get_extraction_stats().items()},
+                        ["event"], kind="counter")
+metrics.CollectedMetric("honeypot_idle_timers", "Sessions tracked by the idle timer wheel",
+                        lambda: idle_timers.stats()["tracked"] if idle_timers is not None else 0)
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus text exposition of this process's metrics."""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 
 # ---- Dashboard endpoints ----
@@ -256,9 +696,28 @@ async def startup_event():
         logger.warning("⚠️ API_KEY not set in environment")
     if not openai.api_key:
         logger.warning("⚠️ OPENAI_API_KEY not set in environment")
+    await warm_up_client()
+    await callback_dispatcher.start()
+    if idle_timers is not None:
+        idle_timers.start()
     logger.info("✅ Agentic Honeypot started")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release background resources."""
+    if idle_timers is not None:
+        await idle_timers.stop()
+    await callback_dispatcher.stop()
+    if callback_outbox is not None:
+        callback_outbox.close()
+    close_session_store()
+    await close_client()
+    if _batch_pool is not None:
+        _batch_pool.shutdown(wait=False, cancel_futures=True)
+    stop_logging()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
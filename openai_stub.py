@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible chat-completions stub for offline benchmarks and load tests.
+
+Unlike MOCK_MODE, the honeypot keeps using its real AsyncOpenAI client, so
+connection pooling, timeouts, retries and streaming are all exercised.
+
+Usage:
+    python openai_stub.py --port 8001 --latency lognormal --latency-ms 400
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=stub uvicorn main:app
+
+Latency distributions (time to the first byte of each response):
+    fixed      every response takes --latency-ms
+    lognormal  median --latency-ms, spread --sigma
+    pareto     heavy-tailed: at least --latency-ms, tail index --alpha
+All samples are capped at --max-latency-ms.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from extractor import extract_identifiers
+
+# Defaults can be set through the environment as well as on the command line
+STUB_CONFIG: Dict[str, Any] = {
+    "latency": os.getenv("STUB_LATENCY", "lognormal").lower(),
+    "latency_ms": float(os.getenv("STUB_LATENCY_MS", "400")),
+    "sigma": float(os.getenv("STUB_LATENCY_SIGMA", "0.5")),
+    "alpha": float(os.getenv("STUB_PARETO_ALPHA", "1.5")),
+    "max_latency_ms": float(os.getenv("STUB_MAX_LATENCY_MS", "30000")),
+    "error_rate": float(os.getenv("STUB_ERROR_RATE", "0")),
+    "error_statuses": [int(s) for s in os.getenv("STUB_ERROR_STATUSES", "500,503,429").split(",")],
+    "timeout_rate": float(os.getenv("STUB_TIMEOUT_RATE", "0")),
+    "timeout_seconds": float(os.getenv("STUB_TIMEOUT_SECONDS", "60")),
+    "chunk_ms": float(os.getenv("STUB_STREAM_CHUNK_MS", "20")),
+}
+LATENCY_DISTRIBUTIONS = ("fixed", "lognormal", "pareto")
+
+RNG = random.Random(int(os.getenv("STUB_SEED")) if os.getenv("STUB_SEED") else None)
+
+CANNED_REPLIES = (
+    "Oh no, what happened to my account? Which branch are you calling from?",
+    "I'm a bit confused. Can you tell me your full name and employee ID?",
+    "My grandson usually helps me with this. Where exactly should I send it?",
+    "Okay, I'm trying but the app shows an error. Can you give me another UPI ID?",
+    "Which number can I call you back on? My phone balance is low.",
+    "Is there a website I can check first? I want to be careful.",
+)
+
+STATS = {"requests": 0, "replies": 0, "extractions": 0, "combined": 0,
+         "streams": 0, "errors": 0, "timeouts": 0}
+
+app = FastAPI(title="OpenAI stub")
+
+
+def sample_latency() -> float:
+    """Seconds to wait before responding, drawn from the configured distribution."""
+    base = STUB_CONFIG["latency_ms"]
+    kind = STUB_CONFIG["latency"]
+    if kind == "lognormal":
+        # exp(N(mu, sigma)) has median exp(mu)
+        delay = RNG.lognormvariate(0, STUB_CONFIG["sigma"]) * base
+    elif kind == "pareto":
+        delay = RNG.paretovariate(STUB_CONFIG["alpha"]) * base
+    else:
+        delay = base
+    return min(delay, STUB_CONFIG["max_latency_ms"]) / 1000
+
+
+def _last_user_text(messages: List[Dict[str, Any]]) -> str:
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            return str(message.get("content") or "")
+    return ""
+
+
+def _extraction(text: str) -> Dict[str, List[str]]:
+    """Canned extraction JSON: whatever the deterministic extractor finds."""
+    found = extract_identifiers(text)
+    return {"upi": found["upi"], "accounts": found["accounts"],
+            "urls": found["urls"], "phones": found["phones"]}
+
+
+def build_content(body: Dict[str, Any]) -> str:
+    """Reply text, extraction JSON or combined JSON, depending on the request."""
+    messages = body.get("messages") or []
+    last_text = _last_user_text(messages)
+    system = str(messages[0].get("content") or "") if messages else ""
+    reply = CANNED_REPLIES[len(messages) % len(CANNED_REPLIES)]
+
+    if "Extract financial data" in system:
+        STATS["extractions"] += 1
+        # The extraction prompt quotes the message as: Last message: '...'
+        start = last_text.find("Last message: '")
+        if start != -1:
+            last_text = last_text[start + len("Last message: '"):last_text.rfind("'")]
+        return json.dumps(_extraction(last_text))
+    if (body.get("response_format") or {}).get("type") == "json_object":
+        STATS["combined"] += 1
+        return json.dumps({"reply": reply, **_extraction(last_text)})
+    STATS["replies"] += 1
+    return reply
+
+
+def _usage(body: Dict[str, Any], content: str) -> Dict[str, int]:
+    """Rough token counts (~4 characters per token)."""
+    prompt = sum(len(str(m.get("content") or "")) for m in body.get("messages") or []) // 4
+    completion = len(content) // 4
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+
+def _error_response(status: int) -> JSONResponse:
+    kind = "rate_limit_exceeded" if status == 429 else "server_error"
+    return JSONResponse(status_code=status, content={
+        "error": {"message": f"Injected {status} from openai_stub", "type": kind, "param": None, "code": kind}
+    })
+
+
+async def _stream(completion_id: str, model: str, content: str):
+    """Server-sent chat.completion.chunk events, one word per chunk."""
+    def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+        event = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                 "model": model, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+        return f"data: {json.dumps(event)}\n\n"
+
+    yield chunk({"role": "assistant", "content": ""})
+    words = content.split(" ")
+    for i, word in enumerate(words):
+        if i:
+            await asyncio.sleep(STUB_CONFIG["chunk_ms"] / 1000)
+        yield chunk({"content": word if i == 0 else f" {word}"})
+    yield chunk({}, "stop")
+    yield "data: [DONE]\n\n"
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    STATS["requests"] += 1
+
+    roll = RNG.random()
+    if roll < STUB_CONFIG["timeout_rate"]:
+        # Hold the request open past the client's timeout
+        STATS["timeouts"] += 1
+        await asyncio.sleep(STUB_CONFIG["timeout_seconds"])
+        return _error_response(504)
+    await asyncio.sleep(sample_latency())
+    if roll < STUB_CONFIG["timeout_rate"] + STUB_CONFIG["error_rate"]:
+        STATS["errors"] += 1
+        return _error_response(RNG.choice(STUB_CONFIG["error_statuses"]))
+
+    model = body.get("model", "gpt-3.5-turbo")
+    completion_id = f"chatcmpl-stub-{uuid.uuid4().hex[:12]}"
+    content = build_content(body)
+    if body.get("stream"):
+        STATS["streams"] += 1
+        return StreamingResponse(_stream(completion_id, model, content), media_type="text/event-stream")
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": _usage(body, content)
+    }
+
+
+@app.get("/v1/models")
+async def list_models():
+    """Used by the honeypot's connection pre-warming; answered without delay."""
+    return {"object": "list", "data": [
+        {"id": "gpt-3.5-turbo", "object": "model", "created": 0, "owned_by": "openai_stub"}
+    ]}
+
+
+@app.get("/stats")
+async def stats():
+    return {**STATS, "config": STUB_CONFIG}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("STUB_PORT", "8001")))
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default=STUB_CONFIG["latency"])
+    parser.add_argument("--latency-ms", type=float, default=STUB_CONFIG["latency_ms"])
+    parser.add_argument("--sigma", type=float, default=STUB_CONFIG["sigma"])
+    parser.add_argument("--alpha", type=float, default=STUB_CONFIG["alpha"])
+    parser.add_argument("--max-latency-ms", type=float, default=STUB_CONFIG["max_latency_ms"])
+    parser.add_argument("--error-rate", type=float, default=STUB_CONFIG["error_rate"],
+                        help="fraction of requests answered with an error status")
+    parser.add_argument("--error-statuses", default=",".join(map(str, STUB_CONFIG["error_statuses"])))
+    parser.add_argument("--timeout-rate", type=float, default=STUB_CONFIG["timeout_rate"],
+                        help="fraction of requests held open for --timeout-seconds")
+    parser.add_argument("--timeout-seconds", type=float, default=STUB_CONFIG["timeout_seconds"])
+    parser.add_argument("--chunk-ms", type=float, default=STUB_CONFIG["chunk_ms"],
+                        help="delay between streamed chunks")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    STUB_CONFIG.update(
+        latency=args.latency, latency_ms=args.latency_ms, sigma=args.sigma, alpha=args.alpha,
+        max_latency_ms=args.max_latency_ms, error_rate=args.error_rate,
+        error_statuses=[int(s) for s in args.error_statuses.split(",")],
+        timeout_rate=args.timeout_rate, timeout_seconds=args.timeout_seconds, chunk_ms=args.chunk_ms
+    )
+    if args.seed is not None:
+        RNG.seed(args.seed)
+
+    import uvicorn
+    print(f"🧪 OpenAI stub on http://{args.host}:{args.port}/v1 "
+          f"({args.latency} {args.latency_ms:.0f}ms, errors {args.error_rate:.1%}, timeouts {args.timeout_rate:.1%})")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS callback_outbox (
+    idempotency_key TEXT PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',  -- pending | sent | failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_callback_outbox_status ON callback_outbox (status, created_at);
+"""
+
+
+def idempotency_key(session_id: str, revision: Optional[int] = None) -> str:
+    """
+    One final-result callback per session. A finished session whose callback
+    already went out with an earlier snapshot sends an update under its own
+    key, revision = messages exchanged, so idempotent receivers don't drop it.
+    """
+    return f"{session_id}:final" if revision is None else f"{session_id}:final:{revision}"
+
+
+class CallbackOutbox:
+    """
+    Durable SQLite (WAL mode) outbox for GUVI callbacks.
+
+    A callback is recorded as a 'pending' row before it is handed to the
+    dispatcher, so a restart can replay it. The primary key is the
+    idempotency key, so recording the same session twice is a no-op and a
+    racy retry cannot create a second delivery. Delivery results are
+    buffered and written in one transaction per flush to keep write
+    throughput high under load.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")  # WAL + NORMAL: no fsync per commit
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._results: List[Tuple[str, int, str]] = []  # (status, attempts, key) awaiting flush
+
+    def record(self, session_id: str, payload: Dict[str, Any], revision: Optional[int] = None) -> Optional[str]:
+        """
+        Record a pending callback. Returns its idempotency key, or None when
+        the session's callback (of this revision) is already pending or sent.
+        A previously failed callback is re-armed with the new payload.
+        """
+        key = idempotency_key(session_id, revision)
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                INSERT INTO callback_outbox (idempotency_key, session_id, payload, status, created_at, updated_at)
+                VALUES (?, ?, ?, 'pending', ?, ?)
+                ON CONFLICT (idempotency_key) DO UPDATE SET
+                    payload = excluded.payload, status = 'pending', attempts = 0, updated_at = excluded.updated_at
+                WHERE callback_outbox.status = 'failed'
+                """,
+                (key, session_id, json.dumps(payload), now, now)
+            )
+        return key if cursor.rowcount else None
+
+    def mark_sent(self, key: str, attempts: int):
+        self._buffer_result("sent", attempts, key)
+
+    def mark_failed(self, key: str, attempts: int):
+        self._buffer_result("failed", attempts, key)
+
+    def _buffer_result(self, status: str, attempts: int, key: str):
+        with self._lock:
+            self._results.append((status, attempts, key))
+
+    def flush(self) -> int:
+        """Write buffered delivery results in a single transaction."""
+        with self._lock:
+            if not self._results:
+                return 0
+            results, self._results = self._results, []
+            now = time.time()
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "UPDATE callback_outbox SET status = ?, attempts = ?, updated_at = ? WHERE idempotency_key = ?",
+                [(status, attempts, now, key) for status, attempts, key in results]
+            )
+            self._conn.execute("COMMIT")
+        return len(results)
+
+    def pending(self, limit: int = 500, after: str = "") -> List[Tuple[str, Dict[str, Any]]]:
+        """Pending callbacks (idempotency key order) for replay, one batch at a time."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT idempotency_key, payload FROM callback_outbox "
+                "WHERE status = 'pending' AND idempotency_key > ? ORDER BY idempotency_key LIMIT ?",
+                (after, limit)
+            ).fetchall()
+        return [(key, json.loads(payload)) for key, payload in rows]
+
+    def status(self, session_id: str, revision: Optional[int] = None) -> Optional[str]:
+        """Delivery status of a session's callback, or None if never recorded."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status FROM callback_outbox WHERE idempotency_key = ?",
+                (idempotency_key(session_id, revision),)
+            ).fetchone()
+        return row[0] if row else None
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM callback_outbox GROUP BY status"
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
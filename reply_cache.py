@@ -0,0 +1,97 @@
+import hashlib
+import random
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class _CacheEntry:
+    __slots__ = ("replies", "created_at", "next_index")
+
+    def __init__(self, created_at: float):
+        self.replies: List[str] = []
+        self.created_at = created_at
+        self.next_index = 0
+
+
+class ReplyCache:
+    """
+    Bounded LRU + TTL cache of agent replies.
+
+    Each key holds a pool of up to `pool_size` replies. Until the pool is full
+    every lookup is a miss, so the caller generates a fresh reply and adds it.
+    Once full, lookups are served from the pool ("random" or "round_robin"
+    policy) so identical scam templates don't get identical answers.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600,
+                 pool_size: int = 3, policy: str = "random"):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.pool_size = max(1, pool_size)
+        self.policy = policy
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(persona: str, stage: str, history: List[Dict[str, Any]], window: int) -> str:
+        """Key on persona, stage and the normalized last `window` messages."""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{persona}\x1f{stage}".encode())
+        for msg in list(history)[-window:] if window > 0 else []:
+            text = _WHITESPACE.sub(" ", msg.get("text", "").lower()).strip()
+            digest.update(f"\x1e{msg.get('sender', '')}\x1f{text}".encode())
+        return digest.hexdigest()
+
+    def _live_entry(self, key: str, now: float) -> Optional[_CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None and now - entry.created_at > self.ttl_seconds:
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        return entry
+
+    def get(self, key: str) -> Optional[str]:
+        """Return a pooled reply, or None if the pool for this key is not full yet."""
+        entry = self._live_entry(key, time.monotonic())
+        if entry is None or len(entry.replies) < self.pool_size:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        if self.policy == "round_robin":
+            reply = entry.replies[entry.next_index % len(entry.replies)]
+            entry.next_index += 1
+            return reply
+        return random.choice(entry.replies)
+
+    def put(self, key: str, reply: str):
+        """Add a freshly generated reply to the key's pool."""
+        now = time.monotonic()
+        entry = self._live_entry(key, now)
+        if entry is None:
+            entry = _CacheEntry(now)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._entries.move_to_end(key)
+        if len(entry.replies) < self.pool_size:
+            entry.replies.append(reply)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters and current size."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "size": len(self._entries)
+        }
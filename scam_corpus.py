@@ -0,0 +1,128 @@
+"""
+Scam message corpora shared by test_all_categories.py and load_test.py.
+"""
+
+from typing import List, Tuple
+
+# (title, message, sessionId) - one opening message per scam category
+SINGLE_TURN_SCAMS: List[Tuple[str, str, str]] = [
+    # Banking/KYC
+    ("Banking: Account Blocked",
+     "Your bank account will be blocked today. Verify immediately at this link.",
+     "test-banking-1"),
+    ("Banking: KYC Verification",
+     "KYC incomplete: Update now to avoid suspension. Click here.",
+     "test-banking-2"),
+    ("Banking: OTP Request",
+     "We have detected unusual activity on your account. Please share your OTP to verify.",
+     "test-banking-3"),
+    ("Banking: Card Disabled",
+     "SBI ALERT: Your card has been disabled. Send PAN and Aadhaar to 98888XXXXX.",
+     "test-banking-4"),
+    # Delivery/Refund
+    ("Delivery: Package Customs",
+     "Your package is held at customs. Pay ₹50 using UPI to release it.",
+     "test-delivery-1"),
+    ("Refund: Amazon Refund",
+     "Amazon refund initiated. Please verify UPI to receive funds.",
+     "test-refund-1"),
+    # Job/Prize/Loan
+    ("Prize: KBC Contest",
+     "Congratulations! You've won ₹5,00,000 in the Kaun Banega Crorepati contest!",
+     "test-prize-1"),
+    ("Job: Work From Home",
+     "Part-time job offer: earn ₹50,000/week. No skills needed. DM now.",
+     "test-job-1"),
+    ("Loan: Instant Credit",
+     "Loan approved for ₹2,00,000. Pay ₹499 processing fee to get instant credit.",
+     "test-loan-1"),
+    # Investment/Crypto
+    ("Investment: Double Money",
+     "Double your money in 48 hours! Send ₹500 to trader@upi to join now.",
+     "test-invest-1"),
+    ("Crypto: Govt Scheme",
+     "Govt crypto scheme offering 30% monthly return. Limited slots!",
+     "test-crypto-1"),
+    # Romance/Social Engineering
+    ("Romance: Friend Request",
+     "Hi, I'm Priya. Want to be friends? Let's talk on WhatsApp 😊",
+     "test-romance-1"),
+    ("SE: Money Transfer",
+     "I'm stuck abroad and need urgent help. Can you send ₹2000 to my UPI?",
+     "test-se-1"),
+    # Threatening/Urgent
+    ("Threat: SIM Deactivation",
+     "Your SIM will be deactivated in 24 hrs. Urgent KYC needed.",
+     "test-threat-1"),
+    ("Threat: Tax Raid",
+     "Income Tax raid scheduled. Clear dues by paying ₹1500 via UPI immediately.",
+     "test-threat-2"),
+    ("Threat: Cyber Cell",
+     "Cyber Cell complaint filed against your number. Resolve it here: [link]",
+     "test-threat-3"),
+]
+
+# (title, message) - one scripted KYC -> payment -> urgency conversation
+MULTI_TURN_SCRIPT: List[Tuple[str, str]] = [
+    ("Turn 1: KYC Verification Request",
+     "Your KYC is incomplete. Verify your identity now."),
+    ("Turn 2: Now asking for Payment (Agent should remember KYC context)",
+     "Now you need to send ₹500 to complete the process."),
+    ("Turn 3: Now adding Urgency (Agent should remember KYC + PAYMENT + URGENCY)",
+     "Do this immediately or your account will be blocked!"),
+]
+
+# Later-turn templates for generated conversations; {n} is a per-session number
+# so identifiers differ between sessions
+FOLLOW_UPS: List[str] = [
+    "Sir this is the last warning. Your account will be closed in 30 minutes.",
+    "Send ₹{amount} to verify{n}@ybl now to keep your account active.",
+    "Call our officer on 98{n:08d} immediately for verification.",
+    "Open https://secure-kyc-{n}.in/update and enter your details.",
+    "Transfer the fee to account 5010{n:08d}, IFSC HDFC0001234.",
+    "Why are you not responding? Share the OTP you received.",
+    "This is Cyber Cell. A complaint is filed against you, pay the fine today.",
+]
+
+# Legitimate messages that use the same everyday words scams do ("now",
+# "account", "link", "send", "update", ...) - false-positive probes for the detector
+HAM_MESSAGES: List[str] = [
+    "Are you coming now? The movie starts at 7.",
+    "I'll send the meeting link in a minute.",
+    "Can you update the spreadsheet before lunch?",
+    "My account on Netflix is acting weird, can you check yours?",
+    "Happy birthday! Have a great day 🎂",
+    "Mom says dinner is ready, come home now.",
+    "The package arrived, thanks for the gift!",
+    "Please confirm if you can attend the wedding on Sunday.",
+    "Running late, stuck in traffic near the office.",
+    "Let's talk on WhatsApp later tonight.",
+    "I transferred the rent to the landlord yesterday.",
+    "Did you see the link I shared about the trek?",
+    "Can you pick up milk on your way back?",
+    "Your Swiggy order is on the way and will arrive in 20 minutes.",
+    "Team lunch moved to Friday, please update your calendar.",
+    "The interest rate on my home loan went up again, so annoying.",
+    "Congratulations on the new job! So proud of you.",
+    "Call me when you're free, need advice about the car.",
+    "Meeting notes are attached to the email I sent.",
+    "Good morning! Don't forget the doctor's appointment at 11.",
+    "Your electricity bill of Rs 1240 has been paid successfully. Thank you.",
+    "Can you share the photos from the trip?",
+    "I'm at the bank now, will be home by 5.",
+    "The kids won their football match today!",
+    "Reminder: parent-teacher meeting tomorrow at 10 AM.",
+    "I'll be working from home today, ping me if needed.",
+    "Thanks for the help with the move, I owe you one.",
+    "Please verify the figures in the report before sending it to the client.",
+    "Grandma wants to video call everyone on Sunday.",
+    "The delivery guy left the parcel with the security guard.",
+]
+
+
+def labeled_corpus() -> List[Tuple[str, bool]]:
+    """(message, is_scam) pairs for detection accuracy checks."""
+    scams = [message for _, message, _ in SINGLE_TURN_SCAMS]
+    scams += [message for _, message in MULTI_TURN_SCRIPT]
+    scams += [template.format(n=1, amount=500) for template in FOLLOW_UPS]
+    return [(message, True) for message in scams] + [(message, False) for message in HAM_MESSAGES]
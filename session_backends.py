@@ -0,0 +1,538 @@
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from intel_store import Intelligence
+from session_types import Session, chain_digest
+
+CALLBACK_FLAGS = ("callbackQueued", "callbackSent")
+
+logger = logging.getLogger(__name__)
+
+
+class CompactSession(NamedTuple):
+    """Frozen summary of a finished session whose callback was sent (no history)."""
+    sessionId: str
+    agentEngaged: bool
+    startTime: datetime
+    endTime: Optional[datetime]
+    totalMessages: int
+    extractedIntelligence: Intelligence
+    noteEvents: Dict[Tuple[str, str], None]
+    campaignId: Optional[str]
+    callbackQueued: bool
+    callbackSent: bool
+    topicMask: int
+    topicScanned: int
+    historyTotal: int
+    historyHash: int
+
+    @classmethod
+    def from_session(cls, session: Session) -> "CompactSession":
+        history = session["conversationHistory"]
+        fields = {field: session[field] for field in cls._fields
+                  if field not in ("historyTotal", "historyHash")}
+        return cls(historyTotal=len(history), historyHash=history.digest, **fields)
+
+    def thaw(self) -> Dict:
+        """Session data again (e.g. the scammer came back); history starts empty."""
+        session = self._asdict()
+        session["noteEvents"] = dict(self.noteEvents)
+        session["conversationHistory"] = []
+        return session
+
+
+Restore = Callable[[Dict[str, Any]], Session]
+
+
+class MemorySessionBackend:
+    """
+    Per-process dict of live session dicts (the default; one worker only).
+
+    Sessions are kept in LRU order. Beyond `max_sessions` the least recently
+    used session is evicted, and sessions untouched for `ttl_seconds` expire;
+    both are checked from the cold end of the LRU order when a session is
+    created, so nothing scans the whole store. 0 disables either limit.
+    Finished sessions can be compacted into a CompactSession.
+    """
+
+    def __init__(self, restore: Restore, max_sessions: int = 0, ttl_seconds: float = 0):
+        self.restore = restore
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.sessions: "OrderedDict[str, Any]" = OrderedDict()
+        self._last_access: Dict[str, float] = {}
+        self.stats = {"evictions": 0, "expirations": 0, "compactions": 0}
+
+    def load(self, session_id: str) -> Optional[Session]:
+        session = self.sessions.get(session_id)
+        if session is None:
+            return None
+        now = time.monotonic()
+        if self.ttl_seconds and now - self._last_access[session_id] > self.ttl_seconds:
+            self._drop(session_id, "expirations")
+            return None
+        self.sessions.move_to_end(session_id)
+        self._last_access[session_id] = now
+        if isinstance(session, CompactSession):
+            return self.restore(session.thaw())  # saving this copy makes the session live again
+        return session
+
+    def save(self, session: Session):
+        session_id = session["sessionId"]
+        created = session_id not in self.sessions
+        self.sessions[session_id] = session
+        self.sessions.move_to_end(session_id)
+        self._last_access[session_id] = time.monotonic()
+        if created:
+            self._enforce_limits()
+
+    def _enforce_limits(self):
+        now = time.monotonic()
+        while self.sessions:
+            oldest = next(iter(self.sessions))
+            if self.max_sessions and len(self.sessions) > self.max_sessions:
+                self._drop(oldest, "evictions")
+            elif self.ttl_seconds and now - self._last_access[oldest] > self.ttl_seconds:
+                self._drop(oldest, "expirations")
+            else:
+                break
+
+    def _drop(self, session_id: str, counter: str):
+        del self.sessions[session_id]
+        del self._last_access[session_id]
+        self.stats[counter] += 1
+
+    def compact(self, session_id: str):
+        session = self.sessions.get(session_id)
+        if session is not None and not isinstance(session, CompactSession):
+            self.sessions[session_id] = CompactSession.from_session(session)
+            self.stats["compactions"] += 1
+
+    def claim_callback(self, session_id: str) -> bool:
+        session = self.load(session_id)
+        if session is None or session["callbackQueued"] or session["callbackSent"]:
+            return False
+        self.set_callback_flag(session_id, "callbackQueued", True)
+        return True
+
+    def set_callback_flag(self, session_id: str, flag: str, value: bool):
+        session = self.sessions.get(session_id)
+        if isinstance(session, CompactSession):
+            self.sessions[session_id] = session._replace(**{flag: value})
+        elif session is not None:
+            session[flag] = value
+
+    def size(self) -> int:
+        return len(self.sessions)
+
+    def engaged(self) -> int:
+        # Compacted sessions are finished; evicted ones are simply gone
+        return sum(1 for session in self.sessions.values()
+                   if not isinstance(session, CompactSession)
+                   and session["agentEngaged"] and session["endTime"] is None)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    version TEXT NOT NULL,
+    callback_queued INTEGER NOT NULL DEFAULT 0,
+    callback_sent INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_updated_at ON sessions (updated_at);
+"""
+
+FLAG_COLUMNS = {"callbackQueued": "callback_queued", "callbackSent": "callback_sent"}
+
+# Base that never matches a stored version: the next write must rebase
+REBASE = ""
+
+
+class _Pending(NamedTuple):
+    """A buffered save: the JSON snapshot and the base it was made from."""
+    version: str
+    session: Session
+    data: str
+    base: Optional[Tuple[str, int, int]]
+    history_total: int
+    total_messages: int
+
+
+def _encode(session: Session) -> Tuple[str, int, int]:
+    data = session.to_dict()
+    for flag in CALLBACK_FLAGS:
+        del data[flag]
+    return json.dumps(data, separators=(",", ":")), data["historyTotal"], data["totalMessages"]
+
+
+def _rebase(stored: Dict[str, Any], ours: Dict[str, Any], base_history: int, base_messages: int) -> Dict[str, Any]:
+    """
+    Re-apply the changes in `ours` (made on top of a row with `base_history`
+    messages and `base_messages` turns) onto the row another worker wrote
+    since: new messages are appended, counters advance by our delta and
+    intelligence, notes and flags are merged.
+    """
+    merged = dict(stored)
+    new_messages = ours["historyTotal"] - base_history
+    if new_messages > 0:
+        added = ours["conversationHistory"][-new_messages:]
+        merged["conversationHistory"] = stored["conversationHistory"] + added
+        merged["historyTotal"] = stored["historyTotal"] + new_messages
+        digest = stored.get("historyHash", 0)
+        for message in added:
+            digest = chain_digest(digest, message["sender"], message["text"])
+        merged["historyHash"] = digest
+    merged["totalMessages"] = stored["totalMessages"] + max(0, ours["totalMessages"] - base_messages)
+    merged["agentEngaged"] = stored["agentEngaged"] or ours["agentEngaged"]
+    merged["startTime"] = min(stored["startTime"], ours["startTime"], key=datetime.fromisoformat)
+    merged["endTime"] = stored.get("endTime") or ours.get("endTime")
+    merged["campaignId"] = stored.get("campaignId") or ours.get("campaignId")
+    intelligence = Intelligence.from_dict(stored["extractedIntelligence"])
+    for field, values in ours["extractedIntelligence"].items():
+        intelligence.add(field, values)
+    merged["extractedIntelligence"] = intelligence.to_dict()
+    events = {tuple(event): None for event in stored.get("noteEvents", ())}
+    events.update((tuple(event), None) for event in ours.get("noteEvents", ()))
+    merged["noteEvents"] = [list(event) for event in events]
+    merged["topicMask"] = stored.get("topicMask", 0) | ours.get("topicMask", 0)
+    merged["topicScanned"] = min(stored.get("topicScanned", 0), ours.get("topicScanned", 0))
+    merged["lastActivity"] = max(stored.get("lastActivity", 0), ours.get("lastActivity", 0))
+    return merged
+
+
+class SQLiteSessionBackend:
+    """
+    File-based SQLite session store shared by every worker on a host.
+
+    One row per session. The session dict is stored as JSON; the callback
+    flags are separate columns updated in place, so `claim_callback` is a
+    single atomic UPDATE and two workers can never both queue a session's
+    callback.
+
+    Writes are compare-and-set on the row version: each Session remembers the
+    version it was read from (`_base`). If another worker wrote the row since,
+    the save is rebased onto it (see _rebase) instead of overwriting it, so
+    concurrent turns for one session on two workers both survive.
+
+    Disk I/O never happens on the caller's thread for saves: they go to a
+    write-behind buffer that a writer thread commits every `flush_interval`
+    seconds, right away with flush_interval=0, or once `max_buffered`
+    sessions are dirty. Reads use their own connection (WAL readers never
+    wait for writers), and loads are served from a per-process cache;
+    `revalidate` re-reads a session only if another worker changed it and is
+    meant to be called off the event loop at the start of a turn.
+
+    Rows not written for `ttl_seconds` are purged every `purge_interval`
+    seconds; compacted sessions are rewritten without their history.
+    """
+
+    def __init__(self, path: str, restore: Restore, flush_interval: float = 0.05,
+                 max_buffered: int = 256, cache_size: int = 10000,
+                 ttl_seconds: float = 0, purge_interval: float = 60, size_refresh: float = 5):
+        self.path = path
+        self.restore = restore
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        self.cache_size = cache_size
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval = purge_interval
+        self.size_refresh = size_refresh
+        self.stats = {"evictions": 0, "expirations": 0, "compactions": 0, "rebases": 0}
+        self._writer = self._connect()
+        self._writer.executescript(SQLITE_SCHEMA)
+        self._reader = self._connect()
+        self._lock = threading.Lock()  # buffers and cache only; never held during I/O
+        self._write_lock = threading.Lock()  # the writer connection
+        self._read_lock = threading.Lock()  # the reader connection
+        self._dirty: Dict[str, _Pending] = {}
+        self._flags: Dict[str, Dict[str, bool]] = {}  # pending callback flag updates
+        self._cache: "OrderedDict[str, Tuple[str, Session]]" = OrderedDict()
+        self._instance = os.urandom(4).hex()
+        self._versions = itertools.count()
+        self._size, self._engaged = self._count()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, name="session-writer", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _next_version(self) -> str:
+        return f"{os.getpid()}-{self._instance}-{next(self._versions)}"
+
+    def _remember(self, session_id: str, version: str, session: Session):
+        self._cache[session_id] = (version, session)
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+            self.stats["evictions"] += 1  # dropped from the local cache; the row stays on disk
+
+    def _with_pending_flags(self, session_id: str, session: Session) -> Session:
+        for flag, value in self._flags.get(session_id, {}).items():
+            session[flag] = value
+        return session
+
+    def load(self, session_id: str) -> Optional[Session]:
+        """Buffered or cached session if there is one, else read it from disk."""
+        with self._lock:
+            pending = self._dirty.get(session_id)
+            if pending is not None:
+                return pending.session
+            cached = self._cache.get(session_id)
+            if cached is not None:
+                self._cache.move_to_end(session_id)
+                return cached[1]
+        return self.revalidate(session_id)
+
+    def revalidate(self, session_id: str) -> Optional[Session]:
+        """Re-read the row if another worker wrote it since this process last saw it."""
+        with self._read_lock:
+            row = self._reader.execute(
+                "SELECT version, callback_queued, callback_sent FROM sessions WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+            data = cached = None
+            if row is not None:
+                with self._lock:
+                    cached = self._cache.get(session_id)
+                if cached is None or cached[0] != row[0]:
+                    data = self._reader.execute(
+                        "SELECT data FROM sessions WHERE session_id = ?", (session_id,)
+                    ).fetchone()
+                    if data is None:
+                        row = None  # purged in between
+        with self._lock:
+            pending = self._dirty.get(session_id)
+            if pending is not None:
+                return pending.session  # saved meanwhile; that copy is the newest
+            if row is None:
+                return None
+            version, queued, sent = row
+            if data is None:
+                session = cached[1]  # unchanged since this process last saw it
+            else:
+                stored = json.loads(data[0])
+                session = self.restore(stored)
+                session._base = (version, stored["historyTotal"], stored["totalMessages"])
+                self._remember(session_id, version, session)
+            session["callbackQueued"] = bool(queued)
+            session["callbackSent"] = bool(sent)
+            return self._with_pending_flags(session_id, session)
+
+    def save(self, session: Session):
+        session_id = session["sessionId"]
+        data, history_total, total_messages = _encode(session)
+        with self._lock:
+            version = self._next_version()
+            self._remember(session_id, version, session)
+            # Snapshot now: the writer thread must not read sessions the event loop is mutating
+            self._dirty[session_id] = _Pending(version, session, data, session._base,
+                                               history_total, total_messages)
+            if self.flush_interval <= 0 or len(self._dirty) >= self.max_buffered:
+                self._wake.set()
+
+    def _write(self, session_id: str, pending: _Pending, now: float) -> bool:
+        """Compare-and-set one session row; returns True if it had to be rebased."""
+        conn = self._writer
+        if pending.base is not None and conn.execute(
+            "UPDATE sessions SET data = ?, version = ?, updated_at = ? WHERE session_id = ? AND version = ?",
+            (pending.data, pending.version, now, session_id, pending.base[0])
+        ).rowcount:
+            return False
+        row = conn.execute("SELECT data FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        if row is None:
+            conn.execute(
+                "INSERT INTO sessions (session_id, data, version, updated_at) VALUES (?, ?, ?, ?)",
+                (session_id, pending.data, pending.version, now)
+            )
+            return False
+        _, base_history, base_messages = pending.base or (REBASE, 0, 0)
+        merged = _rebase(json.loads(row[0]), json.loads(pending.data), base_history, base_messages)
+        conn.execute(
+            "UPDATE sessions SET data = ?, version = ?, updated_at = ? WHERE session_id = ?",
+            (json.dumps(merged, separators=(",", ":")), pending.version, now, session_id)
+        )
+        return True
+
+    def flush(self):
+        """Write every buffered session and flag update in a single transaction."""
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty and not self._flags:
+                    return
+                dirty, self._dirty = self._dirty, {}
+                flags, self._flags = self._flags, {}
+            now = time.time()
+            rebased = []
+            self._writer.execute("BEGIN IMMEDIATE")
+            try:
+                for session_id, pending in dirty.items():
+                    if self._write(session_id, pending, now):
+                        rebased.append(session_id)
+                for session_id, updates in flags.items():
+                    for flag, value in updates.items():
+                        self._writer.execute(
+                            f"UPDATE sessions SET {FLAG_COLUMNS[flag]} = ? WHERE session_id = ?",
+                            (int(value), session_id)
+                        )
+                self._writer.execute("COMMIT")
+            except Exception:
+                self._writer.execute("ROLLBACK")
+                # Keep the writes buffered (newer saves win) and retry on the next flush
+                with self._lock:
+                    for session_id, pending in dirty.items():
+                        self._dirty.setdefault(session_id, pending)
+                    for session_id, updates in flags.items():
+                        self._flags[session_id] = {**updates, **self._flags.get(session_id, {})}
+                raise
+            with self._lock:
+                self.stats["rebases"] += len(rebased)
+                for session_id, pending in dirty.items():
+                    self._written(session_id, pending, session_id in rebased)
+
+    def _written(self, session_id: str, pending: _Pending, rebased: bool):
+        """Advance the session's base past a committed write."""
+        if rebased:
+            # The row now also holds another worker's changes this copy lacks:
+            # drop it from the cache and rebase any later save of it again
+            new_base = (REBASE, pending.history_total, pending.total_messages)
+            cached = self._cache.get(session_id)
+            if cached is not None and cached[1] is pending.session and session_id not in self._dirty:
+                del self._cache[session_id]
+        else:
+            new_base = (pending.version, pending.history_total, pending.total_messages)
+        if pending.session._base == pending.base:
+            pending.session._base = new_base
+        later = self._dirty.get(session_id)
+        if later is not None and later.session is pending.session and later.base == pending.base:
+            self._dirty[session_id] = later._replace(base=new_base)
+
+    def compact(self, session_id: str):
+        session = self.load(session_id)
+        # len() of the history counts every message ever sent; a compacted
+        # session keeps that count but retains no messages
+        if session is None or not session["conversationHistory"].retained():
+            return
+        compacted = self.restore(CompactSession.from_session(session).thaw())
+        compacted._base = session._base
+        self.save(compacted)
+        self.stats["compactions"] += 1
+
+    def purge_expired(self) -> int:
+        """Delete rows not written for ttl_seconds."""
+        if not self.ttl_seconds:
+            return 0
+        self.flush()
+        with self._write_lock:
+            expired = self._writer.execute(
+                "DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.ttl_seconds,)
+            ).rowcount
+        self.stats["expirations"] += expired
+        return expired
+
+    def _count(self) -> Tuple[int, int]:
+        with self._read_lock:
+            total, engaged = self._reader.execute(
+                "SELECT COUNT(*), COALESCE(SUM(json_extract(data, '$.agentEngaged') = 1 "
+                "AND json_extract(data, '$.endTime') IS NULL), 0) FROM sessions"
+            ).fetchone()
+        return total, engaged
+
+    def size(self) -> int:
+        """Row count, refreshed by the writer thread every `size_refresh` seconds."""
+        return self._size
+
+    def engaged(self) -> int:
+        """Engaged, unfinished sessions across all workers; refreshed with size."""
+        return self._engaged
+
+    def claim_callback(self, session_id: str) -> bool:
+        """Atomic claim; blocking I/O, so call it off the event loop."""
+        self.flush()  # the row must exist before its flags can be claimed
+        with self._write_lock:
+            claimed = self._writer.execute(
+                "UPDATE sessions SET callback_queued = 1 "
+                "WHERE session_id = ? AND callback_queued = 0 AND callback_sent = 0",
+                (session_id,)
+            ).rowcount == 1
+        if claimed:
+            with self._lock:
+                self._set_cached_flag(session_id, "callbackQueued", True)
+        return claimed
+
+    def set_callback_flag(self, session_id: str, flag: str, value: bool):
+        """Buffered like saves; written by the writer thread after the session rows."""
+        with self._lock:
+            self._flags.setdefault(session_id, {})[flag] = value
+            self._set_cached_flag(session_id, flag, value)
+        self._wake.set()
+
+    def _set_cached_flag(self, session_id: str, flag: str, value: bool):
+        pending = self._dirty.get(session_id)
+        if pending is not None:
+            pending.session[flag] = value
+        cached = self._cache.get(session_id)
+        if cached is not None:
+            cached[1][flag] = value
+
+    def _flush_loop(self):
+        interval = self.flush_interval if self.flush_interval > 0 else self.purge_interval
+        next_purge = time.monotonic() + self.purge_interval
+        next_count = time.monotonic() + self.size_refresh
+        while not self._closed.is_set():
+            self._wake.wait(interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                now = time.monotonic()
+                if self.ttl_seconds and now >= next_purge:
+                    next_purge = now + self.purge_interval
+                    self.purge_expired()
+                if now >= next_count:
+                    next_count = now + self.size_refresh
+                    self._size, self._engaged = self._count()
+            except sqlite3.Error as e:
+                logger.error(f"❌ Session write-behind flush failed (will retry): {e}")
+
+    def close(self):
+        self._closed.set()
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        self._writer.close()
+        self._reader.close()
+
+
+def create_backend(name: str, restore: Restore, path: str = "sessions.db", max_sessions: int = 0,
+                   ttl_seconds: float = 0, flush_interval: float = 0.05, max_buffered: int = 256):
+    """
+    Build the session backend named by SESSION_BACKEND ("memory" or "sqlite").
+    `restore` rebuilds a Session from its stored dict form.
+    For SQLite, max_sessions bounds the per-process cache rather than the table.
+    """
+    if name == "memory":
+        return MemorySessionBackend(restore, max_sessions=max_sessions, ttl_seconds=ttl_seconds)
+    if name == "sqlite":
+        return SQLiteSessionBackend(path, restore, flush_interval=flush_interval, max_buffered=max_buffered,
+                                    cache_size=max_sessions or 10000, ttl_seconds=ttl_seconds)
+    raise ValueError(f"Unknown session backend: {name}")
@@ -1,47 +1,115 @@
+import asyncio
+import os
+import time
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
 
-# In-memory session store: sessionId → session data
-SESSIONS: Dict[str, Dict] = {}
+from agent_notes import render_agent_notes
+from session_backends import MemorySessionBackend, create_backend
+from session_types import HistoryArchive, Session
 
-def get_session(session_id: str) -> Dict:
+# Prompt window: messages kept per live session (the agent reads the last 8).
+# Older messages are dropped, or appended to SESSION_HISTORY_ARCHIVE (JSONL) if set.
+SESSION_HISTORY_WINDOW = int(os.getenv("SESSION_HISTORY_WINDOW", "8"))
+SESSION_HISTORY_ARCHIVE = os.getenv("SESSION_HISTORY_ARCHIVE")
+HISTORY_ARCHIVE = HistoryArchive(SESSION_HISTORY_ARCHIVE) if SESSION_HISTORY_ARCHIVE else None
+
+def _spill(session_id: str):
+    return HISTORY_ARCHIVE.spill_for(session_id) if HISTORY_ARCHIVE is not None else None
+
+def _restore(data: Dict[str, Any]) -> Session:
+    """Rebuild a live Session from its stored dict form."""
+    return Session.from_dict(data, SESSION_HISTORY_WINDOW, _spill(data["sessionId"]))
+
+# Session storage backend: "memory" (per-process dict) or "sqlite" (shared by
+# every uvicorn worker on the host, with a write-behind buffer)
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory").lower()
+# Memory policy: LRU cap on live sessions and idle TTL (0 disables either).
+# Finished sessions whose callback was sent are compacted (history dropped).
+BACKEND = create_backend(
+    SESSION_BACKEND,
+    _restore,
+    path=os.getenv("SESSION_DB_PATH", "sessions.db"),
+    max_sessions=int(os.getenv("SESSION_MAX_SESSIONS", "100000")),
+    ttl_seconds=float(os.getenv("SESSION_TTL_SECONDS", "86400")),
+    flush_interval=int(os.getenv("SESSION_WRITE_BEHIND_MS", "50")) / 1000,
+    max_buffered=int(os.getenv("SESSION_WRITE_BEHIND_MAX", "256"))
+)
+
+# In-memory session store: sessionId → Session (memory backend only)
+SESSIONS: Dict[str, Any] = BACKEND.sessions if isinstance(BACKEND, MemorySessionBackend) else {}
+
+def get_session(session_id: str) -> Session:
     """Get or create a session."""
-    if session_id not in SESSIONS:
-        SESSIONS[session_id] = {
-            "sessionId": session_id,
-            "conversationHistory": [],
-            "agentEngaged": False,
-            "startTime": datetime.utcnow(),
-            "endTime": None,
-            "totalMessages": 0,
-            "extractedIntelligence": {
-                "bankAccounts": [],
-                "upiIds": [],
-                "phishingLinks": [],
-                "phoneNumbers": [],
-                "suspiciousKeywords": []
-            },
-            "agentNotes": "",
-            "callbackSent": False  # Track if final callback was sent
-        }
-    return SESSIONS[session_id]
-
-def update_session(session_id: str, new_message: dict) -> Dict:
+    session = BACKEND.load(session_id)
+    if session is None:
+        session = Session(session_id, SESSION_HISTORY_WINDOW, _spill(session_id))
+        BACKEND.save(session)
+    return session
+
+async def run_store_io(fn, *args):
+    """Run a store call that may block on disk (SQLite) on a worker thread; in memory, inline."""
+    if isinstance(BACKEND, MemorySessionBackend):
+        return fn(*args)
+    return await asyncio.to_thread(fn, *args)
+
+async def prefetch_session(session_id: str):
+    """Pick up changes other workers made to the session before a turn uses it."""
+    if not isinstance(BACKEND, MemorySessionBackend):
+        await asyncio.to_thread(BACKEND.revalidate, session_id)
+
+def find_session(session_id: str) -> Optional[Session]:
+    """Get a session without creating it (None if unknown, evicted or expired)."""
+    return BACKEND.load(session_id)
+
+def save_session(session: Session):
+    """Persist changes made directly to a session dict (no-op for the memory backend)."""
+    BACKEND.save(session)
+
+def flush_sessions():
+    """Write any buffered session changes to the backend."""
+    BACKEND.flush()
+
+def close_session_store():
+    """Flush and release the session backend (and the history archive)."""
+    BACKEND.close()
+    if HISTORY_ARCHIVE is not None:
+        HISTORY_ARCHIVE.close()
+
+def update_session(session_id: str, new_message: dict) -> Session:
     """Add a message to session and increment counter."""
     session = get_session(session_id)
     session["conversationHistory"].append(new_message)
     session["totalMessages"] += 1
+    session["lastActivity"] = time.time()
+    BACKEND.save(session)
     return session
 
 def mark_session_engaged(session_id: str):
     """Mark session as agent-engaged."""
     session = get_session(session_id)
     session["agentEngaged"] = True
+    BACKEND.save(session)
 
 def mark_session_complete(session_id: str):
     """Mark session as complete and set end time."""
     session = get_session(session_id)
     session["endTime"] = datetime.utcnow()
+    BACKEND.save(session)
+    _compact_if_finished(session)
+
+def _compact_if_finished(session: Session):
+    """Finished and reported: only the summary is needed from now on."""
+    if session["endTime"] is not None and session["callbackSent"]:
+        BACKEND.compact(session["sessionId"])
+
+def count_engaged_sessions() -> int:
+    """Sessions with the agent engaged and not yet finished (read at scrape time)."""
+    return BACKEND.engaged()
+
+def get_store_stats() -> Dict[str, int]:
+    """Live session count plus eviction/expiration/compaction counters."""
+    return {"sessions": BACKEND.size(), **BACKEND.stats}
 
 def get_engagement_duration(session_id: str) -> int:
     """Get engagement duration in seconds."""
@@ -52,10 +120,35 @@ def get_engagement_duration(session_id: str) -> int:
         delta = datetime.utcnow() - session["startTime"]
     return int(delta.total_seconds())
 
+def claim_callback(session_id: str) -> bool:
+    """
+    Atomically mark the callback as queued. Returns False if it was already
+    queued or sent (by this or another worker), so only one caller sends it.
+    """
+    get_session(session_id)
+    return BACKEND.claim_callback(session_id)
+
+# Flag setters don't create the session: a callback can complete after its
+# session was evicted.
 def mark_callback_sent(session_id: str):
     """Mark that the GUVI callback has been sent for this session."""
+    BACKEND.set_callback_flag(session_id, "callbackSent", True)
+    session = BACKEND.load(session_id)
+    if session is not None:
+        _compact_if_finished(session)
+
+def mark_callback_queued(session_id: str):
+    """Mark that the GUVI callback is queued for background delivery."""
+    BACKEND.set_callback_flag(session_id, "callbackQueued", True)
+
+def clear_callback_queued(session_id: str):
+    """Delivery gave up - allow a later message to queue the callback again."""
+    BACKEND.set_callback_flag(session_id, "callbackQueued", False)
+
+def is_callback_queued(session_id: str) -> bool:
+    """Check if a callback is already queued (prevent duplicate enqueues)."""
     session = get_session(session_id)
-    session["callbackSent"] = True
+    return session["callbackQueued"]
 
 def has_callback_been_sent(session_id: str) -> bool:
     """Check if callback was already sent (prevent duplicate callbacks)."""
@@ -70,6 +163,6 @@ def get_session_summary(session_id: str) -> Dict:
         "scamDetected": session["agentEngaged"],  # If agent was engaged, scam was detected
         "totalMessagesExchanged": session["totalMessages"],
         "engagementDurationSeconds": get_engagement_duration(session_id),
-        "extractedIntelligence": session["extractedIntelligence"],
-        "agentNotes": session["agentNotes"]
+        "extractedIntelligence": session["extractedIntelligence"].to_dict(),
+        "agentNotes": render_agent_notes(session["noteEvents"], session["agentEngaged"])
     }
@@ -0,0 +1,275 @@
+import hashlib
+import json
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from enum import IntEnum
+
+from intel_store import Intelligence
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+
+class Sender(IntEnum):
+    """Interned sender codes; any other sender is kept as an interned string."""
+    SCAMMER = 0
+    USER = 1  # our agent's replies (the "user" from the scammer's perspective)
+
+
+_SENDER_NAMES = {Sender.SCAMMER: "scammer", Sender.USER: "user"}
+_SENDER_CODES = {name: code for code, name in _SENDER_NAMES.items()}
+
+
+def _epoch_ms(timestamp: Union[str, int, float, None]) -> int:
+    """Epoch milliseconds from an ISO string / epoch number; now if missing or unparseable."""
+    if isinstance(timestamp, (int, float)):
+        return int(timestamp)
+    if timestamp:
+        try:
+            parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+            if parsed.tzinfo is None:
+                parsed = parsed.replace(tzinfo=timezone.utc)
+            return int(parsed.timestamp() * 1000)
+        except ValueError:
+            pass
+    return int(datetime.now(timezone.utc).timestamp() * 1000)
+
+
+def _as_datetime(value: Union[str, datetime, None]) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def chain_digest(digest: int, sender: str, text: str) -> int:
+    """Extend a conversation's content hash by one message (same value in every process)."""
+    h = hashlib.blake2b(digest.to_bytes(8, "big"), digest_size=8)
+    h.update(sender.encode("utf-8") + b"\0" + text.encode("utf-8"))
+    return int.from_bytes(h.digest(), "big")
+
+
+class HistoryMessage:
+    """One conversation message; reads like the old {"sender", "text", "timestamp"} dict."""
+
+    __slots__ = ("_sender", "text", "ts")
+
+    def __init__(self, sender: str, text: str, ts: int):
+        code = _SENDER_CODES.get(sender)
+        self._sender = code if code is not None else sys.intern(sender)
+        self.text = text
+        self.ts = ts  # epoch milliseconds
+
+    @classmethod
+    def from_dict(cls, message: Dict[str, Any]) -> "HistoryMessage":
+        return cls(message.get("sender", ""), message.get("text", ""), _epoch_ms(message.get("timestamp")))
+
+    @property
+    def sender(self) -> str:
+        return _SENDER_NAMES.get(self._sender, self._sender)
+
+    @property
+    def timestamp(self) -> str:
+        return datetime.fromtimestamp(self.ts / 1000, timezone.utc).isoformat().replace("+00:00", "Z")
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "sender":
+            return self.sender
+        if key == "text":
+            return self.text
+        if key == "timestamp":
+            return self.timestamp
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Storage form: timestamp stays epoch milliseconds."""
+        return {"sender": self.sender, "text": self.text, "timestamp": self.ts}
+
+
+class HistoryRing:
+    """
+    Fixed-size window of the most recent messages (the prompt window).
+
+    A plain list used circularly (a deque would allocate a 64-slot block per
+    session). Older messages are overwritten; with a `spill` callback they are
+    handed to it (e.g. the history archive) instead of being dropped.
+    len() counts every message ever appended, so turn-count logic keeps
+    working; iteration and indexing only see the retained window, oldest first.
+    `digest` chains a content hash over every message ever appended, so a
+    conversation history sent by the client can be matched against it.
+    """
+
+    __slots__ = ("_items", "_window", "_head", "_total", "_spill", "digest")
+
+    def __init__(self, window: int, spill: Optional[Callable[[HistoryMessage], None]] = None):
+        self._items: List[HistoryMessage] = []
+        self._window = max(1, window)
+        self._head = 0  # index of the oldest retained message once the ring is full
+        self._total = 0
+        self._spill = spill
+        self.digest = 0
+
+    def append(self, message: Union[HistoryMessage, Dict[str, Any]]):
+        if not isinstance(message, HistoryMessage):
+            message = HistoryMessage.from_dict(message)
+        if len(self._items) < self._window:
+            self._items.append(message)
+        else:
+            slot = self._head  # the oldest retained message
+            if self._spill is not None:
+                self._spill(self._items[slot])
+            self._items[slot] = message
+            self._head = (slot + 1) % self._window
+        self._total += 1
+        self.digest = chain_digest(self.digest, message.sender, message.text)
+
+    def _ordered(self) -> List[HistoryMessage]:
+        if not self._head:
+            return self._items
+        return self._items[self._head:] + self._items[:self._head]
+
+    def __len__(self) -> int:
+        return self._total
+
+    def retained(self) -> int:
+        """Messages held in the window (0 once the session is compacted)."""
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[HistoryMessage]:
+        return iter(self._ordered())
+
+    def __reversed__(self) -> Iterator[HistoryMessage]:
+        return reversed(self._ordered())
+
+    def __getitem__(self, index):
+        return self._ordered()[index]
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [message.to_dict() for message in self._ordered()]
+
+
+class Session:
+    """
+    Compact live session. Slots are named after the JSON fields and support
+    session["field"] access, so code written against the old session dicts
+    keeps working. The history is a bounded HistoryRing.
+    """
+
+    __slots__ = ("sessionId", "conversationHistory", "agentEngaged", "startTime", "endTime",
+                 "totalMessages", "extractedIntelligence", "noteEvents", "campaignId",
+                 "callbackQueued", "callbackSent", "topicMask", "topicScanned", "lastActivity", "_base")
+
+    def __init__(self, session_id: str, history_window: int,
+                 spill: Optional[Callable[[HistoryMessage], None]] = None):
+        self.sessionId = session_id
+        self.conversationHistory = HistoryRing(history_window, spill)
+        self.agentEngaged = False
+        self.startTime = datetime.utcnow()
+        self.endTime: Optional[datetime] = None
+        self.totalMessages = 0
+        self.extractedIntelligence = Intelligence()
+        self.noteEvents: Dict[Tuple[str, str], None] = {}  # agent_notes events, rendered on demand
+        self.campaignId: Optional[str] = None  # Known scam campaign this session matched
+        self.callbackQueued = False  # Final callback handed to the dispatcher
+        self.callbackSent = False  # Track if final callback was sent
+        self.topicMask = 0  # Mock responder topics seen so far (bitmask)
+        self.topicScanned = 0  # Messages already folded into topicMask
+        self.lastActivity = time.time()  # epoch seconds of the last inbound message (any worker)
+        # (row version, historyTotal, totalMessages) of the stored row this object
+        # was read from or last written as; the SQLite backend's compare-and-set base
+        self._base: Optional[Tuple[str, int, int]] = None
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key: str, value: Any):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Storage form (datetimes as ISO strings, history as message dicts)."""
+        return {
+            "sessionId": self.sessionId,
+            "conversationHistory": self.conversationHistory.to_list(),
+            "historyTotal": len(self.conversationHistory),
+            "historyHash": self.conversationHistory.digest,
+            "agentEngaged": self.agentEngaged,
+            "startTime": self.startTime.isoformat(),
+            "endTime": self.endTime.isoformat() if self.endTime else None,
+            "totalMessages": self.totalMessages,
+            "extractedIntelligence": self.extractedIntelligence.to_dict(),
+            "noteEvents": [list(event) for event in self.noteEvents],
+            "campaignId": self.campaignId,
+            "callbackQueued": self.callbackQueued,
+            "callbackSent": self.callbackSent,
+            "topicMask": self.topicMask,
+            "topicScanned": self.topicScanned,
+            "lastActivity": self.lastActivity
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], history_window: int,
+                  spill: Optional[Callable[[HistoryMessage], None]] = None) -> "Session":
+        """Rebuild from to_dict() output (or a thawed CompactSession)."""
+        session = cls(data["sessionId"], history_window)
+        history = session.conversationHistory
+        # Retained messages go back in order (the newest `history_window` if the
+        # window shrank); the total still counts every message ever appended
+        for message in data.get("conversationHistory", ()):
+            history.append(message)
+        history._items = history._ordered()
+        history._head = 0
+        history._total = max(data.get("historyTotal", 0), len(history._items))
+        history._spill = spill
+        history.digest = data.get("historyHash", 0)
+        session.agentEngaged = data["agentEngaged"]
+        session.startTime = _as_datetime(data["startTime"])
+        session.endTime = _as_datetime(data.get("endTime"))
+        session.totalMessages = data["totalMessages"]
+        intelligence = data["extractedIntelligence"]
+        if not isinstance(intelligence, Intelligence):
+            intelligence = Intelligence.from_dict(intelligence)
+        session.extractedIntelligence = intelligence
+        if isinstance(data.get("noteEvents"), dict):
+            session.noteEvents = dict(data["noteEvents"])
+        else:
+            session.noteEvents = {tuple(event): None for event in data.get("noteEvents", ())}
+        session.campaignId = data.get("campaignId")
+        session.callbackQueued = data.get("callbackQueued", False)
+        session.callbackSent = data.get("callbackSent", False)
+        session.topicMask = data.get("topicMask", 0)
+        session.topicScanned = data.get("topicScanned", 0)
+        session.lastActivity = data.get("lastActivity", 0)
+        return session
+
+
+class HistoryArchive:
+    """Append-only JSONL archive for messages that rolled out of a session's window."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def spill_for(self, session_id: str) -> Callable[[HistoryMessage], None]:
+        def spill(message: HistoryMessage):
+            line = json.dumps({"sessionId": session_id, **message.to_dict()}, ensure_ascii=False)
+            with self._lock:
+                self._file.write(line + "\n")
+        return spill
+
+    def close(self):
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Unit tests for campaign fingerprinting (campaigns.py): SimHash stability under
+changed names, amounts and links, banded LSH lookup, registration rules and
+LRU eviction.
+Run with pytest, or directly: python test_campaigns.py
+"""
+
+from campaigns import CampaignIndex, simhash, token_count
+
+TEMPLATE = ("Dear customer your SBI account {account} will be blocked today. "
+            "Update KYC at {link} or call {phone} immediately to avoid suspension")
+SCAM = {"scamDetected": True, "score": 9, "categories": ["banking_kyc"]}
+HAM = {"scamDetected": False, "score": 0, "categories": []}
+
+
+def message(account="123456789012", link="http://sbi-kyc.xyz", phone="9876543210"):
+    return TEMPLATE.format(account=account, link=link, phone=phone)
+
+
+def distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def register(index, text, verdict=SCAM):
+    return index.register(simhash(text), verdict, token_count(text))
+
+
+def test_simhash_is_deterministic():
+    assert simhash(message()) == simhash(message())
+    assert 0 <= simhash(message()) < 1 << 64
+
+
+def test_identifiers_do_not_change_the_fingerprint():
+    varied = message(account="998877665544", link="https://kyc-update.top/x", phone="9123456780")
+    assert simhash(varied) == simhash(message())
+
+
+def test_unrelated_text_is_far_apart():
+    other = "Hi mom, dinner is at eight tonight, can you bring the cake and some juice"
+    assert distance(simhash(other), simhash(message())) > 6
+
+
+def test_near_duplicate_matches_registered_campaign():
+    index = CampaignIndex()
+    campaign = register(index, message())
+    variant = message().replace("Dear", "Hello")
+    assert 0 < distance(simhash(variant), campaign.fingerprint) <= index.max_distance
+    assert index.match(variant) is campaign
+    assert campaign.hits == 1
+    assert index.stats() == {"campaigns": 1, "matches": 1, "misses": 0}
+    assert campaign.verdict() == SCAM
+
+
+def test_distance_limit_is_exact():
+    index = CampaignIndex(bands=8, max_distance=6)
+    base = 0x0123456789ABCDEF
+    index.register(base, SCAM, 20)
+    six_bits = base ^ 0b111111
+    seven_bits = base ^ 0b1111111
+    assert index.match_fingerprint(six_bits) is not None
+    assert index.match_fingerprint(seven_bits) is None
+
+
+def test_rejects_distance_the_bands_cannot_guarantee():
+    for bands, max_distance in ((4, 6), (8, 8), (16, 16)):
+        try:
+            CampaignIndex(bands=bands, max_distance=max_distance)
+        except ValueError:
+            continue
+        raise AssertionError(f"bands={bands}, max_distance={max_distance} accepted")
+
+
+def test_only_long_scam_messages_are_registered():
+    index = CampaignIndex(min_tokens=8)
+    assert register(index, message(), HAM) is None
+    assert register(index, "send otp now") is None
+    assert index.stats()["campaigns"] == 0
+    assert register(index, message()) is not None
+
+
+def test_lru_eviction():
+    index = CampaignIndex(max_campaigns=2)
+    first, second, third = 0, 0xFFFFFFFF00000000, 0x00000000FFFFFFFF  # 32+ bits apart
+    for fingerprint in (first, second, third):
+        index.register(fingerprint, SCAM, 20)
+    assert index.match_fingerprint(first) is None
+    assert index.match_fingerprint(third) is not None
+    assert index.stats()["campaigns"] == 2
+
+
+def test_reply_pool_fills_before_use():
+    index = CampaignIndex(reply_pool_size=2)
+    campaign = register(index, message())
+    index.add_reply(campaign, "Which account?")
+    assert index.pick_reply(campaign) is None
+    index.add_reply(campaign, "Is this really SBI?")
+    index.add_reply(campaign, "ignored")
+    assert index.pick_reply(campaign) in ("Which account?", "Is this really SBI?")
+
+
+def main():
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Unit tests for pattern evidence in detector.score_message: phone numbers and
+account numbers are reported under their own categories.
+Run with pytest, or directly: python test_detector.py
+"""
+
+from detector import score_message
+
+
+def test_phone_number_is_not_reported_as_account():
+    result = score_message("Call 9876543210 to continue")
+    assert "phone_number" in result["categories"]
+    assert "account_number" not in result["categories"]
+
+
+def test_account_number_category():
+    result = score_message("Deposit into 123456789012 today")
+    assert "account_number" in result["categories"]
+    assert "phone_number" not in result["categories"]
+
+
+def test_phone_and_account_score_once_together():
+    both = score_message("Deposit into 123456789012 or call 9876543210")
+    account_only = score_message("Deposit into 123456789012 or call us")
+    assert {"account_number", "phone_number"} <= set(both["categories"])
+    assert both["score"] == account_only["score"]
+
+
+def main():
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
+
+
+if __name__ == "__main__":
+    main()
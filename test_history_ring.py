@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Unit tests for HistoryRing and Session restore (session_types.py), including
+sessions thawed from a CompactSession and restored with a different window.
+Run with pytest, or directly: python test_history_ring.py
+"""
+
+from session_backends import CompactSession
+from session_types import HistoryRing, Session
+
+
+def texts(ring):
+    return [message["text"] for message in ring]
+
+
+def message(n):
+    return {"sender": "scammer", "text": str(n), "timestamp": 1760000000000 + n}
+
+
+def filled_session(count, window=8):
+    session = Session("s", window)
+    for n in range(1, count + 1):
+        session["conversationHistory"].append(message(n))
+    session["totalMessages"] = count
+    return session
+
+
+def test_window_keeps_newest_in_order_and_spills_oldest():
+    spilled = []
+    ring = HistoryRing(4, spill=lambda m: spilled.append(m.text))
+    for n in range(1, 11):
+        ring.append(message(n))
+    assert texts(ring) == ["7", "8", "9", "10"]
+    assert ring[-1]["text"] == "10"
+    assert len(ring) == 10
+    assert spilled == [str(n) for n in range(1, 7)]
+
+
+def test_thaw_then_append_keeps_order():
+    session = filled_session(41)
+    thawed = Session.from_dict(CompactSession.from_session(session).thaw(), 8)
+    history = thawed["conversationHistory"]
+    assert len(history) == 41 and texts(history) == []
+    for n in range(42, 50):
+        history.append(message(n))
+    assert texts(history) == [str(n) for n in range(42, 50)]
+    history.append(message(50))
+    assert texts(history) == [str(n) for n in range(43, 51)]
+    assert len(history) == 50
+
+
+def test_restore_with_larger_window():
+    data = filled_session(20, window=8).to_dict()
+    restored = Session.from_dict(data, 16)
+    history = restored["conversationHistory"]
+    assert texts(history) == [str(n) for n in range(13, 21)]
+    for n in range(21, 40):
+        history.append(message(n))
+    assert texts(history) == [str(n) for n in range(24, 40)]
+    assert len(history) == 39
+
+
+def test_restore_with_smaller_window():
+    data = filled_session(20, window=16).to_dict()
+    history = Session.from_dict(data, 4)["conversationHistory"]
+    assert texts(history) == ["17", "18", "19", "20"]
+    history.append(message(21))
+    assert texts(history) == ["18", "19", "20", "21"]
+    assert len(history) == 21
+
+
+def test_restore_wrapped_ring_round_trip():
+    session = filled_session(13, window=8)
+    restored = Session.from_dict(session.to_dict(), 8)
+    assert texts(restored["conversationHistory"]) == texts(session["conversationHistory"])
+    assert restored["conversationHistory"].digest == session["conversationHistory"].digest
+    restored["conversationHistory"].append(message(14))
+    assert texts(restored["conversationHistory"]) == [str(n) for n in range(7, 15)]
+
+
+def test_compact_session_keeps_topic_state_and_digest():
+    session = filled_session(5)
+    session["topicMask"] = 0b101
+    session["topicScanned"] = 5
+    thawed = Session.from_dict(CompactSession.from_session(session).thaw(), 8)
+    assert thawed["topicMask"] == 0b101
+    assert thawed["topicScanned"] == 5
+    assert thawed["conversationHistory"].digest == session["conversationHistory"].digest
+
+
+def main():
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
+
+
+if __name__ == "__main__":
+    main()
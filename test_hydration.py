@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Unit tests for session hydration from the inbound conversationHistory
+(main.hydrate_session): the history digest decides which prefix a session
+already holds, so only the rest is replayed, and never twice.
+Run with pytest, or directly: python test_hydration.py
+"""
+
+import os
+from datetime import datetime
+
+os.environ.setdefault("MOCK_MODE", "true")
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("API_KEY", "test")
+
+from main import Message, hydrate_session
+from session_types import Session
+
+CONVERSATION = [
+    ("scammer", "Your SBI account will be blocked today, verify KYC immediately"),
+    ("user", "Oh no, what should I do?"),
+    ("scammer", "Send Rs 10 to rahul@ybl to verify"),
+    ("user", "Which app should I use?"),
+    ("scammer", "Any UPI app. Or call 9876543210"),
+    ("user", "Okay, one minute"),
+]
+
+
+def history(count):
+    return [Message(sender=sender, text=text, timestamp=1760000000000 + n * 1000)
+            for n, (sender, text) in enumerate(CONVERSATION[:count])]
+
+
+def texts(session):
+    return [message["text"] for message in session["conversationHistory"]]
+
+
+def test_fresh_session_replays_everything():
+    session = Session("fresh", 8)
+    assert hydrate_session(session, history(4)) == 4
+    assert texts(session) == [text for _, text in CONVERSATION[:4]]
+    assert session["totalMessages"] == 2  # scammer messages only
+    assert session["agentEngaged"]
+    assert session["extractedIntelligence"]["upiIds"] == ["rahul@ybl"]
+    assert session["startTime"] == datetime.utcfromtimestamp(1760000000)
+
+
+def test_only_the_unseen_suffix_is_replayed():
+    session = Session("prefix", 8)
+    hydrate_session(session, history(3))
+    assert hydrate_session(session, history(6)) == 3
+    assert texts(session) == [text for _, text in CONVERSATION]
+    assert session["totalMessages"] == 3
+    assert session["extractedIntelligence"]["phoneNumbers"] == ["9876543210"]
+
+
+def test_same_history_is_not_replayed_twice():
+    session = Session("again", 8)
+    hydrate_session(session, history(4))
+    assert hydrate_session(session, history(4)) == 0
+    assert len(session["conversationHistory"]) == 4
+
+
+def test_diverged_history_is_ignored():
+    session = Session("diverged", 8)
+    hydrate_session(session, history(2))
+    other = [Message(sender="scammer", text="Hello from a different chat")] + history(6)[1:]
+    assert hydrate_session(session, other) == 0
+    assert len(session["conversationHistory"]) == 2
+
+
+def test_finished_session_is_not_hydrated():
+    session = Session("finished", 8)
+    session["endTime"] = datetime.utcnow()
+    assert hydrate_session(session, history(4)) == 0
+    assert len(session["conversationHistory"]) == 0
+
+
+def main():
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the Aho-Corasick KeywordMatcher (keyword_matcher.py): overlapping
+and nested keywords, offsets, case handling, and agreement with plain
+`keyword in text` over the detector's keywords and the scam/ham corpus.
+Run with pytest, or directly: python test_keyword_matcher.py
+"""
+
+from detector import SCAM_KEYWORDS
+from keyword_matcher import KeywordHit, KeywordMatcher
+from scam_corpus import labeled_corpus
+
+
+def test_overlapping_and_nested_keywords():
+    matcher = KeywordMatcher(["he", "she", "his", "hers"])
+    assert matcher.find_all("ushers") == [
+        KeywordHit("she", 1, 4), KeywordHit("he", 2, 4), KeywordHit("hers", 2, 6),
+    ]
+
+
+def test_offsets_point_at_the_keyword():
+    text = "Please VERIFY your KYC now"
+    for hit in KeywordMatcher(["verify", "kyc", "now"]).iter_hits(text):
+        assert text.lower()[hit.start:hit.end] == hit.keyword
+
+
+def test_case_insensitive_and_deduplicated():
+    matcher = KeywordMatcher(["OTP", "otp", "", "Send Now"])
+    assert matcher.keywords == ["otp", "send now"]
+    assert matcher.matched_keywords("SEND NOW the Otp") == {"otp", "send now"}
+
+
+def test_repeated_occurrences_are_all_reported():
+    hits = KeywordMatcher(["aa"]).find_all("aaaa")
+    assert [(hit.start, hit.end) for hit in hits] == [(0, 2), (1, 3), (2, 4)]
+
+
+def test_no_match():
+    matcher = KeywordMatcher(["upi", "transfer"])
+    assert matcher.find_all("see you at dinner") == []
+    assert KeywordMatcher([]).find_all("anything") == []
+
+
+def test_agrees_with_substring_search_on_corpus():
+    matcher = KeywordMatcher(SCAM_KEYWORDS)
+    for text, _ in labeled_corpus():
+        lowered = text.lower()
+        expected = {keyword for keyword in matcher.keywords if keyword in lowered}
+        assert matcher.matched_keywords(text) == expected, text
+
+
+def main():
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Unit tests for logging_config.py: LOG_* settings coming from a .env file (as
+.env.example documents them) take effect when configure_logging runs.
+Run with pytest, or directly: python test_logging_config.py
+"""
+
+import logging
+import os
+import tempfile
+
+from dotenv import load_dotenv
+
+import logging_config
+from logging_config import DeferredQueueHandler, JsonFormatter, configure_logging, stop_logging
+
+LOG_VARS = ("LOG_FORMAT", "LOG_LEVEL", "LOG_SAMPLE_RATE", "LOG_ASYNC")
+
+
+def configure_from_dotenv(lines):
+    """Load `lines` as a .env file, run configure_logging, then restore the environment."""
+    saved = {name: os.environ.get(name) for name in LOG_VARS}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = os.path.join(tmpdir, ".env")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        try:
+            load_dotenv(path, override=True)
+            configure_logging()
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+
+
+def root_handler():
+    handlers = logging.getLogger().handlers
+    assert len(handlers) == 1
+    return handlers[0]
+
+
+def test_json_settings_from_dotenv():
+    try:
+        configure_from_dotenv(["LOG_FORMAT=json", "LOG_LEVEL=WARNING",
+                               "LOG_SAMPLE_RATE=0.25", "LOG_ASYNC=false"])
+        handler = root_handler()
+        assert isinstance(handler, logging.StreamHandler)
+        assert isinstance(handler.formatter, JsonFormatter)
+        assert logging.getLogger().level == logging.WARNING
+        assert logging_config.request_logger.level == logging.INFO
+        assert logging_config.turn_logger.level == logging.WARNING
+        assert logging_config.LOG_SAMPLE_RATE == 0.25
+    finally:
+        configure_from_dotenv(["LOG_FORMAT=text", "LOG_LEVEL=INFO", "LOG_ASYNC=false"])
+
+
+def test_text_async_settings_from_dotenv():
+    try:
+        configure_from_dotenv(["LOG_FORMAT=text", "LOG_LEVEL=ERROR", "LOG_ASYNC=true"])
+        handler = root_handler()
+        assert isinstance(handler, DeferredQueueHandler)
+        assert logging.getLogger().level == logging.ERROR
+        assert logging_config.request_logger.level == logging.WARNING
+        assert logging_config.turn_logger.level == logging.NOTSET
+    finally:
+        stop_logging()
+        configure_from_dotenv(["LOG_FORMAT=text", "LOG_LEVEL=INFO", "LOG_ASYNC=false"])
+
+
+def main():
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
+
+
+if __name__ == "__main__":
+    main()
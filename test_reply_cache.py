@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Unit tests for ReplyCache (reply_cache.py): key normalization, pool filling,
+round-robin and random policies, LRU eviction and TTL expiry.
+Run with pytest, or directly: python test_reply_cache.py
+"""
+
+from reply_cache import ReplyCache
+
+HISTORY = [
+    {"sender": "scammer", "text": "Your account is blocked"},
+    {"sender": "user", "text": "Which account?"},
+    {"sender": "scammer", "text": "Send  the OTP\nnow"},
+]
+
+
+def filled(cache, key, replies):
+    for reply in replies:
+        cache.put(key, reply)
+
+
+def test_key_ignores_case_whitespace_and_older_messages():
+    key = ReplyCache.make_key("elderly", "probe", HISTORY, 2)
+    variant = [{"sender": "scammer", "text": "something older"}] + HISTORY[:2] + \
+        [{"sender": "scammer", "text": "send the otp NOW "}]
+    assert ReplyCache.make_key("elderly", "probe", variant, 2) == key
+    assert ReplyCache.make_key("student", "probe", HISTORY, 2) != key
+    assert ReplyCache.make_key("elderly", "stall", HISTORY, 2) != key
+    assert ReplyCache.make_key("elderly", "probe", HISTORY, 3) != key
+
+
+def test_misses_until_pool_is_full():
+    cache = ReplyCache(pool_size=2)
+    assert cache.get("k") is None
+    cache.put("k", "first")
+    assert cache.get("k") is None
+    cache.put("k", "second")
+    assert cache.get("k") in ("first", "second")
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2
+
+
+def test_round_robin_cycles_through_pool():
+    cache = ReplyCache(pool_size=3, policy="round_robin")
+    filled(cache, "k", ["a", "b", "c", "ignored"])
+    assert [cache.get("k") for _ in range(4)] == ["a", "b", "c", "a"]
+
+
+def test_lru_eviction():
+    cache = ReplyCache(max_entries=2, pool_size=1)
+    filled(cache, "a", ["A"])
+    filled(cache, "b", ["B"])
+    assert cache.get("a") == "A"  # "b" is now least recently used
+    filled(cache, "c", ["C"])
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.stats()["evictions"] == 1 and cache.stats()["size"] == 2
+
+
+def test_ttl_expiry():
+    cache = ReplyCache(ttl_seconds=60, pool_size=1)
+    filled(cache, "k", ["old"])
+    cache._entries["k"].created_at -= 61
+    assert cache.get("k") is None
+    assert cache.stats()["expirations"] == 1 and cache.stats()["size"] == 0
+    filled(cache, "k", ["new"])
+    assert cache.get("k") == "new"
+
+
+def main():
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the session backends (session_backends.py): LRU/TTL limits and
+compaction of the memory backend, and for SQLite the cross-worker sharing,
+compare-and-set rebase of concurrent turns and atomic callback claims.
+Two SQLiteSessionBackend instances on one file stand in for two workers.
+Run with pytest, or directly: python test_session_backends.py
+"""
+
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from session_backends import CompactSession, MemorySessionBackend, SQLiteSessionBackend
+from session_store import _restore
+from session_types import Session
+
+
+def new_session(session_id):
+    return Session(session_id, 8)
+
+
+def add_turn(session, text, upi=None):
+    session["conversationHistory"].append({"sender": "scammer", "text": text})
+    session["totalMessages"] += 1
+    if upi:
+        session["extractedIntelligence"].add("upiIds", [upi])
+
+
+def texts(session):
+    return [message["text"] for message in session["conversationHistory"]]
+
+
+def sqlite_pair(tmpdir, **kwargs):
+    path = os.path.join(tmpdir, "sessions.db")
+    return SQLiteSessionBackend(path, _restore, **kwargs), SQLiteSessionBackend(path, _restore, **kwargs)
+
+
+# ---- memory backend ----
+
+def test_memory_lru_eviction():
+    backend = MemorySessionBackend(_restore, max_sessions=2)
+    for session_id in ("a", "b"):
+        backend.save(new_session(session_id))
+    backend.load("a")  # "b" is now least recently used
+    backend.save(new_session("c"))
+    assert backend.load("b") is None
+    assert backend.load("a") is not None and backend.load("c") is not None
+    assert backend.stats["evictions"] == 1
+
+
+def test_memory_ttl_expiry():
+    backend = MemorySessionBackend(_restore, ttl_seconds=60)
+    backend.save(new_session("old"))
+    backend._last_access["old"] -= 61
+    assert backend.load("old") is None
+    assert backend.stats["expirations"] == 1
+
+
+def test_memory_compaction_and_thaw():
+    backend = MemorySessionBackend(_restore)
+    session = new_session("done")
+    add_turn(session, "pay now", upi="x@ybl")
+    backend.save(session)
+    backend.compact("done")
+    assert isinstance(backend.sessions["done"], CompactSession)
+    thawed = backend.load("done")
+    assert len(thawed["conversationHistory"]) == 1 and texts(thawed) == []
+    assert thawed["extractedIntelligence"]["upiIds"] == ["x@ybl"]
+
+
+def test_memory_engaged_count_follows_eviction():
+    backend = MemorySessionBackend(_restore, max_sessions=2)
+    for session_id in ("a", "b", "c"):
+        session = new_session(session_id)
+        session["agentEngaged"] = True
+        backend.save(session)
+    assert backend.engaged() == 2  # "a" was evicted while still engaged
+    backend.load("b")["endTime"] = datetime.utcnow()
+    assert backend.engaged() == 1
+
+
+def test_memory_claim_callback_once():
+    backend = MemorySessionBackend(_restore)
+    backend.save(new_session("s"))
+    assert backend.claim_callback("s")
+    assert not backend.claim_callback("s")
+    backend.set_callback_flag("s", "callbackQueued", False)
+    assert backend.claim_callback("s")
+
+
+# ---- SQLite backend ----
+
+def test_sqlite_shares_sessions_between_workers():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        a, b = sqlite_pair(tmpdir)
+        session = new_session("s")
+        add_turn(session, "hello", upi="x@ybl")
+        a.save(session)
+        a.flush()
+        loaded = b.load("s")
+        assert texts(loaded) == ["hello"]
+        assert loaded["extractedIntelligence"]["upiIds"] == ["x@ybl"]
+        a.close()
+        b.close()
+
+
+def test_sqlite_concurrent_turns_are_rebased_not_lost():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        a, b = sqlite_pair(tmpdir)
+        a.save(new_session("s"))
+        a.flush()
+        on_a, on_b = a.load("s"), b.load("s")
+        add_turn(on_a, "A1", upi="a@ybl")
+        add_turn(on_b, "B1", upi="b@ybl")
+        a.save(on_a)
+        b.save(on_b)
+        b.flush()
+        a.flush()  # conflicts with B's write: rebased onto it
+        assert a.stats["rebases"] == 1
+
+        # A later save of A's (now stale) copy appends only what is new
+        on_a["conversationHistory"].append({"sender": "user", "text": "A-reply"})
+        a.save(on_a)
+        a.flush()
+
+        stored = b.revalidate("s")
+        assert texts(stored) == ["B1", "A1", "A-reply"]
+        assert stored["totalMessages"] == 2
+        assert stored["extractedIntelligence"]["upiIds"] == ["b@ybl", "a@ybl"]
+        # A re-reads the merged row rather than its stale copy
+        assert texts(a.revalidate("s")) == ["B1", "A1", "A-reply"]
+        a.close()
+        b.close()
+
+
+def test_sqlite_sequential_saves_do_not_rebase():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        a, b = sqlite_pair(tmpdir)
+        session = new_session("s")
+        for n in range(3):
+            add_turn(session, f"m{n}")
+            a.save(session)
+            a.flush()
+        assert a.stats["rebases"] == 0
+        assert texts(b.load("s")) == ["m0", "m1", "m2"]
+        a.close()
+        b.close()
+
+
+def test_sqlite_claim_callback_is_atomic_across_workers():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        a, b = sqlite_pair(tmpdir)
+        a.save(new_session("s"))
+        assert a.claim_callback("s")
+        assert not b.claim_callback("s")
+        b.set_callback_flag("s", "callbackSent", True)
+        b.flush()
+        assert a.revalidate("s")["callbackSent"]
+        a.close()
+        b.close()
+
+
+def test_sqlite_write_through_needs_no_explicit_flush():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        a, b = sqlite_pair(tmpdir, flush_interval=0)
+        session = new_session("s")
+        add_turn(session, "hi")
+        a.save(session)  # returns at once; the writer thread commits it
+        for _ in range(200):
+            if b.revalidate("s") is not None:
+                break
+            time.sleep(0.01)
+        assert texts(b.load("s")) == ["hi"]
+        a.close()
+        b.close()
+
+
+def test_sqlite_compaction_keeps_summary():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        a, b = sqlite_pair(tmpdir)
+        session = new_session("s")
+        add_turn(session, "pay now", upi="x@ybl")
+        a.save(session)
+        a.flush()
+        a.compact("s")
+        a.flush()
+        stored = b.load("s")
+        assert texts(stored) == [] and len(stored["conversationHistory"]) == 1
+        assert stored["extractedIntelligence"]["upiIds"] == ["x@ybl"]
+        assert a.stats["rebases"] == 0
+        a.close()
+        b.close()
+
+
+def test_compacting_twice_counts_once():
+    memory = MemorySessionBackend(_restore)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        sqlite, other = sqlite_pair(tmpdir)
+        for backend in (memory, sqlite):
+            session = new_session("s")
+            add_turn(session, "pay now")
+            backend.save(session)
+            backend.compact("s")
+            backend.compact("s")
+            assert backend.stats["compactions"] == 1
+        sqlite.close()
+        other.close()
+
+
+def test_sqlite_engaged_count_is_store_wide():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        a, b = sqlite_pair(tmpdir)
+        for backend, session_id in ((a, "a"), (b, "b"), (b, "idle")):
+            session = new_session(session_id)
+            session["agentEngaged"] = session_id != "idle"
+            backend.save(session)
+            backend.flush()
+        a._size, a._engaged = a._count()
+        assert a.size() == 3 and a.engaged() == 2
+        a.close()
+        b.close()
+
+
+def test_sqlite_purge_expired():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        a, b = sqlite_pair(tmpdir, ttl_seconds=60)
+        a.save(new_session("s"))
+        a.flush()
+        a._writer.execute("UPDATE sessions SET updated_at = updated_at - 61")
+        assert a.purge_expired() == 1
+        assert b.load("s") is None
+        a.close()
+        b.close()
+
+
+def main():
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Unit tests for IdleTimerWheel (timer_wheel.py). The wheel is advanced by hand
+with explicit `now` values, so no test waits on the clock.
+Run with pytest, or directly: python test_timer_wheel.py
+"""
+
+import time
+
+from timer_wheel import IdleTimerWheel
+
+
+def new_wheel(timeout=10):
+    expired = []
+    return IdleTimerWheel(timeout, expired.append, tick=1.0), expired
+
+
+def test_expires_after_timeout():
+    wheel, expired = new_wheel()
+    start = time.monotonic()
+    wheel.touch("s")
+    assert wheel.advance(now=start + 5) == []
+    assert wheel.advance(now=start + 12) == ["s"]
+    assert expired == ["s"] and len(wheel) == 0
+    assert wheel.stats() == {"tracked": 0, "expired": 1}
+
+
+def test_touch_moves_the_deadline():
+    wheel, expired = new_wheel()
+    start = time.monotonic()
+    wheel.touch("s")
+    wheel._deadlines["s"] = start + 20  # as if touched again 10s later
+    assert wheel.advance(now=start + 12) == []
+    assert len(wheel) == 1
+    assert wheel.advance(now=start + 22) == ["s"]
+    assert expired == ["s"]
+
+
+def test_cancel_stops_expiry():
+    wheel, expired = new_wheel()
+    start = time.monotonic()
+    wheel.touch("a")
+    wheel.touch("b")
+    wheel.cancel("a")
+    assert wheel.advance(now=start + 12) == ["b"]
+    assert expired == ["b"]
+
+
+def test_touch_with_delay_reschedules_early():
+    wheel, expired = new_wheel()
+    start = time.monotonic()
+    wheel.touch("s", delay=3)
+    assert wheel.advance(now=start + 2) == []
+    assert wheel.advance(now=start + 5) == ["s"]
+
+
+def test_on_expire_errors_do_not_stop_the_wheel():
+    def on_expire(session_id):
+        if session_id == "bad":
+            raise RuntimeError("boom")
+        seen.append(session_id)
+
+    seen = []
+    wheel = IdleTimerWheel(10, on_expire, tick=1.0)
+    start = time.monotonic()
+    wheel.touch("bad")
+    wheel.touch("good")
+    assert sorted(wheel.advance(now=start + 12)) == ["bad", "good"]
+    assert seen == ["good"]
+
+
+def main():
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+class IdleTimerWheel:
+    """
+    Hashed timing wheel for per-session idle timeouts.
+
+    `touch` records a session's new deadline in O(1) and never scans other
+    sessions. Each slot holds the sessions whose deadline falls in that tick;
+    a session touched again keeps its old slot entry, and when that slot comes
+    round the entry is simply moved to the slot of its current deadline.
+    A background task advances the wheel every `tick` seconds and calls
+    `on_expire(session_id)` for sessions idle longer than `timeout`.
+    """
+
+    def __init__(self, timeout: float, on_expire: Callable[[str], None],
+                 tick: float = 1.0, slots: Optional[int] = None):
+        self.timeout = timeout
+        self.on_expire = on_expire
+        self.tick = tick
+        # Enough slots that a fresh deadline never wraps past the current tick
+        self.slots = slots or int(math.ceil(timeout / tick)) + 1
+        self._wheel: List[Set[str]] = [set() for _ in range(self.slots)]
+        self._deadlines: Dict[str, float] = {}
+        self._scheduled: Set[str] = set()  # sessions with an entry somewhere in the wheel
+        self._current_tick = self._tick_of(time.monotonic())
+        self._task: Optional[asyncio.Task] = None
+        self.expired = 0
+
+    def _tick_of(self, timestamp: float) -> int:
+        return int(timestamp // self.tick)
+
+    def _schedule(self, session_id: str, deadline: float):
+        deadline_tick = max(self._tick_of(deadline), self._current_tick + 1)
+        self._wheel[deadline_tick % self.slots].add(session_id)
+        self._scheduled.add(session_id)
+
+    def touch(self, session_id: str, delay: Optional[float] = None):
+        """Record activity: the session now expires `timeout` (or `delay`) seconds from now."""
+        deadline = time.monotonic() + (self.timeout if delay is None else delay)
+        self._deadlines[session_id] = deadline
+        if session_id not in self._scheduled:
+            self._schedule(session_id, deadline)
+
+    def cancel(self, session_id: str):
+        """Stop tracking a session (its slot entry is dropped when visited)."""
+        self._deadlines.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def advance(self, now: Optional[float] = None) -> List[str]:
+        """Process every tick up to `now`; returns the sessions that expired."""
+        now = time.monotonic() if now is None else now
+        expired = []
+        target_tick = self._tick_of(now)
+        while self._current_tick < target_tick:
+            self._current_tick += 1
+            slot = self._wheel[self._current_tick % self.slots]
+            if not slot:
+                continue
+            due, slot_sessions = [], list(slot)
+            slot.clear()
+            for session_id in slot_sessions:
+                self._scheduled.discard(session_id)
+                deadline = self._deadlines.get(session_id)
+                if deadline is None:
+                    continue  # cancelled
+                if deadline <= now:
+                    del self._deadlines[session_id]
+                    due.append(session_id)
+                else:
+                    self._schedule(session_id, deadline)  # touched since: move to its new slot
+            expired.extend(due)
+        for session_id in expired:
+            self.expired += 1
+            try:
+                self.on_expire(session_id)
+            except Exception as e:
+                logger.error(f"❌ Idle expiry failed for session {session_id}: {e}")
+        return expired
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.tick)
+            self.advance()
+
+    def start(self):
+        """Start advancing the wheel on the running event loop."""
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"✅ Idle session timer started (timeout {self.timeout}s, tick {self.tick}s)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"tracked": len(self._deadlines), "expired": self.expired}
@@ -0,0 +1,156 @@
+import functools
+import json
+import logging
+import os
+import random
+import re
+import time
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, Optional
+
+from logging_config import queued
+
+# Per-request tracing spans exported as JSONL (one span per line).
+# TRACE_SAMPLE_RATE=0 (default) disables tracing. Otherwise a request is traced
+# if its W3C `traceparent` header says sampled, or - without a header - with
+# probability TRACE_SAMPLE_RATE. A sampled traceparent is honoured even at rate 0.
+# Unsampled requests get a shared no-op span. Spans are written by the logging
+# listener thread (LOG_ASYNC), so the event loop never does the file I/O.
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+TRACE_FILE = os.getenv("TRACE_FILE", "traces.jsonl")
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(10 * 1024 * 1024)))
+TRACE_BACKUP_COUNT = int(os.getenv("TRACE_BACKUP_COUNT", "3"))
+
+TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+_exporter: Optional[logging.Logger] = None
+
+
+class _SpanFormatter(logging.Formatter):
+    """Serializes the span dict (on the listener thread when queued)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.span, ensure_ascii=False, default=str)
+
+
+def _export(record: Dict[str, Any]):
+    """Append a finished span to the rotating JSONL file (opened on first use)."""
+    global _exporter
+    if _exporter is None:
+        handler = RotatingFileHandler(TRACE_FILE, maxBytes=TRACE_MAX_BYTES,
+                                      backupCount=TRACE_BACKUP_COUNT, encoding="utf-8")
+        handler.setFormatter(_SpanFormatter())
+        _exporter = logging.getLogger("honeypot.traces")
+        _exporter.setLevel(logging.INFO)
+        _exporter.propagate = False
+        _exporter.addHandler(queued(handler))
+    _exporter.info("span", extra={"span": record})
+
+
+class Span:
+    """One timed operation; the root span's sessionId is copied to every child."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "session_id", "attributes",
+                 "start", "_start_perf", "_token", "status")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str],
+                 session_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.session_id = session_id
+        self.attributes = attributes
+        self.status = "ok"
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        self.start = time.time()
+        self._start_perf = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration_ms = (time.perf_counter() - self._start_perf) * 1000
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.status = "error"
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        _export({
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentId": self.parent_id,
+            "name": self.name,
+            "sessionId": self.session_id,
+            "start": self.start,
+            "durationMs": round(duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        })
+
+
+class _NoopSpan:
+    """Returned when the request is not sampled; costs one attribute lookup."""
+
+    traceparent = None
+
+    def set(self, **attributes: Any):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def _should_sample(traceparent: Optional[str]):
+    """(sampled, trace_id, parent_id) honouring an inbound traceparent."""
+    match = TRACEPARENT_RE.match(traceparent.strip().lower()) if traceparent else None
+    if match:
+        trace_id, parent_id, flags = match.groups()
+        return bool(int(flags, 16) & 1), trace_id, parent_id
+    if TRACE_SAMPLE_RATE <= 0:
+        return False, None, None
+    return random.random() < TRACE_SAMPLE_RATE, f"{random.getrandbits(128):032x}", None
+
+
+def trace_request(name: str, traceparent: Optional[str] = None,
+                  session_id: Optional[str] = None, **attributes: Any):
+    """Root span for one request: `with trace_request("POST /inbound", header, sid) as root:`"""
+    if traceparent is None and TRACE_SAMPLE_RATE <= 0:
+        return NOOP_SPAN
+    sampled, trace_id, parent_id = _should_sample(traceparent)
+    if not sampled:
+        return NOOP_SPAN
+    return Span(name, trace_id, parent_id, session_id, attributes)
+
+
+def span(name: str, **attributes: Any):
+    """Child span of the current one: `with span("detect_scam"):` (no-op outside a trace)."""
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(name, parent.trace_id, parent.span_id, parent.session_id, attributes)
+
+
+def traced(name: str):
+    """Decorator: run an async function inside a child span."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with span(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator